@@ -1,12 +1,30 @@
 
 import streamlit as st
-import google.generativeai as genai
 import os
-from datetime import datetime, timedelta
-import json
-import pandas as pd
-import plotly.express as px
-import random
+import uuid
+from datetime import datetime
+from safarnama.batch import RateLimitedModel, plan_batch, read_batch_csv
+from safarnama.clients import ClientPool
+from safarnama.jobs import DONE, FAILED, JobLimitError, JobManager
+from safarnama.plan_cache import PlanCache
+from safarnama.prompts import PLAN_SYSTEM_INSTRUCTION
+from safarnama.backends import HedgedBackend, gemini_backend, local_backend
+from safarnama.planner import (GEMINI_FAST_MODEL, GEMINI_MODEL, PLAN_METRICS, PlanParseError, generate_plan,
+                               section_generator)
+from safarnama.render import (TripView, accommodations_markdown, activities_markdown, cost_figure, cost_rows,
+                              named_items_markdown, tips_markdown, transportation_markdown, trip_content_hash)
+from safarnama.replan import plan_delta, replan_trip
+from safarnama.search import TripIndex
+from safarnama.expenses import ExpenseColumns, generate_expense_columns
+from safarnama.export import (export_bytes, export_file_name, expense_csv_chunks, expense_ndjson_chunks,
+                              parquet_available, trip_json_chunks, write_chunks, write_expenses_parquet,
+                              write_trips_archive)
+from safarnama.expense_import import IMPORT_FIELDS, guess_columns, import_expenses_csv, read_header
+from safarnama.storage import TripStore
+from safarnama.telemetry import TELEMETRY, log_spans_to, start_metrics_server
+
+# Timed from the first line of the script; ended just before the performance panel is drawn
+script_span = TELEMETRY.start_span("script")
 
 # Configure page
 st.set_page_config(page_title="Safarनामा- Your Trip Planner", page_icon="✈️", layout="wide")
@@ -42,6 +60,15 @@ st.markdown("""
         border-radius: 5px;
         margin: 10px 0;
     }
+    details.day {
+        border: 1px solid rgba(49, 51, 63, 0.2);
+        border-radius: 0.5rem;
+        padding: 0.5rem 1rem;
+        margin-bottom: 0.5rem;
+    }
+    details.day summary {
+        cursor: pointer;
+    }
 </style>
 """, unsafe_allow_html=True)
 
@@ -49,22 +76,127 @@ st.markdown("""
 st.markdown("<div class='title'>✈️ Safarनामा- Your Smart Trip Planner</div>", unsafe_allow_html=True)
 st.markdown("<div class='subtitle'>Powered by your well wishes</div>", unsafe_allow_html=True)
 
+# Trips longer than this can be planned as parallel segments
+SEGMENTED_MIN_DAYS = 8
+PLAN_CACHE_PATH = os.environ.get("SAFARNAMA_PLAN_CACHE", os.path.join(".cache", "plans.sqlite3"))
+TRIP_DB_PATH = os.environ.get("SAFARNAMA_DB", "safarnama.sqlite3")
+# Saved trips and expenses belong to the signed-in user when Streamlit auth is
+# configured, otherwise to a token kept in the page URL under this query
+# parameter, so a refresh or a bookmark brings them back. With SAFARNAMA_USER
+# set every session shares that user's trips (for a single-user deployment).
+SHARED_TRIP_STORE_USER = os.environ.get("SAFARNAMA_USER")
+TRIP_LINK_PARAM = "traveler"
+MAX_JOBS_PER_SESSION = 3
+TELEMETRY_LOG_PATH = os.environ.get("SAFARNAMA_TELEMETRY_LOG")
+METRICS_PORT = os.environ.get("SAFARNAMA_METRICS_PORT")
+
+# Plan cache shared by every session in this process and persisted on disk
+@st.cache_resource
+def get_plan_cache():
+    return PlanCache(PLAN_CACHE_PATH)
+
+# Trip and expense store shared by every session in this process
+@st.cache_resource
+def get_trip_store():
+    return TripStore(TRIP_DB_PATH)
+
+# Worker pool for plan generation that runs outside the script thread
+@st.cache_resource
+def get_job_manager():
+    return JobManager(max_workers=4, max_jobs_per_session=MAX_JOBS_PER_SESSION)
+
+# JSON-lines span log and Prometheus /metrics endpoint, when configured;
+# started once per process
+@st.cache_resource
+def start_telemetry_exports():
+    if TELEMETRY_LOG_PATH:
+        log_spans_to(TELEMETRY_LOG_PATH)
+    if METRICS_PORT:
+        return start_metrics_server(int(METRICS_PORT))
+    return None
+
+start_telemetry_exports()
+
+# The store user for this session's trips
+def trip_store_user():
+    if SHARED_TRIP_STORE_USER:
+        return SHARED_TRIP_STORE_USER
+    if "is_logged_in" in st.user and st.user.is_logged_in:
+        return f"user:{st.user.get('email') or st.user.get('sub')}"
+    token = st.query_params.get(TRIP_LINK_PARAM, "")
+    if len(token) != 32 or any(c not in "0123456789abcdef" for c in token):
+        token = uuid.uuid4().hex
+        st.query_params[TRIP_LINK_PARAM] = token
+    return f"link:{token}"
+
 # Initialize session state for storing trip information
+if 'session_id' not in st.session_state:
+    st.session_state.session_id = uuid.uuid4().hex
+if 'trip_store_user' not in st.session_state:
+    st.session_state.trip_store_user = trip_store_user()
 if 'trips' not in st.session_state:
-    st.session_state.trips = []
+    st.session_state.trips = get_trip_store().load_trips(st.session_state.trip_store_user)
+    st.session_state.trip_positions = {trip['id']: i for i, trip in enumerate(st.session_state.trips)}
+    # Search index over destinations, interests, activities, attractions and food
+    st.session_state.trip_index = TripIndex(st.session_state.trips)
 if 'current_trip' not in st.session_state:
     st.session_state.current_trip = {}
 if 'api_key_set' not in st.session_state:
     st.session_state.api_key_set = False
 if 'active_tab' not in st.session_state:
     st.session_state.active_tab = "Plan"
+if 'finished_jobs' not in st.session_state:
+    st.session_state.finished_jobs = []
+if 'editing_trip_id' not in st.session_state:
+    # Set by "Edit Trip"; the next plan from the form updates that trip in place
+    st.session_state.editing_trip_id = None
+if 'trip_hashes' not in st.session_state:
+    # Content hash per trip id, used to look up its rendered details
+    st.session_state.trip_hashes = {}
+if 'expense_tables' not in st.session_state:
+    # Columnar expenses per trip id, loaded when a trip is first opened in the tracker
+    st.session_state.expense_tables = {}
+if 'expense_views' not in st.session_state:
+    # Charts and table frames built from a trip's expenses, until they change
+    st.session_state.expense_views = {}
+if 'trips_page' not in st.session_state:
+    st.session_state.trips_page = 1
+if 'open_trip_details' not in st.session_state:
+    # Ids of the trip cards showing their details in My Trips
+    st.session_state.open_trip_details = set()
+
+BACKEND_CHOICES = ["Gemini Pro, hedged with Flash", "Gemini Pro", "Gemini Flash", "Local stand-in (no API key)"]
+LOCAL_BACKEND = BACKEND_CHOICES[-1]
+
+# Model clients shared by every session. A key provided at deploy time is
+# warmed up right away so the first request does not pay for connection setup.
+# The part common to every planner prompt goes in the models' system instruction.
+@st.cache_resource
+def get_client_pool():
+    pool = ClientPool(max_concurrency_per_key=8, idle_ttl=15 * 60, system_instruction=PLAN_SYSTEM_INSTRUCTION)
+    server_api_key = os.environ.get("GOOGLE_API_KEY")
+    if server_api_key:
+        pool.warm_up(server_api_key, [GEMINI_MODEL, GEMINI_FAST_MODEL])
+    return pool
+
+# Model backends are shared process-wide, per API key, so their latency
+# histograms cover every session using that key
+@st.cache_resource
+def get_backend(choice, api_key):
+    if choice == LOCAL_BACKEND:
+        return local_backend()
+    if choice == "Gemini Pro":
+        return gemini_backend(GEMINI_MODEL, get_client_pool(), api_key)
+    if choice == "Gemini Flash":
+        return gemini_backend(GEMINI_FAST_MODEL, get_client_pool(), api_key)
+    return HedgedBackend(get_backend("Gemini Pro", api_key), get_backend("Gemini Flash", api_key))
+
+get_client_pool()
 
 # Function to initialize Gemini API
-def initialize_gemini(api_key):
+def initialize_gemini(api_key, backend_choice=BACKEND_CHOICES[0]):
     try:
-        genai.configure(api_key=api_key)
-        model = genai.GenerativeModel('gemini-1.5-pro')
-        return model
+        return get_backend(backend_choice, api_key)
     except Exception as e:
         st.error(f"Error initializing Gemini API: {e}")
         return None
@@ -72,11 +204,11 @@ def initialize_gemini(api_key):
 # API Key configuration
 with st.sidebar:
     st.header("Configuration")
+    backend_choice = st.selectbox("Model", BACKEND_CHOICES)
     api_key = st.text_input("Enter Gemini API Key", type="password")
     if st.button("Set API Key"):
-        if api_key:
-            os.environ["GOOGLE_API_KEY"] = api_key
-            st.session_state.gemini_model = initialize_gemini(api_key)
+        if api_key or backend_choice == LOCAL_BACKEND:
+            st.session_state.gemini_model = initialize_gemini(api_key, backend_choice)
             if st.session_state.gemini_model:
                 st.session_state.api_key_set = True
                 st.success("API Key set successfully!")
@@ -89,136 +221,257 @@ with st.sidebar:
     st.header("Navigation")
     if st.button("Plan Trip", key="nav_plan", use_container_width=True):
         st.session_state.active_tab = "Plan"
+        st.session_state.editing_trip_id = None
     if st.button("My Trips", key="nav_trips", use_container_width=True):
         st.session_state.active_tab = "Trips"
     if st.button("Expense Tracker", key="nav_expenses", use_container_width=True):
         st.session_state.active_tab = "Expenses"
 
+    # Filled in at the end of the script, once save_trip is defined
+    background_jobs_area = st.container()
+
     st.markdown("---")
+    cache_stats = get_plan_cache().stats()
+    st.caption(f"Plan cache: {cache_stats['disk_entries']} plans, {cache_stats['hit_rate']:.0%} hit rate")
+    if st.session_state.get("gemini_model") is not None:
+        backend_stats = st.session_state.gemini_model.stats()
+        if "hedges" in backend_stats:
+            st.caption(f"Hedged after {backend_stats['hedge_delay_s']:.1f}s on {backend_stats['hedges']} of "
+                       f"{backend_stats['requests']} requests, fallback won {backend_stats['fallback_wins']}")
+        elif backend_stats["calls"]:
+            st.caption(f"Model latency: p50 {backend_stats['p50_s']:.1f}s, p95 {backend_stats['p95_s']:.1f}s")
+    plan_stats = PLAN_METRICS.stats()
+    if plan_stats["plans"]:
+        st.caption(f"{plan_stats['plans']} plans: {plan_stats['repairs']} repaired, "
+                   f"{plan_stats['section_rerequests']} section re-requests, "
+                   f"{plan_stats['regenerations_per_plan']:.2f} full regenerations per plan, "
+                   f"{plan_stats['tokens_per_plan']:,.0f} tokens per plan")
+    show_performance = st.checkbox("Show performance panel",
+                                   value=os.environ.get("SAFARNAMA_DEBUG", "") not in ("", "0"))
+    # Filled in at the end of the script, so it includes this run's timings
+    performance_area = st.container()
     st.caption("Made by Satvik Gupta❤️")
 
-# Function to get AI recommendations
-def get_recommendations(destination, duration, interests, budget, travelers):
+# Function to get AI recommendations. When on_event is given the response is
+# streamed and on_event is called with each itinerary day and section as it completes.
+# With segmented=True the plan is built from concurrent per-section/day-range requests.
+def get_recommendations(destination, duration, interests, budget, travelers, on_event=None, segmented=False):
     if not st.session_state.api_key_set:
         st.warning("Please set your Gemini API Key first.")
         return None
 
     try:
-        prompt = f"""
-        Create a comprehensive trip plan for {destination} for {duration} days.
-        Budget: {budget}
-        Number of travelers: {travelers}
-        Interests: {', '.join(interests)}
-
-        Please provide:
-        1. A day-by-day itinerary with specific activities and places
-        2. Recommended accommodations within budget
-        3. Must-visit attractions based on the interests
-        4. Local food recommendations
-        5. Transportation tips
-        6. Estimated costs for major categories (accommodation, food, activities, transportation)
-        7. Essential travel tips for this destination
-
-        Format the response as a structured JSON with the following keys:
-        - itinerary (array of day objects with day_number, activities)
-        - accommodations (array of options)
-        - attractions (array of places)
-        - food (array of recommendations)
-        - transportation (object with tips)
-        - costs (object with estimated costs per category)
-        - tips (array of travel tips)
-        """
-
-        response = st.session_state.gemini_model.generate_content(prompt)
-        try:
-            # Try to extract JSON from the response
-            content = response.text
-            # Handle case where JSON might be within markdown code blocks
-            if "```json" in content:
-                content = content.split("```json")[1].split("```")[0].strip()
-            elif "```" in content:
-                content = content.split("```")[1].split("```")[0].strip()
-
-            # Parse the JSON
-            trip_plan = json.loads(content)
-            return trip_plan
-        except json.JSONDecodeError as e:
-            st.error(f"Error parsing JSON from AI response: {e}")
-            st.write("Raw response:", response.text)
-            return None
+        with TELEMETRY.span("plan.total", segmented=segmented, stream=on_event is not None):
+            return generate_plan(st.session_state.gemini_model, destination, duration, interests, budget,
+                                 travelers, cache=get_plan_cache(), on_event=on_event, segmented=segmented)
+    except PlanParseError as e:
+        st.error(f"Error parsing JSON from AI response: {e}")
+        st.write("Raw response:", e.raw_text)
+        return None
     except Exception as e:
         st.error(f"Error getting recommendations: {e}")
         return None
 
+# Function to update an edited trip by asking only for the parts that changed.
+# Returns None when the edit needs a full plan instead.
+def get_replanned_trip(old_trip, new_inputs):
+    if not st.session_state.api_key_set:
+        st.warning("Please set your Gemini API Key first.")
+        return None
+
+    delta = plan_delta(old_trip, new_inputs)
+    if delta is None:
+        return None
+
+    try:
+        trip = replan_trip(section_generator(st.session_state.gemini_model), old_trip, new_inputs, delta=delta)
+    except Exception as e:
+        st.warning(f"Could not update only the changed parts ({e}); planning the whole trip again.")
+        return None
+
+    if delta.requests():
+        st.info(f"Re-planned only what changed: {', '.join(delta.describe())}.")
+    return trip
+
+# Function to plan many trips at once. Each item is a dict of the Plan form's
+# inputs; finished plans are saved as they arrive and a BatchReport is returned.
+# ``rate`` caps model requests per second across the batch, segment and
+# re-requests included, not trips.
+def get_recommendations_batch(items, rate=1.0, burst=None, max_workers=4, max_retries=4, on_result=None):
+    if not st.session_state.api_key_set:
+        st.warning("Please set your Gemini API Key first.")
+        return None
+
+    model = st.session_state.gemini_model
+    cache = get_plan_cache()
+
+    def plan_item(item, bucket):
+        item_model = RateLimitedModel(model, bucket) if bucket is not None else model
+        return generate_plan(item_model, item["destination"], item["duration"], item["interests"], item["budget"],
+                             item["travelers"], cache=cache,
+                             segmented=item["duration"] >= SEGMENTED_MIN_DAYS)
+
+    def save_result(result):
+        if result.ok:
+            save_trip({**result.item, **result.plan})
+        if on_result is not None:
+            on_result(result)
+
+    return plan_batch(items, plan_item, max_workers=max_workers, rate=rate, burst=burst,
+                      max_retries=max_retries, on_result=save_result)
+
+# Queue a plan request on the shared worker pool; the result is picked up by
+# show_background_jobs and saved from the script thread. With ``editing_trip``
+# the plan replaces that trip instead of adding a new one.
+def submit_plan_job(trip_inputs, segmented=False, editing_trip=None):
+    if not st.session_state.api_key_set:
+        st.warning("Please set your Gemini API Key first.")
+        return None
+
+    model = st.session_state.gemini_model
+    cache = get_plan_cache()
+
+    def run(cancel_event):
+        return generate_plan(model, trip_inputs["destination"], trip_inputs["duration"], trip_inputs["interests"],
+                             trip_inputs["budget"], trip_inputs["travelers"],
+                             cache=cache, segmented=segmented, cancel_event=cancel_event)
+
+    payload = dict(trip_inputs)
+    if editing_trip is not None:
+        payload["id"] = editing_trip["id"]
+        if "created_at" in editing_trip:
+            payload["created_at"] = editing_trip["created_at"]
+    try:
+        return get_job_manager().submit(st.session_state.session_id, trip_inputs["destination"], run,
+                                        payload=payload)
+    except JobLimitError as e:
+        st.error(str(e))
+        return None
+
 # Function to save trips
 def save_trip(trip_data):
-    if 'id' not in trip_data:
-        trip_data['id'] = len(st.session_state.trips) + 1
-
     if 'created_at' not in trip_data:
         trip_data['created_at'] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
-    # Check if trip already exists (for updates)
-    existing_trip_idx = None
-    for i, trip in enumerate(st.session_state.trips):
-        if trip.get('id') == trip_data.get('id'):
-            existing_trip_idx = i
-            break
+    # The store assigns stable ids to new trips and updates existing ones in place
+    trip_data['id'] = get_trip_store().save_trip(trip_data, st.session_state.trip_store_user)
+    st.session_state.trip_hashes[trip_data['id']] = trip_content_hash(trip_data)
+    st.session_state.trip_index.add(trip_data)
 
+    existing_trip_idx = st.session_state.trip_positions.get(trip_data['id'])
     if existing_trip_idx is not None:
         st.session_state.trips[existing_trip_idx] = trip_data
     else:
+        st.session_state.trip_positions[trip_data['id']] = len(st.session_state.trips)
         st.session_state.trips.append(trip_data)
 
-# Function to generate sample expense data
-def generate_expense_data(trip):
-    expense_categories = ["Accommodation", "Food", "Transportation", "Activities", "Shopping", "Miscellaneous"]
-    expenses = []
-
-    # Calculate number of days
-    duration = int(trip.get("duration", 7))
-    start_date = datetime.strptime(trip.get("travel_date", datetime.now().strftime("%Y-%m-%d")), "%Y-%m-%d")
-
-    total_budget = float(trip.get("budget", 1000).replace("$", "").replace(",", ""))
-
-    # Generate daily expenses
-    for day in range(duration):
-        current_date = start_date + timedelta(days=day)
-        date_str = current_date.strftime("%Y-%m-%d")
-
-        # Generate 2-4 expenses per day
-        num_expenses = random.randint(2, 4)
-        for _ in range(num_expenses):
-            category = random.choice(expense_categories)
-
-            # Set amounts based on category
-            if category == "Accommodation":
-                amount = round(random.uniform(total_budget * 0.1, total_budget * 0.3) / duration, 2)
-            elif category == "Food":
-                amount = round(random.uniform(10, 100), 2)
-            elif category == "Transportation":
-                amount = round(random.uniform(5, 80), 2)
-            elif category == "Activities":
-                amount = round(random.uniform(15, 150), 2)
-            elif category == "Shopping":
-                amount = round(random.uniform(10, 200), 2)
-            else:
-                amount = round(random.uniform(5, 50), 2)
-
-            description = f"{category} expense in {trip.get('destination')}"
+# Sidebar panel for queued plans. Finished plans are saved from here, on the
+# script thread, and trigger a full rerun so the other tabs pick them up.
+def show_background_jobs():
+    manager = get_job_manager()
+    finished = manager.pop_finished(st.session_state.session_id)
+    for job in finished:
+        if job.status == DONE:
+            save_trip({**job.payload, **job.result})
+    st.session_state.finished_jobs = (finished + st.session_state.finished_jobs)[:5]
+    if finished:
+        st.rerun()
+
+    jobs = manager.jobs_for(st.session_state.session_id)
+    if not jobs and not st.session_state.finished_jobs:
+        return
 
-            expenses.append({
-                "date": date_str,
-                "category": category,
-                "description": description,
-                "amount": amount,
-                "trip_id": trip.get("id")
-            })
-
-    return expenses
+    st.markdown("---")
+    st.header("Background Jobs")
+    for job in jobs:
+        col1, col2 = st.columns([3, 1])
+        with col1:
+            st.write(f"**{job.label}**: {job.status} ({job.elapsed():.0f}s)")
+        with col2:
+            if st.button("Cancel", key=f"cancel_job_{job.id}"):
+                manager.cancel(job.id)
+    for job in st.session_state.finished_jobs:
+        if job.status == DONE:
+            st.caption(f"✅ {job.label}: ready in My Trips")
+        elif job.status == FAILED:
+            st.caption(f"❌ {job.label}: {job.error}")
+        else:
+            st.caption(f"⏹ {job.label}: cancelled")
+
+# Functions to display the individual sections of a trip plan
+def show_itinerary_day(day):
+    with st.expander(f"Day {day.get('day_number', '?')}", expanded=False):
+        st.markdown(activities_markdown(day.get("activities", [])))
+
+def show_accommodations(accommodations):
+    st.header("Accommodations")
+    st.markdown(accommodations_markdown(accommodations))
+
+def show_attractions(attractions):
+    st.header("Must-Visit Attractions")
+    st.markdown(named_items_markdown(attractions))
+
+def show_food(food_items):
+    st.header("Food Recommendations")
+    st.markdown(named_items_markdown(food_items))
+
+def show_transportation(transportation):
+    st.header("Transportation Tips")
+    st.markdown(transportation_markdown(transportation))
+
+def show_costs(costs, key=None):
+    st.header("Estimated Costs")
+    rows, notes = cost_rows(costs)
+    if notes:
+        st.markdown("\n\n".join(notes))
+    if rows:
+        cost_df, fig = cost_figure(rows)
+        show_cost_chart(cost_df, fig, key=key)
+
+def show_cost_chart(cost_df, fig, key=None):
+    with TELEMETRY.span("render.plotly", chart="costs"):
+        st.plotly_chart(fig, use_container_width=True, key=f"{key}_chart" if key else None)
+
+    # Display the cost table
+    st.dataframe(cost_df, use_container_width=True, key=f"{key}_table" if key else None)
+
+def show_tips(tips):
+    st.header("Travel Tips")
+    st.markdown(tips_markdown(tips))
+
+SECTION_RENDERERS = {
+    "accommodations": show_accommodations,
+    "attractions": show_attractions,
+    "food": show_food,
+    "transportation": show_transportation,
+    "costs": show_costs,
+    "tips": show_tips,
+}
+
+# Rendered trip details, shared by every session and keyed by the trip's
+# content hash so an updated trip gets a fresh view
+@st.cache_resource(max_entries=64)
+def get_trip_view(content_hash, _trip, _built):
+    # Only runs on a cache miss; _built tells the caller so
+    _built.append(content_hash)
+    with TELEMETRY.span("render.trip_view"):
+        return TripView(_trip)
+
+# Content hash of a trip, remembered per trip id; save_trip refreshes it
+def trip_view_hash(trip):
+    trip_id = trip.get('id')
+    content_hash = st.session_state.trip_hashes.get(trip_id)
+    if content_hash is None:
+        content_hash = trip_content_hash(trip)
+        if trip_id is not None:
+            st.session_state.trip_hashes[trip_id] = content_hash
+    return content_hash
 
 # Function to view trip details
 def show_trip_details(trip):
+    built = []
+    view = get_trip_view(trip_view_hash(trip), trip, built)
+    TELEMETRY.cache("trip_view", not built)
     st.subheader(f"Trip to {trip.get('destination', 'Unknown')}")
 
     col1, col2, col3 = st.columns(3)
@@ -229,126 +482,406 @@ def show_trip_details(trip):
     with col3:
         st.write(f"**Date:** {trip.get('travel_date', 'Not specified')}")
 
-    st.write(f"**Travelers:** {trip.get('travelers', 'N/A')}")
-    st.write(f"**Interests:** {', '.join(trip.get('interests', []))}")
+    st.markdown(view.summary)
 
     st.markdown("---")
 
     # Display itinerary
-    if "itinerary" in trip and trip["itinerary"]:
+    if view.itinerary:
         st.header("Itinerary")
-        for day in trip["itinerary"]:
-            with st.expander(f"Day {day.get('day_number', '?')}", expanded=False):
-                activities = day.get("activities", [])
-                if isinstance(activities, list):
-                    for activity in activities:
-                        st.write(f"• {activity}")
-                else:
-                    st.write(activities)
+        st.markdown(view.itinerary, unsafe_allow_html=True)
 
     # Display accommodations, attractions, and food in columns
     col1, col2 = st.columns(2)
 
     with col1:
-        if "accommodations" in trip and trip["accommodations"]:
+        if view.accommodations:
             st.header("Accommodations")
-            for acc in trip["accommodations"]:
-                if isinstance(acc, dict) and "name" in acc:
-                    st.write(f"• **{acc['name']}**")
-                    if "price" in acc:
-                        st.write(f"  Price: {acc['price']}")
-                    if "description" in acc:
-                        st.write(f"  {acc['description']}")
-                else:
-                    st.write(f"• {acc}")
+            st.markdown(view.accommodations)
 
-        if "attractions" in trip and trip["attractions"]:
+        if view.attractions:
             st.header("Must-Visit Attractions")
-            for attr in trip["attractions"]:
-                if isinstance(attr, dict) and "name" in attr:
-                    st.write(f"• **{attr['name']}**")
-                    if "description" in attr:
-                        st.write(f"  {attr['description']}")
-                else:
-                    st.write(f"• {attr}")
+            st.markdown(view.attractions)
 
     with col2:
-        if "food" in trip and trip["food"]:
+        if view.food:
             st.header("Food Recommendations")
-            for food in trip["food"]:
-                if isinstance(food, dict) and "name" in food:
-                    st.write(f"• **{food['name']}**")
-                    if "description" in food:
-                        st.write(f"  {food['description']}")
-                else:
-                    st.write(f"• {food}")
+            st.markdown(view.food)
 
-        if "transportation" in trip and trip["transportation"]:
+        if view.transportation:
             st.header("Transportation Tips")
-            if isinstance(trip["transportation"], dict):
-                for k, v in trip["transportation"].items():
-                    st.write(f"• **{k.title()}:** {v}")
-            elif isinstance(trip["transportation"], list):
-                for item in trip["transportation"]:
-                    st.write(f"• {item}")
-            else:
-                st.write(trip["transportation"])
+            st.markdown(view.transportation)
 
     # Display costs and tips
     st.markdown("---")
 
-    if "costs" in trip and trip["costs"]:
+    if view.has_costs:
         st.header("Estimated Costs")
-        cost_data = []
-
-        if isinstance(trip["costs"], dict):
-            for category, amount in trip["costs"].items():
-                cost_data.append({"Category": category.title(), "Amount": amount})
-        elif isinstance(trip["costs"], list):
-            for item in trip["costs"]:
-                if isinstance(item, dict) and "category" in item and "amount" in item:
-                    cost_data.append({"Category": item["category"].title(), "Amount": item["amount"]})
+        if view.cost_notes:
+            st.markdown(view.cost_notes)
+        if view.cost_chart is not None:
+            # Keyed per trip: cards of trips with the same costs would otherwise clash
+            show_cost_chart(view.cost_frame, view.cost_chart, key=f"trip_{trip.get('id')}_costs")
+
+    if view.tips:
+        st.header("Travel Tips")
+        st.markdown(view.tips)
+
+    # Export button; the JSON is only built when the download is clicked
+    expenses = st.session_state.expense_tables.get(trip.get('id'))
+    st.download_button(
+        label="Export Trip Details (JSON)",
+        data=lambda: export_bytes(lambda sink: write_chunks(trip_json_chunks(trip, expenses), sink)),
+        file_name=export_file_name(trip, "json"),
+        mime="application/json",
+        key=f"export_trip_{trip.get('id')}",
+        on_click="ignore"
+    )
+
+TRIPS_PAGE_SIZES = [10, 25, 50]
+
+def set_trips_page(page=1):
+    st.session_state.trips_page = page
+
+# Search box, pager and the cards of the current page. Searching or paging
+# reruns only this fragment, and only one page of cards is ever rendered.
+@st.fragment
+@TELEMETRY.span("fragment.trip_list")
+def show_trip_list():
+    col1, col2 = st.columns([3, 1])
+    with col1:
+        query = st.text_input("Search trips", key="trip_query", on_change=set_trips_page,
+                              placeholder="Destination, interest, activity, attraction or dish")
+    with col2:
+        page_size = st.selectbox("Trips per page", TRIPS_PAGE_SIZES, key="trips_page_size",
+                                 on_change=set_trips_page)
+
+    trips = st.session_state.trips
+    if query.strip():
+        # Ranked best match first
+        trips = [trips[st.session_state.trip_positions[trip_id]]
+                 for trip_id in st.session_state.trip_index.search(query)]
+        st.caption(f"{len(trips)} matching trip{'s' if len(trips) != 1 else ''}")
+        if not trips:
+            return
+    else:
+        # Newest first
+        trips = trips[::-1]
+
+    pages = max(1, -(-len(trips) // page_size))
+    page = min(st.session_state.trips_page, pages)
+    for trip in trips[(page - 1) * page_size:page * page_size]:
+        show_trip_card(trip)
+
+    if pages > 1:
+        col1, col2, col3 = st.columns([1, 2, 1])
+        with col1:
+            st.button("◀ Previous", key="trips_prev", disabled=page <= 1, use_container_width=True,
+                      on_click=set_trips_page, args=(page - 1,))
+        with col2:
+            st.caption(f"Page {page} of {pages} · {len(trips)} trips")
+        with col3:
+            st.button("Next ▶", key="trips_next", disabled=page >= pages, use_container_width=True,
+                      on_click=set_trips_page, args=(page + 1,))
+
+# Runs before the card reruns, so the button label matches what is shown
+def toggle_trip_details(trip):
+    if trip['id'] in st.session_state.open_trip_details:
+        st.session_state.open_trip_details.discard(trip['id'])
+    else:
+        st.session_state.current_trip = trip
+        st.session_state.open_trip_details.add(trip['id'])
+
+# One card in My Trips. Each card is a fragment, so opening or closing its
+# details reruns only that card.
+@st.fragment
+def show_trip_card(trip):
+    with st.container():
+        st.markdown(f"""
+        <div class='card'>
+            <h3>{trip.get('destination', 'Trip')}</h3>
+            <p><strong>Date:</strong> {trip.get('travel_date', 'Not specified')}</p>
+            <p><strong>Duration:</strong> {trip.get('duration', 'N/A')} days</p>
+        </div>
+        """, unsafe_allow_html=True)
+
+        details_open = trip['id'] in st.session_state.open_trip_details
+        col1, col2 = st.columns(2)
+        with col1:
+            st.button("Hide Details" if details_open else "View Details", key=f"view_{trip['id']}",
+                      on_click=toggle_trip_details, args=(trip,))
+        with col2:
+            if st.button(f"Edit Trip", key=f"edit_{trip['id']}"):
+                st.session_state.current_trip = trip
+                st.session_state.editing_trip_id = trip["id"]
+                st.session_state.active_tab = "Plan"
+                st.rerun()
+
+        if details_open:
+            st.markdown("---")
+            show_trip_details(trip)
+
+# Build something derived from a trip's expenses once per change to them
+def expense_view(trip_id, name, expenses, build):
+    cached = st.session_state.expense_views.get((trip_id, name))
+    hit = cached is not None and cached[0] is expenses and cached[1] == expenses.rollup.version
+    TELEMETRY.cache(f"expenses.{name}", hit)
+    if not hit:
+        with TELEMETRY.span(f"expenses.{name}", rows=len(expenses)):
+            cached = (expenses, expenses.rollup.version, build(expenses))
+        st.session_state.expense_views[(trip_id, name)] = cached
+    return cached[2]
+
+def build_expense_charts(expenses):
+    import plotly.express as px
+
+    fig1 = px.pie(
+        expenses.rollup.category_totals(),
+        values='amount',
+        names='category',
+        title='Expenses by Category',
+        color_discrete_sequence=px.colors.qualitative.Pastel1
+    )
+    fig1.update_traces(textposition='inside', textinfo='percent+label')
+    fig2 = px.bar(
+        expenses.rollup.daily_totals(),
+        x='date',
+        y='amount',
+        title='Daily Expenses',
+        labels={'date': 'Date', 'amount': 'Amount (USD)'},
+        color_discrete_sequence=['#2E86C1']
+    )
+    return fig1, fig2
+
+# Form callback: runs before the dashboard reruns, so the new expense shows
+# up in the metrics, charts and table of that same rerun
+def add_expense(trip, expenses):
+    new_description = st.session_state.new_expense_description
+    new_amount = st.session_state.new_expense_amount
+    if not new_description:
+        st.session_state.expense_message = ("error", "Please enter a description.")
+    elif new_amount <= 0:
+        st.session_state.expense_message = ("error", "Amount must be greater than 0.")
+    else:
+        new_expense = {
+            "date": st.session_state.new_expense_date.strftime("%Y-%m-%d"),
+            "category": st.session_state.new_expense_category,
+            "description": new_description,
+            "amount": float(new_amount),
+            "trip_id": trip.get("id")
+        }
+
+        get_trip_store().add_expenses(trip['id'], [new_expense])
+        expenses.append(new_expense)
+        st.session_state.expense_message = ("success", "Expense added successfully!")
+
+# Optional import columns and what happens without them
+IMPORT_OPTIONAL_FIELDS = {"category": "(categorize automatically)", "credit": "(none)"}
+
+# Import button callback: parses the whole file, then stores and appends the
+# new rows in one batch, so the dashboard reruns once with all of them
+def import_expense_file(trip, expenses):
+    uploaded = st.session_state.expense_import_file
+    if uploaded is None:
+        return
+    columns = {field: st.session_state.get(f"import_{field}_{uploaded.file_id}") for field in IMPORT_FIELDS}
+    bank_statement = st.session_state.get(f"import_bank_statement_{uploaded.file_id}", False)
+    try:
+        with TELEMETRY.span("expenses.import", bytes=uploaded.size):
+            result = import_expenses_csv(uploaded.getvalue(), columns=columns, existing=expenses,
+                                         bank_statement=bank_statement)
+            if len(result):
+                get_trip_store().add_expenses(trip['id'], result.to_records(trip['id']))
+                expenses.extend_columns(result.date, result.category, result.description, result.amount)
+    except (ValueError, UnicodeDecodeError) as e:
+        st.session_state.import_message = ("error", f"Error reading CSV: {e}")
+        return
+    st.session_state.import_message = ("success", result.summary())
+
+# Expense summary, charts, form and table. Adding an expense reruns this
+# fragment only (not the sidebar or the rest of the page); the summary,
+# charts and table are nested fragments of their own.
+@st.fragment
+@TELEMETRY.span("fragment.expense_dashboard")
+def show_expense_dashboard(trip, expenses):
+    show_expense_summary(trip, expenses)
+    show_expense_charts(trip, expenses)
+
+    # Expense table with add/edit functionality
+    st.subheader("Expense Details")
+
+    # Add new expense form
+    with st.expander("Add New Expense"):
+        with st.form("add_expense_form"):
+            col1, col2 = st.columns(2)
+            with col1:
+                st.date_input("Date", value=datetime.now(), key="new_expense_date")
+                st.selectbox(
+                    "Category",
+                    ["Accommodation", "Food", "Transportation", "Activities", "Shopping", "Miscellaneous"],
+                    key="new_expense_category"
+                )
+            with col2:
+                st.number_input("Amount (USD)", min_value=0.0, step=0.01, key="new_expense_amount")
+                st.text_input("Description", key="new_expense_description")
+
+            st.form_submit_button("Add Expense", on_click=add_expense, args=(trip, expenses))
+
+            message = st.session_state.pop("expense_message", None)
+            if message is not None:
+                kind, text = message
+                if kind == "success":
+                    st.success(text)
                 else:
-                    st.write(f"• {item}")
+                    st.error(text)
+
+    # Bulk import from a CSV or bank export
+    with st.expander("Import Expenses (CSV)"):
+        uploaded = st.file_uploader("Expenses or bank statement CSV", type=["csv"], key="expense_import_file")
+        if uploaded is not None:
+            _, header = read_header(uploaded.getvalue())
+            guessed = guess_columns(header)
+            st.caption("Rows with a category other than the six above are categorized from their description. "
+                       "Negative amounts are refunds and are skipped. With a credit column, the rows it marks "
+                       "are skipped and the rest are imported as debits.")
+            cols = st.columns(len(IMPORT_FIELDS))
+            for col, field in zip(cols, IMPORT_FIELDS):
+                with col:
+                    options = header if field not in IMPORT_OPTIONAL_FIELDS else [None] + header
+                    st.selectbox(
+                        f"{field.title()} column",
+                        options,
+                        index=options.index(guessed[field]) if guessed[field] in options else 0,
+                        format_func=lambda option, field=field: (IMPORT_OPTIONAL_FIELDS[field] if option is None
+                                                                 else option),
+                        key=f"import_{field}_{uploaded.file_id}"
+                    )
+            st.checkbox("Bank statement: negative amounts are spending, positive ones are credits",
+                        key=f"import_bank_statement_{uploaded.file_id}")
+            st.button("Import Expenses", on_click=import_expense_file, args=(trip, expenses))
+
+        message = st.session_state.pop("import_message", None)
+        if message is not None:
+            kind, text = message
+            if kind == "success":
+                st.success(text)
+            else:
+                st.error(text)
+
+    show_expense_table(trip, expenses)
 
-        if cost_data:
-            cost_df = pd.DataFrame(cost_data)
+@st.fragment
+def show_expense_summary(trip, expenses):
+    # Display expense summary
+    total_spent = expenses.rollup.total
+    budget = float(trip.get('budget', '0').replace('$', '').replace(',', ''))
 
-            # Create a cost breakdown visualization
-            fig = px.pie(cost_df, values='Amount', names='Category',
-                         title='Cost Breakdown',
-                         color_discrete_sequence=px.colors.sequential.Viridis)
-            fig.update_traces(textposition='inside', textinfo='percent+label')
-            st.plotly_chart(fig, use_container_width=True)
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("Total Budget", f"${budget:,.2f}")
+    with col2:
+        st.metric("Total Spent", f"${total_spent:,.2f}")
+    with col3:
+        remaining = budget - total_spent
+        st.metric("Remaining", f"${remaining:,.2f}", delta=f"{(remaining/budget)*100:.1f}%" if budget > 0 else "N/A")
 
-            # Display the cost table
-            st.dataframe(cost_df, use_container_width=True)
+# Expense visualization from the running category and daily totals
+@st.fragment
+def show_expense_charts(trip, expenses):
+    fig1, fig2 = expense_view(trip['id'], "charts", expenses, build_expense_charts)
 
-    if "tips" in trip and trip["tips"]:
-        st.header("Travel Tips")
-        for tip in trip["tips"]:
-            st.write(f"• {tip}")
+    col1, col2 = st.columns(2)
+    with TELEMETRY.span("render.plotly", chart="expenses"):
+        with col1:
+            st.plotly_chart(fig1, use_container_width=True)
+        with col2:
+            st.plotly_chart(fig2, use_container_width=True)
 
-    # Export button
-    if st.button("Export Trip Details (JSON)"):
-        trip_json = json.dumps(trip, indent=2)
-        st.download_button(
-            label="Download Trip JSON",
-            data=trip_json,
-            file_name=f"trip_to_{trip.get('destination', 'destination')}.json",
-            mime="application/json"
+@st.fragment
+def show_expense_table(trip, expenses):
+    # Display expense table, newest first with formatted dates and amounts
+    if len(expenses):
+        st.dataframe(
+            expense_view(trip['id'], "table", expenses, lambda expenses: expenses.table_frame(descending=True)),
+            use_container_width=True,
+            hide_index=True
         )
 
+        # Export expenses, written in chunks when a download is clicked
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.download_button(
+                label="Export Expenses (CSV)",
+                data=lambda: export_bytes(lambda sink: write_chunks(expense_csv_chunks(expenses), sink)),
+                file_name=export_file_name(trip, "csv", prefix="expenses"),
+                mime="text/csv",
+                on_click="ignore"
+            )
+        with col2:
+            st.download_button(
+                label="Export Expenses (NDJSON)",
+                data=lambda: export_bytes(lambda sink: write_chunks(expense_ndjson_chunks(expenses), sink)),
+                file_name=export_file_name(trip, "ndjson", prefix="expenses"),
+                mime="application/x-ndjson",
+                on_click="ignore"
+            )
+        with col3:
+            if parquet_available():
+                st.download_button(
+                    label="Export Expenses (Parquet)",
+                    data=lambda: export_bytes(lambda sink: write_expenses_parquet(expenses, sink)),
+                    file_name=export_file_name(trip, "parquet", prefix="expenses"),
+                    mime="application/vnd.apache.parquet",
+                    on_click="ignore"
+                )
+
+# Render the parts of a plan as they stream in, before the full layout is available
+class ProgressivePlanView:
+    def __init__(self, container):
+        self.container = container
+        self.itinerary_started = False
+
+    def __call__(self, event):
+        with self.container:
+            if event[0] == "day":
+                if not self.itinerary_started:
+                    st.header("Itinerary")
+                    self.itinerary_started = True
+                show_itinerary_day(event[1])
+            else:
+                _, key, value = event
+                if key == "costs" and value:
+                    # Keyed so the live chart does not clash with the final one
+                    show_costs(value, key="live_costs")
+                elif key in SECTION_RENDERERS and value:
+                    SECTION_RENDERERS[key](value)
+
+# The travel date saved with a trip, today when it has none
+def form_travel_date(trip):
+    try:
+        return datetime.strptime(trip["travel_date"], "%Y-%m-%d")
+    except (KeyError, TypeError, ValueError):
+        return datetime.now()
+
 # Plan Trip Tab
+# Spans the tab that is shown; not ended when the tab calls st.rerun()
+tab_span = TELEMETRY.start_span(f"tab.{st.session_state.active_tab}")
+
 if st.session_state.active_tab == "Plan":
     st.header("Plan Your Trip")
 
+    editing_trip = None
+    if st.session_state.editing_trip_id is not None and st.session_state.current_trip.get("id") == st.session_state.editing_trip_id:
+        editing_trip = st.session_state.current_trip
+        st.info(f"Editing your trip to {editing_trip.get('destination', 'Trip')}. Only the parts affected by your "
+                f"changes will be re-planned.")
+
     with st.form("trip_form"):
         destination = st.text_input("Destination", value=st.session_state.current_trip.get("destination", ""))
 
         col1, col2 = st.columns(2)
         with col1:
-            travel_date = st.date_input("Travel Date", value=datetime.now())
+            travel_date = st.date_input("Travel Date", value=form_travel_date(st.session_state.current_trip))
             duration = st.number_input("Duration (days)", min_value=1, max_value=30, value=st.session_state.current_trip.get("duration", 7))
         with col2:
             budget = st.text_input("Budget (USD)", value=st.session_state.current_trip.get("budget", "$1000"))
@@ -360,6 +893,10 @@ if st.session_state.active_tab == "Plan":
             default=st.session_state.current_trip.get("interests", ["Sightseeing", "Food & Culinary"])
         )
 
+        stream_plan = st.checkbox("Show the plan as it is generated", value=True)
+        background_plan = st.checkbox("Generate in the background and keep browsing", value=False)
+        segmented_plan = st.checkbox(f"Plan trips over {SEGMENTED_MIN_DAYS - 1} days in parallel segments", value=True)
+
         submit_button = st.form_submit_button("Generate Trip Plan")
 
     if submit_button:
@@ -378,55 +915,124 @@ if st.session_state.active_tab == "Plan":
                 "interests": interests
             }
 
-            with st.spinner("Generating your personalized trip plan..."):
-                trip_plan = get_recommendations(destination, duration, interests, budget, travelers)
-
-                if trip_plan:
-                    # Combine user input with AI recommendations
-                    full_trip = {**st.session_state.current_trip, **trip_plan}
-                    save_trip(full_trip)
-
-                    st.session_state.current_trip = full_trip
-                    st.success("Trip plan generated successfully!")
-
-                    # Display the generated plan
-                    st.markdown("---")
-                    show_trip_details(full_trip)
+            segmented = segmented_plan and duration >= SEGMENTED_MIN_DAYS
+            edited_trip = None
+            if editing_trip is not None:
+                with st.spinner("Updating your trip plan..."):
+                    edited_trip = get_replanned_trip(editing_trip, st.session_state.current_trip)
+
+            if edited_trip:
+                save_trip(edited_trip)
+                st.session_state.current_trip = edited_trip
+                st.session_state.editing_trip_id = None
+                st.success("Trip plan updated successfully!")
+
+                st.markdown("---")
+                show_trip_details(edited_trip)
+            elif background_plan:
+                if submit_plan_job(st.session_state.current_trip, segmented=segmented, editing_trip=editing_trip):
+                    # The job saves over the edited trip when it finishes
+                    st.session_state.editing_trip_id = None
+                    st.success(f"Queued a trip plan for {destination}. It will appear in My Trips when ready.")
+            else:
+                with st.spinner("Generating your personalized trip plan..."):
+                    if stream_plan:
+                        live_view = st.empty()
+                        trip_plan = get_recommendations(destination, duration, interests, budget, travelers,
+                                                        on_event=ProgressivePlanView(live_view.container()),
+                                                        segmented=segmented)
+                        live_view.empty()
+                    else:
+                        trip_plan = get_recommendations(destination, duration, interests, budget, travelers,
+                                                        segmented=segmented)
+
+                    if trip_plan:
+                        # Combine user input with AI recommendations
+                        full_trip = {**st.session_state.current_trip, **trip_plan}
+                        if editing_trip is not None:
+                            # Replace the edited trip rather than adding a new one
+                            full_trip["id"] = editing_trip["id"]
+                            if "created_at" in editing_trip:
+                                full_trip["created_at"] = editing_trip["created_at"]
+                            st.session_state.editing_trip_id = None
+                        save_trip(full_trip)
+
+                        st.session_state.current_trip = full_trip
+                        st.success("Trip plan generated successfully!")
+
+                        # Display the generated plan
+                        st.markdown("---")
+                        show_trip_details(full_trip)
+
+    # Batch planning from a CSV upload
+    with st.expander("Batch planning (CSV upload)"):
+        st.caption("Columns: destination, travel_date (YYYY-MM-DD), duration or end_date, budget, travelers, "
+                   "interests (separated by ';')")
+        batch_file = st.file_uploader("Trips CSV", type=["csv"])
+        col1, col2 = st.columns(2)
+        with col1:
+            batch_rate = st.number_input("Max model requests per second", min_value=0.1, max_value=20.0, value=1.0, step=0.1)
+        with col2:
+            batch_workers = st.number_input("Parallel requests", min_value=1, max_value=16, value=4)
+
+        if batch_file is not None and st.button("Plan All Trips"):
+            try:
+                batch_items = read_batch_csv(batch_file.getvalue())
+            except ValueError as e:
+                st.error(f"Error reading CSV: {e}")
+                batch_items = []
+
+            if batch_items:
+                progress = st.progress(0.0, text=f"Planning {len(batch_items)} trips...")
+                completed = []
+
+                def update_progress(result):
+                    completed.append(result)
+                    progress.progress(len(completed) / len(batch_items),
+                                      text=f"Planned {len(completed)} of {len(batch_items)} trips")
+
+                report = get_recommendations_batch(batch_items, rate=batch_rate, max_workers=int(batch_workers),
+                                                   on_result=update_progress)
+                if report:
+                    summary = report.summary()
+                    col1, col2, col3, col4 = st.columns(4)
+                    with col1:
+                        st.metric("Planned", f"{summary['succeeded']}/{summary['items']}")
+                    with col2:
+                        st.metric("Throughput", f"{summary['throughput_per_s'] * 60:.1f} trips/min")
+                    with col3:
+                        st.metric("Latency p50", f"{summary['latency_p50_s']:.1f}s")
+                    with col4:
+                        st.metric("Latency p95", f"{summary['latency_p95_s']:.1f}s")
+                    st.dataframe([
+                        {
+                            "destination": result.item["destination"],
+                            "status": "ok" if result.ok else f"failed: {result.error}",
+                            "latency_s": round(result.latency, 2),
+                            "attempts": result.attempts,
+                        }
+                        for result in report.results
+                    ], use_container_width=True, hide_index=True)
 
 # My Trips Tab
 elif st.session_state.active_tab == "Trips":
     st.header("My Trips")
+    if st.session_state.trip_store_user.startswith("link:"):
+        st.caption("Your trips are saved under this page's link. Bookmark it to find them again.")
 
     if not st.session_state.trips:
         st.info("You haven't planned any trips yet. Go to the 'Plan Trip' tab to create your first trip!")
     else:
-        # Create trip cards
-        for i, trip in enumerate(st.session_state.trips):
-            with st.container():
-                st.markdown(f"""
-                <div class='card'>
-                    <h3>{trip.get('destination', 'Trip')}</h3>
-                    <p><strong>Date:</strong> {trip.get('travel_date', 'Not specified')}</p>
-                    <p><strong>Duration:</strong> {trip.get('duration', 'N/A')} days</p>
-                </div>
-                """, unsafe_allow_html=True)
-
-                col1, col2 = st.columns(2)
-                with col1:
-                    if st.button(f"View Details", key=f"view_{i}"):
-                        st.session_state.current_trip = trip
-                        st.session_state.view_trip_details = True
-                with col2:
-                    if st.button(f"Edit Trip", key=f"edit_{i}"):
-                        st.session_state.current_trip = trip
-                        st.session_state.active_tab = "Plan"
-
-        if 'view_trip_details' in st.session_state and st.session_state.view_trip_details:
-            st.markdown("---")
-            show_trip_details(st.session_state.current_trip)
-            if st.button("Back to Trips List"):
-                st.session_state.view_trip_details = False
-                st.experimental_rerun()
+        # Every trip and all their expenses from the store, zipped in memory when clicked
+        trips = list(st.session_state.trips)
+        st.download_button(
+            label="Export All Trips (ZIP)",
+            data=lambda: export_bytes(lambda sink: write_trips_archive(sink, trips, get_trip_store())),
+            file_name=f"safarnama_trips_{datetime.now().strftime('%Y%m%d')}.zip",
+            mime="application/zip",
+            on_click="ignore"
+        )
+        show_trip_list()
 
 # Expense Tracker Tab
 elif st.session_state.active_tab == "Expenses":
@@ -441,118 +1047,40 @@ elif st.session_state.active_tab == "Expenses":
         selected_trip_idx = trip_options[selected_trip_name]
         selected_trip = st.session_state.trips[selected_trip_idx]
 
-        # Initialize expenses for this trip if not already done
-        if 'expenses' not in selected_trip:
-            selected_trip['expenses'] = generate_expense_data(selected_trip)
-            st.session_state.trips[selected_trip_idx] = selected_trip
-
-        # Display expense summary
-        total_spent = sum(expense['amount'] for expense in selected_trip['expenses'])
-        budget = float(selected_trip.get('budget', '0').replace('$', '').replace(',', ''))
-
-        col1, col2, col3 = st.columns(3)
-        with col1:
-            st.metric("Total Budget", f"${budget:,.2f}")
-        with col2:
-            st.metric("Total Spent", f"${total_spent:,.2f}")
-        with col3:
-            remaining = budget - total_spent
-            st.metric("Remaining", f"${remaining:,.2f}", delta=f"{(remaining/budget)*100:.1f}%" if budget > 0 else "N/A")
-
-        # Expense visualization
-        expense_data = pd.DataFrame(selected_trip['expenses'])
-
-        # Group by category
-        category_totals = expense_data.groupby('category')['amount'].sum().reset_index()
-
-        col1, col2 = st.columns(2)
-        with col1:
-            fig1 = px.pie(
-                category_totals,
-                values='amount',
-                names='category',
-                title='Expenses by Category',
-                color_discrete_sequence=px.colors.qualitative.Pastel1
-            )
-            fig1.update_traces(textposition='inside', textinfo='percent+label')
-            st.plotly_chart(fig1, use_container_width=True)
-
-        with col2:
-            # Group by date
-            expense_data['date'] = pd.to_datetime(expense_data['date'])
-            daily_totals = expense_data.groupby(expense_data['date'].dt.strftime('%Y-%m-%d'))['amount'].sum().reset_index()
-
-            fig2 = px.bar(
-                daily_totals,
-                x='date',
-                y='amount',
-                title='Daily Expenses',
-                labels={'date': 'Date', 'amount': 'Amount (USD)'},
-                color_discrete_sequence=['#2E86C1']
-            )
-            st.plotly_chart(fig2, use_container_width=True)
-
-        # Expense table with add/edit functionality
-        st.subheader("Expense Details")
-
-        # Add new expense form
-        with st.expander("Add New Expense"):
-            with st.form("add_expense_form"):
-                col1, col2 = st.columns(2)
-                with col1:
-                    new_date = st.date_input("Date", value=datetime.now())
-                    new_category = st.selectbox(
-                        "Category",
-                        ["Accommodation", "Food", "Transportation", "Activities", "Shopping", "Miscellaneous"]
-                    )
-                with col2:
-                    new_amount = st.number_input("Amount (USD)", min_value=0.0, step=0.01)
-                    new_description = st.text_input("Description")
-
-                add_expense = st.form_submit_button("Add Expense")
-
-                if add_expense:
-                    if not new_description:
-                        st.error("Please enter a description.")
-                    elif new_amount <= 0:
-                        st.error("Amount must be greater than 0.")
-                    else:
-                        new_expense = {
-                            "date": new_date.strftime("%Y-%m-%d"),
-                            "category": new_category,
-                            "description": new_description,
-                            "amount": float(new_amount),
-                            "trip_id": selected_trip.get("id")
-                        }
-
-                        selected_trip['expenses'].append(new_expense)
-                        st.session_state.trips[selected_trip_idx] = selected_trip
-                        st.success("Expense added successfully!")
-                        st.experimental_rerun()
-
-        # Display expense table
-        expense_df = pd.DataFrame(selected_trip['expenses'])
-        if not expense_df.empty:
-            expense_df = expense_df.sort_values(by='date', ascending=False)
-
-            # Convert date column to datetime for better display
-            expense_df['date'] = pd.to_datetime(expense_df['date']).dt.strftime('%Y-%m-%d')
-
-            # Format amount column
-            expense_df['amount'] = expense_df['amount'].apply(lambda x: f"${x:.2f}")
-
-            st.dataframe(
-                expense_df[['date', 'category', 'description', 'amount']],
-                use_container_width=True,
-                hide_index=True
-            )
-
-            # Export expenses
-            if st.button("Export Expenses (CSV)"):
-                csv = expense_df.to_csv(index=False)
-                st.download_button(
-                    label="Download CSV",
-                    data=csv,
-                    file_name=f"expenses_{selected_trip.get('destination')}.csv",
-                    mime="text/csv"
-                )
+        # Load expenses for this trip, generating sample data the first time
+        expenses = st.session_state.expense_tables.get(selected_trip['id'])
+        if expenses is None:
+            store = get_trip_store()
+            records = store.load_expenses(selected_trip['id'])
+            if records:
+                expenses = ExpenseColumns.from_records(records, trip_id=selected_trip['id'])
+            else:
+                expenses = generate_expense_columns(selected_trip)
+                store.add_expenses(selected_trip['id'], expenses.to_records())
+            st.session_state.expense_tables[selected_trip['id']] = expenses
+
+        show_expense_dashboard(selected_trip, expenses)
+
+tab_span.end()
+
+# Background jobs panel, polled every two seconds while anything is queued or running
+with background_jobs_area:
+    jobs_running = any(not job.finished for job in get_job_manager().jobs_for(st.session_state.session_id))
+    st.fragment(run_every=2 if jobs_running else None)(show_background_jobs)()
+
+script_span.end()
+
+# Span timings, token usage and cache hit rates for this process
+if show_performance:
+    with performance_area:
+        st.subheader("Performance")
+        span_stats = TELEMETRY.span_stats()
+        if span_stats:
+            st.dataframe(span_stats, hide_index=True, use_container_width=True,
+                         column_config={column: st.column_config.NumberColumn(format="%.1f")
+                                        for column in ("mean_ms", "p50_ms", "p95_ms", "last_ms")})
+        st.caption(f"Model: {TELEMETRY.counter_total('model_requests_total')} requests, "
+                   f"{TELEMETRY.counter_total('model_prompt_tokens_total'):,} prompt tokens, "
+                   f"{TELEMETRY.counter_total('model_response_tokens_total'):,} response tokens")
+        for cache, rates in TELEMETRY.cache_hit_rates().items():
+            st.caption(f"{cache} cache: {rates['hit_rate']:.0%} of {rates['hits'] + rates['misses']} lookups")
@@ -0,0 +1 @@
+# Headless performance benchmarks for app.py (see benchmarks/run.py).
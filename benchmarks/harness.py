@@ -0,0 +1,169 @@
+import contextlib
+import os
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from safarnama.expenses import EXPENSE_CATEGORIES, generate_expense_arrays
+from safarnama.fake_model import FakeModel, fake_plan
+
+APP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app.py")
+
+# Backend picked in the sidebar for every benchmark session
+BENCH_BACKEND = "Gemini Pro"
+
+
+def install_stub_model(latency=0.05, jitter=0.0, malformed_rate=0.0, seed=0):
+    """Replace genai.GenerativeModel with a FakeModel for this process.
+
+    Every model the app builds (one per model name in the client pool) shares
+    one random stream, so runs with the same seed see the same latencies and
+    the same fuzzed replies.
+    """
+    import google.generativeai as genai
+
+    shared = FakeModel(latency=latency, jitter=jitter, malformed_rate=malformed_rate, seed=seed)
+
+    class StubGenerativeModel:
+        def __init__(self, model_name="gemini-1.5-pro", system_instruction=None, **kwargs):
+            self.model_name = model_name
+            self.system_instruction = system_instruction
+
+        def generate_content(self, prompt, stream=False, **kwargs):
+            return shared.generate_content(prompt, stream=stream, system_instruction=self.system_instruction,
+                                           **kwargs)
+
+        def count_tokens(self, contents):
+            return shared.count_tokens(contents)
+
+    genai.GenerativeModel = StubGenerativeModel
+    genai.configure = lambda **kwargs: None
+    return shared
+
+
+@contextlib.contextmanager
+def isolated_app(data_dir=None):
+    """Point the app at fresh SQLite files and drop Streamlit's process-wide caches."""
+    import streamlit as st
+
+    with contextlib.ExitStack() as stack:
+        if data_dir is None:
+            data_dir = stack.enter_context(tempfile.TemporaryDirectory(prefix="safarnama-bench-"))
+        saved = {key: os.environ.get(key) for key in ("SAFARNAMA_DB", "SAFARNAMA_PLAN_CACHE", "SAFARNAMA_USER")}
+        os.environ["SAFARNAMA_DB"] = os.path.join(data_dir, "trips.sqlite3")
+        os.environ["SAFARNAMA_PLAN_CACHE"] = os.path.join(data_dir, "plans.sqlite3")
+        os.environ["SAFARNAMA_USER"] = "bench"
+        st.cache_resource.clear()
+        st.cache_data.clear()
+        try:
+            yield data_dir
+        finally:
+            st.cache_resource.clear()
+            st.cache_data.clear()
+            for key, value in saved.items():
+                if value is None:
+                    os.environ.pop(key, None)
+                else:
+                    os.environ[key] = value
+
+
+def bench_trip(index, duration=7):
+    destination = f"Bench City {index}"
+    start = datetime(2026, 1, 1) + timedelta(days=index % 365)
+    plan = fake_plan(f"plan for {destination} for {duration} days")
+    return {
+        "destination": destination,
+        "travel_date": start.strftime("%Y-%m-%d"),
+        "duration": duration,
+        "budget": "$5000",
+        "travelers": 2,
+        "interests": ["Sightseeing", "Food & Culinary"],
+        "created_at": (datetime(2026, 1, 1) + timedelta(minutes=index)).strftime("%Y-%m-%d %H:%M:%S"),
+        **plan,
+    }
+
+
+def seed_trips(count, duration=7):
+    """Save ``count`` generated trips for the bench user; returns them as loaded."""
+    from safarnama.storage import TripStore
+
+    store = TripStore(os.environ["SAFARNAMA_DB"])
+    try:
+        for index in range(count):
+            store.save_trip(bench_trip(index, duration), os.environ["SAFARNAMA_USER"])
+        return store.load_trips(os.environ["SAFARNAMA_USER"])
+    finally:
+        store.close()
+
+
+def seed_expenses(trip, count, seed=0):
+    """Store ``count`` deterministic sample expenses for ``trip``."""
+    from safarnama.storage import TripStore
+
+    # Sample expenses come at 2-4 a day, so stretch the trip until there are enough
+    long_trip = {**trip, "duration": max(1, count // 2)}
+    arrays = generate_expense_arrays([long_trip], seed=seed)
+    dates = [datetime.fromordinal(int(ordinal)).strftime("%Y-%m-%d") for ordinal in arrays["date"][:count]]
+    records = [
+        {"date": day, "category": EXPENSE_CATEGORIES[int(category)],
+         "description": f"{EXPENSE_CATEGORIES[int(category)]} expense in {trip['destination']}",
+         "amount": float(amount), "trip_id": trip["id"]}
+        for day, category, amount in zip(dates, arrays["category"][:count], arrays["amount"][:count])
+    ]
+    store = TripStore(os.environ["SAFARNAMA_DB"])
+    try:
+        store.add_expenses(trip["id"], records)
+    finally:
+        store.close()
+    return len(records)
+
+
+def by_label(elements, label):
+    for element in elements:
+        if element.label == label:
+            return element
+    raise LookupError(f"No element labelled {label!r}")
+
+
+def run_checked(at):
+    at.run()
+    if at.exception:
+        raise RuntimeError(f"app raised: {at.exception[0].message}")
+    return at
+
+
+def new_session(timeout=120, query_params=None):
+    """A fresh AppTest session with the benchmark backend selected, opened at a
+    URL with ``query_params`` when given."""
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(APP_PATH, default_timeout=timeout)
+    at.query_params.update(query_params or {})
+    at = run_checked(at)
+    by_label(at.selectbox, "Model").select(BENCH_BACKEND)
+    by_label(at.text_input, "Enter Gemini API Key").input("bench-key")
+    by_label(at.button, "Set API Key").click()
+    return run_checked(at)
+
+
+def navigate(at, label):
+    by_label(at.button, label).click()
+    return run_checked(at)
+
+
+def timed(fn):
+    started = time.perf_counter()
+    fn()
+    return (time.perf_counter() - started) * 1000
+
+
+def summarize(samples, unit="ms"):
+    ordered = sorted(samples)
+    return {
+        "unit": unit,
+        "samples": [round(sample, 3) for sample in samples],
+        "median": round(statistics.median(ordered), 3),
+        "p95": round(ordered[min(len(ordered) - 1, int(round(0.95 * (len(ordered) - 1))))], 3),
+        "min": round(ordered[0], 3),
+    }
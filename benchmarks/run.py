@@ -0,0 +1,120 @@
+"""Headless benchmarks for app.py, run through Streamlit's AppTest with a stub model.
+
+    python -m benchmarks.run --output results.json
+    python -m benchmarks.run --only my_trips expenses --trips 500 --expenses 50000
+    python -m benchmarks.run --compare baseline.json
+
+No API key or browser is needed: genai.GenerativeModel is replaced by
+safarnama.fake_model.FakeModel. Every AppTest interaction reruns the whole
+script (fragments included), so these are full-rerun times. Results are
+written as JSON (medians, p95 and raw samples in milliseconds, or tokens for
+the *_tokens metrics); with
+--compare the run exits with status 1 when a metric's median regressed by
+more than --tolerance.
+"""
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import time
+import warnings
+
+from benchmarks.harness import install_stub_model
+from benchmarks.scenarios import SCENARIOS, ROOT
+
+RESULTS_FORMAT = 1
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(baseline, current, tolerance, noise_floor_ms):
+    """Return (rows, regressions) comparing the medians of two result files."""
+    rows, regressions = [], []
+    for name, result in current["results"].items():
+        before = baseline.get("results", {}).get(name)
+        if before is None:
+            rows.append((name, None, result["median"], None))
+            continue
+        change = (result["median"] - before["median"]) / before["median"] if before["median"] else 0.0
+        rows.append((name, before["median"], result["median"], change))
+        if change > tolerance and result["median"] - before["median"] > noise_floor_ms:
+            regressions.append(name)
+    return rows, regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--only", nargs="+", choices=sorted(SCENARIOS), help="scenarios to run (default: all)")
+    parser.add_argument("--repeat", type=int, default=5, help="samples per metric")
+    parser.add_argument("--trips", type=int, default=500, help="saved trips for the My Trips scenario")
+    parser.add_argument("--expenses", type=int, default=50_000, help="expenses for the Expenses scenario")
+    parser.add_argument("--latency", type=float, default=0.05, help="stub model latency per request (s)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="stub model latency jitter (s)")
+    parser.add_argument("--malformed-rate", type=float, default=0.0,
+                        help="share of stub replies with broken JSON (exercises repair)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write results JSON here")
+    parser.add_argument("--compare", help="baseline results JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed median slowdown (0.25 = 25%%)")
+    parser.add_argument("--noise-floor-ms", type=float, default=5.0,
+                        help="ignore slowdowns smaller than this many milliseconds")
+    config = parser.parse_args(argv)
+
+    # AppTest and the app's deprecated calls are noisy on stderr
+    warnings.filterwarnings("ignore")
+    install_stub_model(latency=config.latency, jitter=config.jitter, malformed_rate=config.malformed_rate,
+                       seed=config.seed)
+
+    import streamlit
+
+    streamlit.config.set_option("logger.level", "error")
+    streamlit.logger.set_log_level("error")
+
+    report = {
+        "format": RESULTS_FORMAT,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "git_commit": git_commit(),
+        "python": platform.python_version(),
+        "streamlit": streamlit.__version__,
+        "config": {key: value for key, value in vars(config).items() if key not in ("output", "compare")},
+        "results": {},
+    }
+    for name in config.only or SCENARIOS:
+        started = time.perf_counter()
+        report["results"].update(SCENARIOS[name](config))
+        print(f"{name}: done in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+
+    for name, result in report["results"].items():
+        unit = result.get("unit", "ms")
+        print(f"{name:<28} median {result['median']:>9.1f} {unit:<6} p95 {result['p95']:>9.1f} {unit}")
+
+    if config.output:
+        with open(config.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if config.compare:
+        with open(config.compare) as f:
+            baseline = json.load(f)
+        rows, regressions = compare(baseline, report, config.tolerance, config.noise_floor_ms)
+        print(f"\nvs {config.compare} ({baseline.get('git_commit') or 'unknown commit'}):")
+        for name, before, after, change in rows:
+            unit = report["results"][name].get("unit", "ms")
+            if before is None:
+                print(f"{name:<28} {'new':>9}   -> {after:>9.1f} {unit}")
+            else:
+                flag = "  REGRESSION" if name in regressions else ""
+                print(f"{name:<28} {before:>9.1f} {unit} -> {after:>9.1f} {unit}  {change:+.0%}{flag}")
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,146 @@
+import json
+import os
+import subprocess
+import sys
+import time
+
+from benchmarks.harness import (by_label, install_stub_model, isolated_app, navigate, new_session, run_checked,
+                                seed_expenses, seed_trips, summarize, timed)
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def cold_start_once(latency=0.05):
+    """Time a first render in this (fresh) process; prints one JSON line."""
+    started = time.perf_counter()
+    from streamlit.testing.v1 import AppTest
+
+    from benchmarks.harness import APP_PATH
+
+    install_stub_model(latency=latency)
+    imported = time.perf_counter()
+    with isolated_app():
+        at = AppTest.from_file(APP_PATH, default_timeout=120)
+        first_run = timed(lambda: run_checked(at))
+    print(json.dumps({"import_ms": (imported - started) * 1000, "first_run_ms": first_run}))
+
+
+def cold_start(config):
+    """Script load and first render in a new Python process, imports included."""
+    first_runs, imports = [], []
+    for _ in range(config.repeat):
+        output = subprocess.run(
+            [sys.executable, "-c",
+             f"from benchmarks.scenarios import cold_start_once; cold_start_once(latency={config.latency!r})"],
+            cwd=ROOT, capture_output=True, text=True, check=True,
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        first_runs.append(result["first_run_ms"])
+        imports.append(result["import_ms"])
+    return {"cold_start_first_run": summarize(first_runs), "cold_start_harness_import": summarize(imports)}
+
+
+def _plan_once(index, widgets, duration=7):
+    at = new_session()
+    by_label(at.text_input, "Destination").input(f"Benchmark City {index}")
+    by_label(at.number_input, "Duration (days)").set_value(duration)
+    for label, value in widgets.items():
+        by_label(at.checkbox, label).set_value(value)
+    by_label(at.button, "Generate Trip Plan").click()
+    elapsed = timed(lambda: run_checked(at))
+    if not at.success:
+        raise RuntimeError("plan was not generated")
+    return elapsed
+
+
+def plan_end_to_end(config):
+    """Submit the Plan form and wait for the saved plan; fresh destination each time.
+
+    Also reports the model tokens (prompt plus response, as the stub model
+    counts them) each plan took.
+    """
+    from safarnama.planner import PLAN_METRICS
+
+    variants = {
+        "plan_one_shot": ({"Show the plan as it is generated": False}, 7),
+        "plan_streaming": ({"Show the plan as it is generated": True}, 7),
+        "plan_segmented": ({"Show the plan as it is generated": False,
+                            "Plan trips over 7 days in parallel segments": True}, 12),
+    }
+    results = {}
+    with isolated_app():
+        index = 0
+        for name, (widgets, duration) in variants.items():
+            samples, tokens = [], []
+            for _ in range(config.repeat):
+                tokens_before = PLAN_METRICS.prompt_tokens + PLAN_METRICS.response_tokens
+                samples.append(_plan_once(index, widgets, duration))
+                tokens.append(PLAN_METRICS.prompt_tokens + PLAN_METRICS.response_tokens - tokens_before)
+                index += 1
+            results[name] = summarize(samples)
+            results[f"{name}_tokens"] = summarize(tokens, unit="tokens")
+    return results
+
+
+def my_trips(config):
+    """My Trips with ``config.trips`` saved trips: open, rerun, search, view details."""
+    with isolated_app():
+        seed_trips(config.trips)
+        opened = []
+        for _ in range(config.repeat):
+            at = new_session()
+            opened.append(timed(lambda: navigate(at, "My Trips")))
+        reruns = [timed(lambda: run_checked(at)) for _ in range(config.repeat)]
+
+        searches = []
+        for i in range(config.repeat):
+            at.text_input(key="trip_query").input(f"city {i + 1}")
+            searches.append(timed(lambda: run_checked(at)))
+        at.text_input(key="trip_query").input("")
+        run_checked(at)
+
+        details = []
+        for _ in range(config.repeat):
+            by_label(at.button, "View Details").click()
+            details.append(timed(lambda: run_checked(at)))
+            by_label(at.button, "Hide Details").click()
+            run_checked(at)
+    return {
+        "my_trips_open": summarize(opened),
+        "my_trips_rerun": summarize(reruns),
+        "my_trips_search": summarize(searches),
+        "my_trips_view_details": summarize(details),
+    }
+
+
+def expenses(config):
+    """Expense Tracker with ``config.expenses`` expenses on the selected trip."""
+    with isolated_app():
+        trips = seed_trips(3)
+        seed_expenses(trips[0], config.expenses, seed=config.seed)
+        opened = []
+        for _ in range(config.repeat):
+            # A new session loads the trip's expenses from the store again
+            at = new_session()
+            opened.append(timed(lambda: navigate(at, "Expense Tracker")))
+        reruns = [timed(lambda: run_checked(at)) for _ in range(config.repeat)]
+
+        adds = []
+        for i in range(config.repeat):
+            by_label(at.text_input, "Description").input(f"Benchmark expense {i}")
+            by_label(at.number_input, "Amount (USD)").set_value(10.0 + i)
+            by_label(at.button, "Add Expense").click()
+            adds.append(timed(lambda: run_checked(at)))
+    return {
+        "expenses_open": summarize(opened),
+        "expenses_rerun": summarize(reruns),
+        "expenses_add": summarize(adds),
+    }
+
+
+SCENARIOS = {
+    "cold_start": cold_start,
+    "plan": plan_end_to_end,
+    "my_trips": my_trips,
+    "expenses": expenses,
+}
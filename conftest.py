@@ -0,0 +1 @@
+# Lets the tests import safarnama and benchmarks from the repository root
@@ -0,0 +1 @@
+# Core (UI-free) building blocks for the Safarनामा trip planner.
@@ -0,0 +1,201 @@
+import math
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from safarnama.fake_model import FakeModel
+from safarnama.prompts import PLAN_SYSTEM_INSTRUCTION
+from safarnama.schema import repair_json
+from safarnama.telemetry import TELEMETRY, LatencyHistogram
+
+
+class Backend:
+    """A named model with the GenerativeModel ``generate_content`` interface.
+
+    Wraps the real SDK model, a FakeModel or anything else with that method,
+    and records every call's latency in ``histogram``, plus a ``model.generate``
+    span and the reply's token usage in TELEMETRY.
+    """
+
+    def __init__(self, name, model):
+        self.name = name
+        self.model = model
+        self.histogram = LatencyHistogram()
+
+    @property
+    def model_name(self):
+        return self.name
+
+    @property
+    def max_concurrency(self):
+        return getattr(self.model, "max_concurrency", None)
+
+    def generate_content(self, prompt, stream=False, on_start=None, **kwargs):
+        started = [time.perf_counter()]
+
+        # Latency counts from when the model call really starts, not from any
+        # wait for a pooled client slot; ``on_start`` is told at that point too
+        def mark_started():
+            started[0] = time.perf_counter()
+            if on_start is not None:
+                on_start()
+
+        if getattr(self.model, "reports_start", False):
+            kwargs["on_start"] = mark_started
+        else:
+            mark_started()
+
+        if stream:
+            span = TELEMETRY.start_span("model.generate", backend=self.name, stream=True)
+            return self._timed_stream(self.model.generate_content(prompt, stream=True, **kwargs), started, span)
+        with TELEMETRY.span("model.generate", backend=self.name):
+            response = self.model.generate_content(prompt, **kwargs)
+            # Touch .text so responses that are still materializing count towards latency
+            response.text
+        self.histogram.observe(time.perf_counter() - started[0])
+        TELEMETRY.record_usage(self.name, getattr(response, "usage_metadata", None))
+        return response
+
+    def stats(self):
+        return {
+            "backend": self.name,
+            "calls": self.histogram.count,
+            "p50_s": self.histogram.quantile(0.5),
+            "p95_s": self.histogram.quantile(0.95),
+        }
+
+    def _timed_stream(self, chunks, started, span):
+        usage = None
+        for chunk in chunks:
+            usage = getattr(chunk, "usage_metadata", None) or usage
+            yield chunk
+        span.end()
+        self.histogram.observe(time.perf_counter() - started[0])
+        TELEMETRY.record_usage(self.name, usage)
+
+
+# A Gemini model whose client comes from a shared ClientPool
+def gemini_backend(model_name, pool, api_key):
+    return Backend(model_name, pool.model(api_key, model_name))
+
+
+def local_backend(latency=0.5, jitter=0.2, seed=None):
+    return Backend("local", FakeModel(latency=latency, jitter=jitter, seed=seed, model_name="local",
+                                      system_instruction=PLAN_SYSTEM_INSTRUCTION))
+
+
+# Replies the planner can repair locally count as valid too
+def is_valid_plan_response(response):
+    try:
+        return isinstance(repair_json(response.text), dict)
+    except ValueError:
+        return False
+
+
+class HedgedBackend:
+    """Send a request to ``primary`` and, if it has not produced a valid plan
+    after the hedge delay, also to ``fallback``; the first valid reply wins.
+
+    The delay is ``hedge_delay`` when set, otherwise the primary's observed
+    ``hedge_quantile`` latency once it has ``min_samples`` calls (capped at
+    ``max_delay``), else ``default_delay``. The delay starts once the primary
+    call is actually running, so waiting for a worker thread or a pooled
+    client slot does not trigger a hedge. Streaming requests go to the
+    primary only. The losing
+    request is left to finish in the background; its latency still feeds the
+    histograms.
+    """
+
+    _executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix="hedge")
+
+    def __init__(self, primary, fallback, hedge_delay=None, hedge_quantile=0.95, min_samples=20,
+                 default_delay=8.0, max_delay=60.0, validate=is_valid_plan_response):
+        self.primary = primary
+        self.fallback = fallback
+        self.hedge_delay = hedge_delay
+        self.hedge_quantile = hedge_quantile
+        self.min_samples = min_samples
+        self.default_delay = default_delay
+        self.max_delay = max_delay
+        self.validate = validate
+        self.requests = 0
+        self.hedges = 0
+        self.fallback_wins = 0
+        self._lock = threading.Lock()
+
+    @property
+    def model_name(self):
+        return f"{self.primary.model_name}|hedge:{self.fallback.model_name}"
+
+    @property
+    def max_concurrency(self):
+        return getattr(self.primary, "max_concurrency", None)
+
+    def current_delay(self):
+        if self.hedge_delay is not None:
+            return self.hedge_delay
+        if self.primary.histogram.count >= self.min_samples:
+            delay = self.primary.histogram.quantile(self.hedge_quantile)
+            # The histogram's overflow bucket reports infinity
+            if math.isfinite(delay):
+                return min(delay, self.max_delay)
+        return self.default_delay
+
+    def generate_content(self, prompt, stream=False, on_start=None, **kwargs):
+        if stream:
+            return self.primary.generate_content(prompt, stream=True, on_start=on_start, **kwargs)
+
+        with self._lock:
+            self.requests += 1
+        started = threading.Event()
+
+        def primary_started():
+            started.set()
+            if on_start is not None:
+                on_start()
+
+        future = self._executor.submit(self.primary.generate_content, prompt, on_start=primary_started, **kwargs)
+        future.add_done_callback(lambda _: started.set())
+        futures = {future: self.primary}
+        started.wait()
+        done, _ = wait(futures, timeout=self.current_delay())
+
+        errors = []
+        response = self._first_valid(done, futures, errors)
+        if response is not None:
+            return response
+
+        with self._lock:
+            self.hedges += 1
+        futures[self._executor.submit(self.fallback.generate_content, prompt, **kwargs)] = self.fallback
+        pending = set(futures) - done
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            response = self._first_valid(done, futures, errors)
+            if response is not None:
+                return response
+        raise errors[0]
+
+    def stats(self):
+        return {
+            "backend": self.model_name,
+            "requests": self.requests,
+            "hedges": self.hedges,
+            "fallback_wins": self.fallback_wins,
+            "hedge_delay_s": self.current_delay(),
+        }
+
+    def _first_valid(self, done, futures, errors):
+        for future in done:
+            try:
+                response = future.result()
+            except Exception as e:
+                errors.append(e)
+                continue
+            if self.validate(response):
+                if futures[future] is self.fallback:
+                    with self._lock:
+                        self.fallback_wins += 1
+                return response
+            errors.append(ValueError(f"{futures[future].name} returned an invalid plan"))
+        return None
@@ -0,0 +1,192 @@
+import csv
+import io
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+
+BATCH_CSV_COLUMNS = ("destination", "travel_date", "duration", "budget", "travelers", "interests")
+
+
+class TokenBucket:
+    """Thread-safe token bucket: ``rate`` tokens per second, up to ``capacity``."""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(1.0, rate))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class RateLimitedModel:
+    """A model whose every ``generate_content`` call first takes a token from ``bucket``.
+
+    Segmented plans and section re-requests make several calls per trip, so
+    throttling here caps model requests rather than trips.
+    """
+
+    def __init__(self, model, bucket):
+        self.model = model
+        self.bucket = bucket
+
+    def __getattr__(self, name):
+        return getattr(self.model, name)
+
+    def generate_content(self, prompt, stream=False, **kwargs):
+        self.bucket.acquire()
+        return self.model.generate_content(prompt, stream=stream, **kwargs)
+
+
+# The SDK raises google.api_core.exceptions.ResourceExhausted (HTTP 429) on quota errors
+def is_quota_error(error):
+    code = getattr(error, "code", None)
+    if callable(code):
+        code = code()
+    return (code == 429 or type(error).__name__ in ("ResourceExhausted", "TooManyRequests")
+            or "429" in str(error) or "quota" in str(error).lower())
+
+
+class BatchItemResult:
+    def __init__(self, index, item, plan=None, error=None, latency=0.0, attempts=0):
+        self.index = index
+        self.item = item
+        self.plan = plan
+        self.error = error
+        self.latency = latency
+        self.attempts = attempts
+
+    @property
+    def ok(self):
+        return self.error is None
+
+
+class BatchReport:
+    def __init__(self, results, wall_time):
+        self.results = results
+        self.wall_time = wall_time
+
+    @property
+    def succeeded(self):
+        return sum(1 for result in self.results if result.ok)
+
+    @property
+    def failed(self):
+        return len(self.results) - self.succeeded
+
+    @property
+    def throughput(self):
+        return len(self.results) / self.wall_time if self.wall_time else 0.0
+
+    def latency_percentile(self, percentile):
+        latencies = sorted(result.latency for result in self.results)
+        if not latencies:
+            return 0.0
+        return latencies[min(len(latencies) - 1, int(round(percentile / 100 * (len(latencies) - 1))))]
+
+    def summary(self):
+        return {
+            "items": len(self.results),
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "wall_time_s": self.wall_time,
+            "throughput_per_s": self.throughput,
+            "latency_p50_s": self.latency_percentile(50),
+            "latency_p95_s": self.latency_percentile(95),
+            "latency_max_s": self.latency_percentile(100),
+        }
+
+
+# Parse an uploaded batch CSV into planner inputs. Interests are separated by ";" or "|".
+def read_batch_csv(source):
+    if isinstance(source, bytes):
+        source = source.decode("utf-8-sig")
+    if isinstance(source, str):
+        source = io.StringIO(source)
+
+    items = []
+    for line_number, row in enumerate(csv.DictReader(source), start=2):
+        row = {(key or "").strip().lower(): (value or "").strip() for key, value in row.items()}
+        if not row.get("destination"):
+            raise ValueError(f"Line {line_number}: destination is required")
+        try:
+            travel_date = row.get("travel_date") or row.get("start_date") or datetime.now().strftime("%Y-%m-%d")
+            travel_date = datetime.strptime(travel_date, "%Y-%m-%d").strftime("%Y-%m-%d")
+            if row.get("duration"):
+                duration = int(row["duration"])
+            elif row.get("end_date"):
+                end_date = datetime.strptime(row["end_date"], "%Y-%m-%d")
+                duration = (end_date - datetime.strptime(travel_date, "%Y-%m-%d")).days + 1
+            else:
+                duration = 7
+            travelers = int(row.get("travelers") or 2)
+        except ValueError as e:
+            raise ValueError(f"Line {line_number}: {e}") from e
+        if not 1 <= duration <= 30:
+            raise ValueError(f"Line {line_number}: duration must be between 1 and 30 days")
+
+        interests = [i.strip() for i in row.get("interests", "").replace("|", ";").split(";") if i.strip()]
+        items.append({
+            "destination": row["destination"],
+            "travel_date": travel_date,
+            "duration": duration,
+            "budget": row.get("budget") or "$1000",
+            "travelers": travelers,
+            "interests": interests or ["Sightseeing"],
+        })
+    return items
+
+
+def _plan_item(index, item, plan_fn, bucket, max_retries, base_delay, max_delay):
+    started = time.perf_counter()
+    attempts = 0
+    while True:
+        attempts += 1
+        try:
+            plan = plan_fn(item, bucket)
+            return BatchItemResult(index, item, plan=plan, latency=time.perf_counter() - started, attempts=attempts)
+        except Exception as e:
+            if attempts > max_retries or not is_quota_error(e):
+                return BatchItemResult(index, item, error=e, latency=time.perf_counter() - started,
+                                       attempts=attempts)
+            # Exponential backoff with jitter before trying again
+            time.sleep(min(max_delay, base_delay * 2 ** (attempts - 1)) * random.uniform(0.5, 1.0))
+
+
+def plan_batch(items, plan_fn, max_workers=4, rate=1.0, burst=None, max_retries=4,
+               base_delay=1.0, max_delay=30.0, on_result=None):
+    """Plan many trips concurrently.
+
+    ``plan_fn(item, bucket)`` returns a plan dict for one set of inputs and
+    must take a token from ``bucket`` before every model request, e.g. by
+    wrapping its model in RateLimitedModel; ``bucket`` is shared by all items
+    and allows ``rate`` requests per second with ``burst`` capacity (it is
+    ``None`` when ``rate`` is ``None``, which disables throttling). Quota
+    errors are retried with exponential backoff. ``on_result`` is called from the calling thread as each item
+    finishes. Returns a BatchReport with results in input order.
+    """
+    bucket = TokenBucket(rate, burst) if rate else None
+    results = [None] * len(items)
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="batch-plan") as pool:
+        futures = [pool.submit(_plan_item, index, item, plan_fn, bucket, max_retries, base_delay, max_delay)
+                   for index, item in enumerate(items)]
+        for future in as_completed(futures):
+            result = future.result()
+            results[result.index] = result
+            if on_result is not None:
+                on_result(result)
+    return BatchReport(results, time.perf_counter() - started)
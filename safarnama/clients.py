@@ -0,0 +1,167 @@
+import hashlib
+import threading
+import time
+from contextlib import contextmanager
+
+
+# One GenerativeServiceClient per API key (its gRPC channel is what gets reused)
+# and a GenerativeModel per model name bound to it, instead of the process-global
+# genai.configure() client
+def gemini_client_factory(api_key):
+    from google.ai import generativelanguage as glm
+
+    return glm.GenerativeServiceClient(client_options={"api_key": api_key})
+
+
+def gemini_model_factory(client, model_name, system_instruction=None):
+    import google.generativeai as genai
+
+    model = genai.GenerativeModel(model_name, system_instruction=system_instruction)
+    model._client = client
+    return model
+
+
+def _key_id(api_key):
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:16]
+
+
+class _PooledKey:
+    def __init__(self, client, max_concurrency):
+        self.client = client
+        self.models = {}
+        self.semaphore = threading.BoundedSemaphore(max_concurrency)
+        self.in_use = 0
+        self.last_used = time.monotonic()
+
+
+class ClientPool:
+    """Process-wide pool of model clients keyed by API key and model name.
+
+    Every session using the same key shares one client connection, and at most
+    ``max_concurrency_per_key`` requests per key are in flight at a time. Keys
+    idle for longer than ``idle_ttl`` seconds are dropped (and rebuilt on next
+    use). Models are built with ``system_instruction`` when one is given.
+    """
+
+    def __init__(self, max_concurrency_per_key=8, idle_ttl=15 * 60,
+                 client_factory=gemini_client_factory, model_factory=gemini_model_factory,
+                 system_instruction=None):
+        self.max_concurrency_per_key = max_concurrency_per_key
+        self.idle_ttl = idle_ttl
+        self.client_factory = client_factory
+        self.model_factory = model_factory
+        self.system_instruction = system_instruction
+        self.created = 0
+        self.evicted = 0
+        self._keys = {}
+        self._lock = threading.Lock()
+
+    # A GenerativeModel-compatible handle that leases a pooled model per call
+    def model(self, api_key, model_name):
+        return PooledModel(self, api_key, model_name)
+
+    @contextmanager
+    def lease(self, api_key, model_name):
+        entry, model = self._checkout(api_key, model_name)
+        entry.semaphore.acquire()
+        try:
+            yield model
+        finally:
+            entry.semaphore.release()
+            with self._lock:
+                entry.in_use -= 1
+                entry.last_used = time.monotonic()
+
+    # Build clients ahead of the first request, optionally making a cheap call
+    # so the connection is already open
+    def warm_up(self, api_key, model_names, ping=True, background=True):
+        def run():
+            for model_name in model_names:
+                try:
+                    with self.lease(api_key, model_name) as model:
+                        if ping:
+                            model.count_tokens("ping")
+                except Exception:
+                    # Warm-up is best effort; the first real request will surface errors
+                    pass
+
+        if background:
+            threading.Thread(target=run, name="client-warm-up", daemon=True).start()
+        else:
+            run()
+
+    def evict_idle(self):
+        now = time.monotonic()
+        with self._lock:
+            stale = [key for key, entry in self._keys.items()
+                     if entry.in_use == 0 and now - entry.last_used > self.idle_ttl]
+            for key in stale:
+                del self._keys[key]
+            self.evicted += len(stale)
+        return len(stale)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "keys": len(self._keys),
+                "models": sum(len(entry.models) for entry in self._keys.values()),
+                "in_flight": sum(entry.in_use for entry in self._keys.values()),
+                "created": self.created,
+                "evicted": self.evicted,
+            }
+
+    def _checkout(self, api_key, model_name):
+        self.evict_idle()
+        key = _key_id(api_key)
+        with self._lock:
+            entry = self._keys.get(key)
+            if entry is None:
+                entry = _PooledKey(self.client_factory(api_key), self.max_concurrency_per_key)
+                self._keys[key] = entry
+                self.created += 1
+            model = entry.models.get(model_name)
+            if model is None:
+                if self.system_instruction is None:
+                    model = self.model_factory(entry.client, model_name)
+                else:
+                    model = self.model_factory(entry.client, model_name, self.system_instruction)
+                entry.models[model_name] = model
+            entry.in_use += 1
+            entry.last_used = time.monotonic()
+        return entry, model
+
+
+class PooledModel:
+    def __init__(self, pool, api_key, model_name):
+        self.pool = pool
+        self.model_name = model_name
+        self._api_key = api_key
+
+    # Requests beyond this many wait for a slot in the pool
+    @property
+    def max_concurrency(self):
+        return self.pool.max_concurrency_per_key
+
+    # generate_content calls ``on_start`` once it holds a slot, so Backend
+    # latencies leave out the wait for one
+    reports_start = True
+
+    def generate_content(self, prompt, stream=False, on_start=None, **kwargs):
+        if stream:
+            return self._stream(prompt, on_start, **kwargs)
+        with self.pool.lease(self._api_key, self.model_name) as model:
+            if on_start is not None:
+                on_start()
+            return model.generate_content(prompt, **kwargs)
+
+    def count_tokens(self, contents):
+        with self.pool.lease(self._api_key, self.model_name) as model:
+            return model.count_tokens(contents)
+
+    # Hold the lease (and the concurrency slot) until the stream is consumed
+    def _stream(self, prompt, on_start, **kwargs):
+        with self.pool.lease(self._api_key, self.model_name) as model:
+            if on_start is not None:
+                on_start()
+            for chunk in model.generate_content(prompt, stream=True, **kwargs):
+                yield chunk
@@ -0,0 +1,333 @@
+import csv
+import io
+import re
+
+import numpy as np
+
+from safarnama.expenses import EPOCH_ORDINAL, EXPENSE_CATEGORIES
+
+IMPORT_FIELDS = ("date", "amount", "description", "category", "credit")
+
+# Header names (lowercased) that banks and spreadsheet exports use for each field
+COLUMN_ALIASES = {
+    "date": ("date", "transaction date", "posted date", "posting date", "booking date", "value date",
+             "trans. date", "transaction_date", "day"),
+    "amount": ("amount", "amount (usd)", "transaction amount", "value", "debit amount", "debit", "withdrawal",
+               "withdrawals", "paid out", "money out", "spent", "cost"),
+    "description": ("description", "details", "memo", "narrative", "payee", "merchant", "name",
+                    "transaction description", "reference", "particulars", "item"),
+    "category": ("category", "type", "expense category"),
+    # A credit amount next to a debit column, or a debit/credit marker
+    "credit": ("credit", "credits", "credit amount", "deposit", "deposits", "paid in", "money in",
+               "debit/credit", "credit/debit", "dr/cr", "cr/dr"),
+}
+
+# Values of a credit column that mark a row as a credit rather than an amount
+CREDIT_MARKERS = ("cr", "c", "credit", "deposit", "in")
+
+# Keywords per category, matched as whole words against the lowercased
+# category and description of each row; the leftmost match wins
+CATEGORY_KEYWORDS = {
+    "Accommodation": ("hotel", "hotels", "hostel", "motel", "inn", "resort", "lodge", "lodging", "airbnb",
+                      "booking.com", "expedia", "guesthouse", "guest house", "b&b", "bnb", "ryokan",
+                      "accommodation"),
+    "Food": ("restaurant", "restaurants", "cafe", "café", "coffee", "starbucks", "bar", "pub", "bistro",
+             "bakery", "pizza", "pizzeria", "burger", "sushi", "ramen", "mcdonald's", "mcdonalds", "kfc",
+             "grocery", "groceries", "supermarket", "deli", "food", "dining", "lunch", "dinner", "breakfast",
+             "brunch", "tea", "eatery", "uber eats", "ubereats", "deliveroo", "doordash", "snack", "snacks",
+             "drinks", "wine"),
+    "Transportation": ("uber", "lyft", "taxi", "cab", "bolt", "grab", "train", "rail", "railway", "metro",
+                       "subway", "bus", "tram", "ferry", "airline", "airlines", "airways", "flight", "flights",
+                       "airport", "fuel", "gas station", "petrol", "parking", "toll", "car rental", "car hire",
+                       "rent-a-car", "hertz", "avis", "transit", "transport", "transportation", "scooter", "bike rental"),
+    "Activities": ("museum", "tour", "tours", "ticket", "tickets", "park", "zoo", "aquarium", "gallery",
+                   "theatre", "theater", "cinema", "concert", "show", "spa", "excursion", "admission",
+                   "entry", "entrance", "attraction", "safari", "diving", "snorkeling", "hike", "hiking",
+                   "activities", "activity", "entertainment"),
+    "Shopping": ("shop", "shopping", "store", "mall", "amazon", "boutique", "souvenir", "souvenirs", "gift",
+                 "gifts", "clothing", "apparel", "outlet", "duty free", "market", "bazaar"),
+}
+
+# Date formats tried on the first chunk; the one that parses the most rows is used for the file
+DATE_FORMATS = ("%Y-%m-%d", "%d/%m/%Y", "%m/%d/%Y", "%d.%m.%Y", "%Y/%m/%d", "%d-%m-%Y", "%m-%d-%Y",
+                "%d %b %Y", "%b %d, %Y", "%d/%m/%y", "%m/%d/%y", "%Y%m%d")
+
+_CATEGORY_CODES = {category.lower(): code for code, category in enumerate(EXPENSE_CATEGORIES)}
+MISCELLANEOUS = EXPENSE_CATEGORIES.index("Miscellaneous")
+
+
+class ExpenseCategorizer:
+    """Maps free-text descriptions to EXPENSE_CATEGORIES codes.
+
+    All keywords are compiled into one alternation, and each distinct text is
+    matched once no matter how often it repeats in a file.
+    """
+
+    def __init__(self, keywords=CATEGORY_KEYWORDS):
+        self.codes = {}
+        for category, words in keywords.items():
+            for word in words:
+                self.codes.setdefault(word, EXPENSE_CATEGORIES.index(category))
+        # Longest first, so "car rental" wins over "rent" at the same position
+        alternation = "|".join(re.escape(word) for word in sorted(self.codes, key=len, reverse=True))
+        self.pattern = re.compile(rf"(?<!\w)({alternation})(?!\w)")
+
+    def categorize(self, texts):
+        """Return an int8 array of category codes, Miscellaneous where nothing matches."""
+        import pandas as pd
+
+        labels, uniques = pd.factorize(pd.Series(texts, dtype=object).fillna(""))
+        matched = pd.Series(uniques, dtype=object).str.lower().str.extract(self.pattern, expand=False)
+        unique_codes = matched.map(self.codes).fillna(MISCELLANEOUS).to_numpy(dtype=np.int8)
+        return unique_codes[labels]
+
+
+DEFAULT_CATEGORIZER = ExpenseCategorizer()
+
+
+class ExpenseImport:
+    """Parsed, categorized and deduplicated rows of an expense file.
+
+    Columns are arrays in file order: ``date`` ordinals, ``category`` codes,
+    ``description`` strings and ``amount`` in dollars; the counters say why
+    rows were left out.
+    """
+
+    def __init__(self, date, category, description, amount, rows_read=0, invalid=0, credits=0, refunds=0,
+                 duplicates=0):
+        self.date = date
+        self.category = category
+        self.description = description
+        self.amount = amount
+        self.rows_read = rows_read
+        self.invalid = invalid
+        self.credits = credits
+        self.refunds = refunds
+        self.duplicates = duplicates
+
+    def __len__(self):
+        return len(self.amount)
+
+    def to_records(self, trip_id=None):
+        dates = np.datetime_as_string((self.date.astype(np.int64) - EPOCH_ORDINAL).astype("datetime64[D]"), unit="D")
+        return [
+            {"date": day, "category": EXPENSE_CATEGORIES[category], "description": description,
+             "amount": amount, "trip_id": trip_id}
+            for day, category, description, amount in zip(dates.tolist(), self.category.tolist(),
+                                                           self.description.tolist(), self.amount.tolist())
+        ]
+
+    def summary(self):
+        skipped = []
+        if self.duplicates:
+            skipped.append(f"{self.duplicates} duplicates")
+        if self.credits:
+            skipped.append(f"{self.credits} credits")
+        if self.refunds:
+            skipped.append(f"{self.refunds} refunds (negative amounts)")
+        if self.invalid:
+            skipped.append(f"{self.invalid} rows without a valid date or amount")
+        text = f"Imported {len(self)} of {self.rows_read} rows"
+        return text + (f" (skipped {', '.join(skipped)})" if skipped else "")
+
+
+def _text_source(source):
+    if isinstance(source, bytes):
+        return io.StringIO(source.decode("utf-8-sig"))
+    if isinstance(source, str):
+        return open(source, newline="", encoding="utf-8-sig")
+    return source
+
+
+# Delimiter and header of a CSV, read from its first line
+def read_header(source):
+    if isinstance(source, bytes):
+        first_line = source.split(b"\n", 1)[0].decode("utf-8-sig")
+    elif isinstance(source, str):
+        with open(source, newline="", encoding="utf-8-sig") as handle:
+            first_line = handle.readline()
+    else:
+        # Leave file objects where they were, for the full read that follows
+        position = source.tell()
+        first_line = source.readline()
+        source.seek(position)
+    try:
+        delimiter = csv.Sniffer().sniff(first_line, delimiters=",;\t|").delimiter
+    except csv.Error:
+        delimiter = ","
+    return delimiter, [column.strip() for column in next(csv.reader([first_line], delimiter=delimiter), [])]
+
+
+def guess_columns(header):
+    """Map each of IMPORT_FIELDS to a header column, or None when there is no likely one."""
+    lowered = {column.strip().lower(): column for column in header}
+    mapping = {}
+    for field in IMPORT_FIELDS:
+        mapping[field] = next((lowered[alias] for alias in COLUMN_ALIASES[field] if alias in lowered), None)
+    return mapping
+
+
+def parse_amounts(values):
+    """Vectorized "$1,234.50" / "(12.00)" / "-3,50" / "12.00-" parsing to floats (NaN when invalid)."""
+    import pandas as pd
+
+    text = pd.Series(values, dtype=object).fillna("").astype(str).str.strip()
+    negative = ((text.str.startswith("(") & text.str.endswith(")")) | text.str.startswith("-")
+                | text.str.endswith("-") | text.str.contains("−", regex=False)).to_numpy()
+    digits = text.str.replace(r"[^0-9.,]", "", regex=True)
+    # A comma followed by one or two final digits is a decimal comma: 1.234,56
+    decimal_comma = digits.str.contains(r",\d{1,2}$", regex=True)
+    digits = digits.where(~decimal_comma, digits.str.replace(".", "", regex=False).str.replace(",", ".", regex=False))
+    digits = digits.str.replace(",", "", regex=False)
+    amounts = pd.to_numeric(digits, errors="coerce").to_numpy(dtype=np.float64)
+    return np.where(negative, -amounts, amounts)
+
+
+def pick_date_format(values):
+    import pandas as pd
+
+    sample = pd.Series(values[:500], dtype=object).astype(str).str.strip()
+    best, best_parsed = DATE_FORMATS[0], -1
+    for date_format in DATE_FORMATS:
+        parsed = pd.to_datetime(sample, format=date_format, errors="coerce").notna().sum()
+        if parsed > best_parsed:
+            best, best_parsed = date_format, parsed
+    return best
+
+
+def parse_dates(values, date_format):
+    """Vectorized date parsing to int32 ordinals; -1 where a value does not parse."""
+    import pandas as pd
+
+    text = pd.Series(values, dtype=object).astype(str).str.strip()
+    # Drop a time of day ("2026-03-01 14:05" or "2026-03-01T14:05:00") for the date-only formats
+    if " " not in date_format:
+        text = text.str.split(r"[ T]\d", n=1, regex=True).str[0]
+    parsed = pd.to_datetime(text, format=date_format, errors="coerce")
+    days = parsed.to_numpy(dtype="datetime64[D]")
+    ordinals = np.full(len(days), -1, dtype=np.int64)
+    valid = ~np.isnat(days)
+    ordinals[valid] = days[valid].astype(np.int64) + EPOCH_ORDINAL
+    return ordinals.astype(np.int32)
+
+
+def _dedup_keys(date, amount, description):
+    import pandas as pd
+
+    frame = pd.DataFrame({
+        "date": date,
+        "cents": np.round(amount * 100).astype(np.int64),
+        "description": pd.Series(description, dtype=object).str.strip().str.lower().to_numpy(),
+    })
+    # Number repeats of the same expense, so two identical coffees on one day
+    # are both kept but importing the same file twice adds nothing
+    frame["occurrence"] = frame.groupby(["date", "cents", "description"], sort=False).cumcount()
+    return pd.MultiIndex.from_frame(frame)
+
+
+# Rows whose credit column holds a credit marker or a non-zero amount
+def _credit_rows(values):
+    text = values.str.strip().str.lower()
+    amounts = parse_amounts(text.to_numpy())
+    return text.isin(CREDIT_MARKERS).to_numpy() | (np.isfinite(amounts) & (amounts != 0))
+
+
+def import_expenses_csv(source, columns=None, existing=None, chunk_size=50_000, categorizer=DEFAULT_CATEGORIZER,
+                        date_format=None, bank_statement=False):
+    """Read an expense CSV (or bank export) in chunks into an ExpenseImport.
+
+    ``source`` is bytes, a path or a text file object. ``columns`` maps
+    IMPORT_FIELDS to header names (guess_columns by default); date, amount
+    and description are required. Rows with a known category keep it, the
+    rest are categorized from their text.
+
+    Amounts are expenses and negative ones are refunds, which are skipped.
+    With a credit column the rows it marks are skipped as credits and the
+    rest are debits whatever their sign. With ``bank_statement`` and no
+    credit column, negative amounts are the spending and positive ones are
+    credits. Rows already
+    in ``existing`` (an ExpenseColumns) are dropped as duplicates; a row
+    repeated within the file only counts as one when ``existing`` has it
+    that many times too.
+    """
+    import pandas as pd
+
+    delimiter, header = read_header(source)
+    columns = dict(columns or guess_columns(header))
+    missing = [field for field in ("date", "amount", "description") if not columns.get(field)]
+    if missing:
+        raise ValueError(f"Choose a column for: {', '.join(missing)}")
+    usecols = [columns[field] for field in IMPORT_FIELDS if columns.get(field)]
+    unknown = [column for column in usecols if column not in header]
+    if unknown:
+        raise ValueError(f"Columns not in the file: {', '.join(unknown)}")
+
+    handle = _text_source(source)
+    dates, categories, descriptions, amounts, credit_rows = [], [], [], [], []
+    rows_read = 0
+    try:
+        reader = pd.read_csv(handle, sep=delimiter, usecols=usecols, dtype=str, keep_default_na=False,
+                             chunksize=chunk_size, skipinitialspace=True)
+        for chunk in reader:
+            rows_read += len(chunk)
+            if date_format is None:
+                date_format = pick_date_format(chunk[columns["date"]].to_numpy())
+            dates.append(parse_dates(chunk[columns["date"]].to_numpy(), date_format))
+            amounts.append(parse_amounts(chunk[columns["amount"]].to_numpy()))
+            if columns.get("credit"):
+                credit_rows.append(_credit_rows(chunk[columns["credit"]]))
+            text = chunk[columns["description"]].str.strip()
+            descriptions.append(text.to_numpy(dtype=object))
+
+            if columns.get("category"):
+                given = chunk[columns["category"]].str.strip()
+                codes = given.str.lower().map(_CATEGORY_CODES)
+                unmatched = codes.isna().to_numpy()
+                codes = codes.fillna(MISCELLANEOUS).to_numpy(dtype=np.int8)
+                if unmatched.any():
+                    # Bank categories like "Restaurants" or "Travel" still help the matcher
+                    codes[unmatched] = categorizer.categorize((given[unmatched] + " " + text[unmatched]).to_numpy())
+            else:
+                codes = categorizer.categorize(text.to_numpy())
+            categories.append(codes)
+    finally:
+        if handle is not source:
+            handle.close()
+
+    if not rows_read:
+        return ExpenseImport(np.empty(0, np.int32), np.empty(0, np.int8), np.empty(0, object), np.empty(0))
+
+    date = np.concatenate(dates)
+    category = np.concatenate(categories)
+    description = np.concatenate(descriptions)
+    amount = np.concatenate(amounts)
+
+    if credit_rows:
+        is_credit = np.concatenate(credit_rows)
+        # A debit column may be empty on credit rows; those are credits, not invalid
+        valid = (date >= 0) & ((np.isfinite(amount) & (amount != 0)) | is_credit)
+        is_credit &= valid
+        amount = np.abs(amount)
+        is_refund = np.zeros(len(amount), dtype=bool)
+    else:
+        valid = (date >= 0) & np.isfinite(amount) & (amount != 0)
+        if bank_statement:
+            is_credit, is_refund = valid & (amount > 0), np.zeros(len(amount), dtype=bool)
+            amount = -amount
+        else:
+            is_credit, is_refund = np.zeros(len(amount), dtype=bool), valid & (amount < 0)
+    credits, refunds = int(is_credit.sum()), int(is_refund.sum())
+    invalid = rows_read - int(valid.sum())
+    valid &= ~is_credit & ~is_refund
+    date, category, description = date[valid], category[valid], description[valid]
+    amount = np.round(amount[valid], 2)
+
+    keys = _dedup_keys(date, amount, description)
+    if existing is not None and len(existing):
+        existing_descriptions = np.array(existing.descriptions, dtype=object)[existing.description]
+        new = ~keys.isin(_dedup_keys(existing.date, existing.amount, existing_descriptions))
+    else:
+        new = np.ones(len(keys), dtype=bool)
+
+    return ExpenseImport(date[new], category[new], description[new], amount[new], rows_read=rows_read,
+                         invalid=invalid, credits=credits, refunds=refunds, duplicates=int((~new).sum()))
@@ -0,0 +1,343 @@
+import datetime as dt
+import sys
+
+import numpy as np
+
+EXPENSE_CATEGORIES = ["Accommodation", "Food", "Transportation", "Activities", "Shopping", "Miscellaneous"]
+
+# Sample amount ranges per category, in EXPENSE_CATEGORIES order. Accommodation
+# is replaced per trip by 10-30% of the budget spread over the trip's days.
+SAMPLE_AMOUNT_LOW = np.array([0.0, 10.0, 5.0, 15.0, 10.0, 5.0])
+SAMPLE_AMOUNT_HIGH = np.array([0.0, 100.0, 80.0, 150.0, 200.0, 50.0])
+ACCOMMODATION_SHARE = (0.1, 0.3)
+
+
+def parse_budget(budget, default=1000.0):
+    try:
+        return float(str(budget).replace("$", "").replace(",", ""))
+    except ValueError:
+        return default
+
+
+class ExpenseRollup:
+    """Running totals for one trip's expenses.
+
+    Updated in O(1) per added expense so the Expense Tracker can draw its
+    metrics and charts without rescanning every row on each rerun.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.by_category = {}
+        self.by_day = {}
+        # Bumped on every change so callers can memoize anything derived from it
+        self.version = 0
+
+    @classmethod
+    def from_expenses(cls, expenses):
+        rollup = cls()
+        rollup.extend(expenses)
+        return rollup
+
+    # Build the totals for whole columns at once (see ExpenseColumns)
+    @classmethod
+    def from_columns(cls, date_ordinals, category_codes, amounts):
+        rollup = cls()
+        rollup.count = len(amounts)
+        rollup.total = float(amounts.sum())
+
+        counts = np.bincount(category_codes, minlength=len(EXPENSE_CATEGORIES))
+        sums = np.bincount(category_codes, weights=amounts, minlength=len(EXPENSE_CATEGORIES))
+        rollup.by_category = {EXPENSE_CATEGORIES[code]: float(sums[code]) for code in np.flatnonzero(counts)}
+
+        days, inverse = np.unique(date_ordinals, return_inverse=True)
+        day_sums = np.bincount(inverse, weights=amounts, minlength=len(days))
+        labels = np.datetime_as_string((days.astype(np.int64) - EPOCH_ORDINAL).astype("datetime64[D]"), unit="D")
+        rollup.by_day = dict(zip(labels.tolist(), day_sums.tolist()))
+        rollup.version = 1 if rollup.count else 0
+        return rollup
+
+    def add(self, expense):
+        amount = float(expense["amount"])
+        day = str(expense["date"])[:10]
+        category = expense["category"]
+        self.count += 1
+        self.total += amount
+        self.by_category[category] = self.by_category.get(category, 0.0) + amount
+        self.by_day[day] = self.by_day.get(day, 0.0) + amount
+        self.version += 1
+
+    def extend(self, expenses):
+        for expense in expenses:
+            self.add(expense)
+
+    # Add whole columns at once, as for a bulk import
+    def extend_columns(self, date_ordinals, category_codes, amounts):
+        if not len(amounts):
+            return
+        other = ExpenseRollup.from_columns(date_ordinals, category_codes, amounts)
+        self.count += other.count
+        self.total += other.total
+        for category, amount in other.by_category.items():
+            self.by_category[category] = self.by_category.get(category, 0.0) + amount
+        for day, amount in other.by_day.items():
+            self.by_day[day] = self.by_day.get(day, 0.0) + amount
+        self.version += 1
+
+    # Columns for the category pie chart, sorted by category name
+    def category_totals(self):
+        categories = sorted(self.by_category)
+        return {"category": categories, "amount": [self.by_category[c] for c in categories]}
+
+    # Columns for the daily bar chart, in date order
+    def daily_totals(self):
+        days = sorted(self.by_day)
+        return {"date": days, "amount": [self.by_day[d] for d in days]}
+
+
+# Ordinal (as in date.toordinal()) of the Unix epoch
+EPOCH_ORDINAL = dt.date(1970, 1, 1).toordinal()
+
+
+class ExpenseColumns:
+    """Compact columnar storage for one trip's expenses.
+
+    Amounts are a float64 array, dates an int32 array of proleptic Gregorian
+    ordinals, categories int8 codes into EXPENSE_CATEGORIES and descriptions
+    int32 codes into a list of interned strings. Arrays grow by doubling, so
+    appends are amortized O(1), and a rollup is kept up to date alongside.
+    """
+
+    def __init__(self, trip_id=None, capacity=64):
+        self.trip_id = trip_id
+        self.rollup = ExpenseRollup()
+        self.descriptions = []
+        self._description_codes = {}
+        self._category_codes = {category: code for code, category in enumerate(EXPENSE_CATEGORIES)}
+        self._size = 0
+        self._amount = np.empty(capacity, dtype=np.float64)
+        self._date = np.empty(capacity, dtype=np.int32)
+        self._category = np.empty(capacity, dtype=np.int8)
+        self._description = np.empty(capacity, dtype=np.int32)
+
+    @classmethod
+    def from_records(cls, expenses, trip_id=None):
+        expenses = list(expenses)
+        columns = cls(trip_id=trip_id, capacity=max(len(expenses), 64))
+        columns.extend(expenses)
+        return columns
+
+    # Wrap already-built columns; description_codes index into descriptions
+    @classmethod
+    def from_arrays(cls, date_ordinals, category_codes, description_codes, descriptions, amounts, trip_id=None):
+        size = len(amounts)
+        columns = cls(trip_id=trip_id, capacity=max(size, 64))
+        columns._amount[:size] = amounts
+        columns._date[:size] = date_ordinals
+        columns._category[:size] = category_codes
+        columns._description[:size] = description_codes
+        columns._size = size
+        for text in descriptions:
+            columns._intern(text)
+        columns.rollup = ExpenseRollup.from_columns(columns.date, columns.category, columns.amount)
+        return columns
+
+    def __len__(self):
+        return self._size
+
+    # Read-only views over the filled part of each column
+    @property
+    def amount(self):
+        return self._amount[:self._size]
+
+    @property
+    def date(self):
+        return self._date[:self._size]
+
+    @property
+    def category(self):
+        return self._category[:self._size]
+
+    @property
+    def description(self):
+        return self._description[:self._size]
+
+    def append(self, expense):
+        self._reserve(self._size + 1)
+        i = self._size
+        self._amount[i] = float(expense["amount"])
+        self._date[i] = dt.date.fromisoformat(str(expense["date"])[:10]).toordinal()
+        self._category[i] = self._category_code(expense["category"])
+        self._description[i] = self._intern(expense["description"])
+        self._size += 1
+        self.rollup.add(expense)
+
+    def extend(self, expenses):
+        for expense in expenses:
+            self.append(expense)
+
+    # Append many rows at once; descriptions are strings, interned here
+    def extend_columns(self, date_ordinals, category_codes, descriptions, amounts):
+        import pandas as pd
+
+        size = len(amounts)
+        if not size:
+            return
+        labels, uniques = pd.factorize(pd.Series(descriptions, dtype=object))
+        codes = np.array([self._intern(text) for text in uniques], dtype=np.int32)
+
+        self._reserve(self._size + size)
+        end = self._size + size
+        self._amount[self._size:end] = amounts
+        self._date[self._size:end] = date_ordinals
+        self._category[self._size:end] = category_codes
+        self._description[self._size:end] = codes[labels]
+        self._size = end
+        self.rollup.extend_columns(np.asarray(date_ordinals), np.asarray(category_codes), np.asarray(amounts))
+
+    def to_records(self):
+        dates = np.datetime_as_string(self.date_values(), unit="D")
+        return [
+            {
+                "date": str(day),
+                "category": EXPENSE_CATEGORIES[category],
+                "description": self.descriptions[description],
+                "amount": float(amount),
+                "trip_id": self.trip_id,
+            }
+            for day, category, description, amount in zip(dates, self.category.tolist(),
+                                                           self.description.tolist(), self.amount.tolist())
+        ]
+
+    def date_values(self):
+        return (self.date.astype(np.int64) - EPOCH_ORDINAL).astype("datetime64[D]")
+
+    # DataFrame view of rows start:stop: amount shares memory with the array,
+    # categories and descriptions become Categoricals over the existing codes
+    def to_frame(self, start=0, stop=None):
+        import pandas as pd
+
+        rows = slice(start, stop)
+        return pd.DataFrame({
+            "date": (self.date[rows].astype(np.int64) - EPOCH_ORDINAL).astype("datetime64[D]"),
+            "category": pd.Categorical.from_codes(self.category[rows], categories=EXPENSE_CATEGORIES),
+            "description": pd.Categorical.from_codes(self.description[rows],
+                                                     categories=self._description_categories()),
+            "amount": self.amount[rows],
+        }, copy=False)
+
+    def to_csv(self, path_or_buf=None):
+        return self.to_frame().to_csv(path_or_buf, index=False, date_format="%Y-%m-%d")
+
+    # Rows for the expense table: newest first, with dates and amounts pre-formatted
+    def table_frame(self, descending=True):
+        import pandas as pd
+
+        order = np.argsort(self.date, kind="stable")
+        if descending:
+            order = order[::-1]
+        return pd.DataFrame({
+            "date": np.datetime_as_string(self.date_values()[order], unit="D"),
+            "category": pd.Categorical.from_codes(self.category[order], categories=EXPENSE_CATEGORIES),
+            "description": pd.Categorical.from_codes(self.description[order],
+                                                     categories=self._description_categories()),
+            "amount": np.char.mod("$%.2f", self.amount[order]),
+        })
+
+    # Bytes held by the filled part of the columns plus the interned descriptions
+    def memory_usage(self):
+        columns = self.amount.nbytes + self.date.nbytes + self.category.nbytes + self.description.nbytes
+        return columns + sum(sys.getsizeof(text) for text in self.descriptions)
+
+    def _description_categories(self):
+        # Categorical needs unique categories; interning already guarantees that
+        return self.descriptions if self.descriptions else [""]
+
+    def _category_code(self, category):
+        code = self._category_codes.get(category)
+        if code is None:
+            raise ValueError(f"Unknown expense category: {category!r}")
+        return code
+
+    def _intern(self, text):
+        text = str(text)
+        code = self._description_codes.get(text)
+        if code is None:
+            code = len(self.descriptions)
+            self.descriptions.append(text)
+            self._description_codes[text] = code
+        return code
+
+    def _reserve(self, size):
+        capacity = len(self._amount)
+        if size <= capacity:
+            return
+        while capacity < size:
+            capacity *= 2
+        for name in ("_amount", "_date", "_category", "_description"):
+            old = getattr(self, name)
+            new = np.empty(capacity, dtype=old.dtype)
+            new[:self._size] = old[:self._size]
+            setattr(self, name, new)
+
+
+def generate_expense_arrays(trips, seed=None):
+    """Generate sample expenses for many trips in one vectorized pass.
+
+    Each trip gets 2-4 expenses per day with amounts drawn from the per-category
+    ranges above. Returns a dict of equal-length columns (``trip_index`` into
+    ``trips``, ``date`` ordinals, ``category`` codes, ``amount``) plus
+    ``rows_per_trip``. The same seed always produces the same rows.
+    """
+    rng = np.random.default_rng(seed)
+    today = dt.date.today().isoformat()
+
+    durations = np.array([max(int(trip.get("duration", 7)), 1) for trip in trips], dtype=np.int64)
+    budgets = np.array([parse_budget(trip.get("budget", 1000)) for trip in trips], dtype=np.float64)
+    starts = np.array([dt.date.fromisoformat(str(trip.get("travel_date") or today)[:10]).toordinal()
+                       for trip in trips], dtype=np.int64)
+
+    # One entry per trip-day: which trip it belongs to and its offset from the start date
+    day_trip = np.repeat(np.arange(len(trips)), durations)
+    day_offset = np.arange(len(day_trip)) - np.repeat(np.cumsum(durations) - durations, durations)
+    per_day = rng.integers(2, 5, size=len(day_trip))
+
+    # One entry per expense
+    row_day = np.repeat(np.arange(len(day_trip)), per_day)
+    trip_index = day_trip[row_day]
+    categories = rng.integers(0, len(EXPENSE_CATEGORIES), size=len(row_day)).astype(np.int8)
+
+    low = SAMPLE_AMOUNT_LOW[categories]
+    high = SAMPLE_AMOUNT_HIGH[categories]
+    accommodation = categories == 0
+    nightly_budget = budgets[trip_index[accommodation]] / durations[trip_index[accommodation]]
+    low[accommodation] = nightly_budget * ACCOMMODATION_SHARE[0]
+    high[accommodation] = nightly_budget * ACCOMMODATION_SHARE[1]
+
+    return {
+        "trip_index": trip_index,
+        "date": (starts[trip_index] + day_offset[row_day]).astype(np.int32),
+        "category": categories,
+        "amount": np.round(rng.uniform(low, high), 2),
+        "rows_per_trip": np.bincount(trip_index, minlength=len(trips)),
+    }
+
+
+# Sample expenses for several trips, as one ExpenseColumns per trip id
+def generate_expense_batch(trips, seed=None):
+    arrays = generate_expense_arrays(trips, seed=seed)
+    bounds = np.cumsum(arrays["rows_per_trip"])[:-1]
+    batch = {}
+    for trip, dates, categories, amounts in zip(trips, np.split(arrays["date"], bounds),
+                                                np.split(arrays["category"], bounds),
+                                                np.split(arrays["amount"], bounds)):
+        # Description codes line up with category codes
+        descriptions = [f"{category} expense in {trip.get('destination')}" for category in EXPENSE_CATEGORIES]
+        batch[trip.get("id")] = ExpenseColumns.from_arrays(dates, categories, categories.astype(np.int32),
+                                                           descriptions, amounts, trip_id=trip.get("id"))
+    return batch
+
+
+def generate_expense_columns(trip, seed=None):
+    return generate_expense_batch([trip], seed=seed)[trip.get("id")]
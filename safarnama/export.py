@@ -0,0 +1,137 @@
+import csv
+import importlib.util
+import io
+import json
+import re
+import zipfile
+
+import numpy as np
+
+from safarnama.expenses import EPOCH_ORDINAL, EXPENSE_CATEGORIES
+
+# Rows converted and written at a time; memory use depends on this, not on the export size
+EXPORT_CHUNK_ROWS = 10_000
+
+EXPENSE_EXPORT_COLUMNS = ["date", "category", "description", "amount"]
+
+
+def parquet_available():
+    return importlib.util.find_spec("pyarrow") is not None
+
+
+def _expense_chunks(expenses, chunk_rows):
+    for start in range(0, len(expenses), chunk_rows):
+        frame = expenses.to_frame(start, start + chunk_rows)
+        frame["date"] = np.datetime_as_string(frame["date"].to_numpy(), unit="D")
+        yield frame
+
+
+def expense_csv_chunks(expenses, chunk_rows=EXPORT_CHUNK_ROWS):
+    """Yield an ExpenseColumns as CSV text, header first, chunk_rows rows at a time."""
+    yield ",".join(EXPENSE_EXPORT_COLUMNS) + "\n"
+    for frame in _expense_chunks(expenses, chunk_rows):
+        yield frame.to_csv(header=False, index=False)
+
+
+def expense_ndjson_chunks(expenses, chunk_rows=EXPORT_CHUNK_ROWS):
+    """Yield an ExpenseColumns as newline-delimited JSON, one object per expense."""
+    for frame in _expense_chunks(expenses, chunk_rows):
+        text = frame.to_json(orient="records", lines=True, force_ascii=False)
+        yield text if text.endswith("\n") else text + "\n"
+
+
+def trip_json_chunks(trip, expenses=None, chunk_rows=EXPORT_CHUNK_ROWS):
+    """Yield one trip as a JSON object, with its expenses as an ``expenses`` list when given."""
+    trip = {key: value for key, value in trip.items() if key != "expenses"}
+    if expenses is None:
+        yield json.dumps(trip, ensure_ascii=False)
+        return
+    head = json.dumps(trip, ensure_ascii=False)
+    yield head[:-1] + (', "expenses": [' if trip else '"expenses": [')
+    first = True
+    for frame in _expense_chunks(expenses, chunk_rows):
+        records = frame.to_json(orient="records", force_ascii=False)[1:-1]
+        if records:
+            yield records if first else "," + records
+            first = False
+    yield "]}"
+
+
+def trips_ndjson_chunks(trips, chunk_rows=EXPORT_CHUNK_ROWS):
+    """Yield trips as newline-delimited JSON, one trip per line."""
+    for start in range(0, len(trips), chunk_rows):
+        yield "".join(json.dumps(trip, ensure_ascii=False, default=str) + "\n"
+                      for trip in trips[start:start + chunk_rows])
+
+
+def write_chunks(chunks, sink):
+    """Write text chunks to a binary file object as UTF-8."""
+    for chunk in chunks:
+        sink.write(chunk.encode("utf-8"))
+
+
+def write_expenses_parquet(expenses, sink, chunk_rows=EXPORT_CHUNK_ROWS):
+    """Write an ExpenseColumns to Parquet, one row group per chunk. Needs pyarrow."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([
+        ("date", pa.date32()),
+        ("category", pa.dictionary(pa.int8(), pa.string())),
+        ("description", pa.string()),
+        ("amount", pa.float64()),
+    ])
+    categories = pa.array(EXPENSE_CATEGORIES, type=pa.string())
+    descriptions = np.array(expenses.descriptions, dtype=object)
+    with pq.ParquetWriter(sink, schema, compression="zstd") as writer:
+        for start in range(0, len(expenses), chunk_rows):
+            rows = slice(start, start + chunk_rows)
+            writer.write_table(pa.table({
+                # date32 is days since the Unix epoch
+                "date": pa.array(expenses.date[rows] - EPOCH_ORDINAL, type=pa.date32()),
+                "category": pa.DictionaryArray.from_arrays(pa.array(expenses.category[rows], type=pa.int8()),
+                                                           categories),
+                "description": pa.array(descriptions[expenses.description[rows]], type=pa.string()),
+                "amount": pa.array(expenses.amount[rows], type=pa.float64()),
+            }, schema=schema))
+
+
+def _slug(text):
+    return re.sub(r"[^a-z0-9]+", "-", str(text).lower()).strip("-") or "trip"
+
+
+def export_file_name(trip, extension, prefix="trip_to"):
+    return f"{prefix}_{_slug(trip.get('destination', 'destination'))}.{extension}"
+
+
+def write_trips_archive(sink, trips, store, batch_size=EXPORT_CHUNK_ROWS):
+    """Write a zip of every trip (trips.ndjson) and all their expenses (expenses.csv).
+
+    Expenses are read from ``store`` (a TripStore) batch_size rows at a time
+    and compressed as they are written.
+    """
+    with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_DEFLATED, compresslevel=6) as archive:
+        with archive.open("trips.ndjson", "w", force_zip64=True) as entry:
+            write_chunks(trips_ndjson_chunks(trips, batch_size), entry)
+        with archive.open("expenses.csv", "w", force_zip64=True) as entry:
+            text = io.TextIOWrapper(entry, encoding="utf-8", newline="")
+            writer = csv.writer(text)
+            writer.writerow(["trip_id", "destination"] + EXPENSE_EXPORT_COLUMNS)
+            for trip in trips:
+                for rows in store.iter_expenses(trip["id"], batch_size):
+                    writer.writerows((trip["id"], trip.get("destination", "")) + row for row in rows)
+            text.flush()
+            text.detach()
+
+
+def export_bytes(write):
+    """Run ``write(sink)`` against an in-memory buffer and return what it wrote.
+
+    For download buttons: Streamlit keeps every download as a single bytes
+    object, so the finished export has to fit in memory (and is briefly held
+    twice while it is handed over) however it is produced. The writers above
+    only keep the conversion itself chunked.
+    """
+    with io.BytesIO() as sink:
+        write(sink)
+        return sink.getvalue()
@@ -0,0 +1,153 @@
+import json
+import random
+import re
+import threading
+import time
+
+from safarnama.prompts import compact_plan
+from safarnama.schema import PLAN_SECTIONS
+
+
+class FakeQuotaError(Exception):
+    """Stand-in for the API's 429 ResourceExhausted error."""
+
+    code = 429
+
+
+class FakeResponse:
+    def __init__(self, text, usage_metadata=None):
+        self.text = text
+        self.usage_metadata = usage_metadata
+
+
+class FakeUsage:
+    def __init__(self, prompt_token_count, candidates_token_count):
+        self.prompt_token_count = prompt_token_count
+        self.candidates_token_count = candidates_token_count
+        self.total_token_count = prompt_token_count + candidates_token_count
+
+
+class FakeModel:
+    """Deterministic local stand-in for ``genai.GenerativeModel``.
+
+    Answers any planner prompt with a well-formed plan for the destination and
+    day range it asks about (or with ``plan``, a canned plan dict or a
+    function of the prompt), after ``latency`` (+/- ``jitter``) seconds.
+    ``failure_rate`` and ``quota_error_rate`` inject errors so retry and
+    backoff paths can be exercised without an API key; ``malformed_rate``
+    mangles the JSON the way real replies sometimes are (see fuzz_plan_text).
+    When the generation_config schema uses the short keys of
+    safarnama.prompts, the reply is compact and holds only the schema's
+    sections, as a schema-constrained model's would. ``system_instruction``
+    is counted in the prompt tokens of every reply, as the API bills it.
+    """
+
+    def __init__(self, latency=0.0, jitter=0.0, failure_rate=0.0, quota_error_rate=0.0,
+                 seed=None, model_name="fake-planner", chunk_size=64, plan=None, malformed_rate=0.0,
+                 system_instruction=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.quota_error_rate = quota_error_rate
+        self.model_name = model_name
+        self.chunk_size = chunk_size
+        self.plan = plan
+        self.malformed_rate = malformed_rate
+        self.system_instruction = system_instruction
+        self.calls = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    # ``system_instruction`` overrides the model's, for stand-ins sharing one FakeModel
+    def generate_content(self, prompt, stream=False, system_instruction=None, **kwargs):
+        with self._lock:
+            self.calls += 1
+            delay = max(0.0, self.latency + self._random.uniform(-self.jitter, self.jitter))
+            roll = self._random.random()
+            mangle = self._random.random() < self.malformed_rate
+            fuzz_seed = self._random.random()
+        time.sleep(delay)
+        if roll < self.quota_error_rate:
+            raise FakeQuotaError("429 Resource has been exhausted (e.g. check quota).")
+        if roll < self.quota_error_rate + self.failure_rate:
+            raise RuntimeError("503 The model is overloaded. Please try again later.")
+
+        if self.plan is None:
+            plan = fake_plan(str(prompt))
+        else:
+            plan = self.plan(str(prompt)) if callable(self.plan) else self.plan
+        schema = (kwargs.get("generation_config") or {}).get("response_schema") or {}
+        sections = list(schema.get("properties", {}))
+        if sections and not set(sections) & set(PLAN_SECTIONS):
+            plan = {key: value for key, value in compact_plan(plan).items() if key in sections}
+        text = json.dumps(plan)
+        if mangle:
+            text = fuzz_plan_text(text, random.Random(fuzz_seed))
+        text = "```json\n" + text + "\n```"
+        system_instruction = system_instruction or self.system_instruction
+        prompt_tokens = _estimate_tokens(prompt) + (_estimate_tokens(system_instruction) if system_instruction else 0)
+        usage = FakeUsage(prompt_tokens, _estimate_tokens(text))
+        if stream:
+            # Like the real API, only the final chunk carries the usage totals
+            chunks = [FakeResponse(text[i:i + self.chunk_size]) for i in range(0, len(text), self.chunk_size)]
+            chunks[-1].usage_metadata = usage
+            return chunks
+        return FakeResponse(text, usage)
+
+    def count_tokens(self, contents):
+        # Roughly four characters per token, like the real tokenizer on English text
+        return FakeTokenCount(_estimate_tokens(contents))
+
+
+class FakeTokenCount:
+    def __init__(self, total_tokens):
+        self.total_tokens = total_tokens
+
+
+def _estimate_tokens(contents):
+    return max(1, len(str(contents)) // 4)
+
+
+# Damage plan JSON in one of the ways model replies go wrong: cut off
+# mid-reply, a trailing comma, or a number given as text
+def fuzz_plan_text(text, rng):
+    kind = rng.choice(("truncate", "trailing_comma", "string_number"))
+    if kind == "truncate":
+        return text[:rng.randint(len(text) // 2, len(text) - 1)]
+    if kind == "trailing_comma":
+        end = text.rfind("]")
+        return text[:end] + "," + text[end:] if end > 0 else text
+    return re.sub(r'("(?:accommodation|h)": )(\d+)', r'\1"$\2"', text, count=1)
+
+
+# A plan for whatever destination and day range the prompt mentions
+def fake_plan(prompt):
+    destination = _search(r"(?:plan for|Trip to) (.+?) for \d+ days", prompt, "Somewhere")
+    duration = int(_search(r"for (\d+) days", prompt, "3"))
+    first_day, last_day = 1, duration
+    day_range = re.search(r"days (\d+) to (\d+)", prompt)
+    if day_range:
+        first_day, last_day = int(day_range.group(1)), int(day_range.group(2))
+
+    return {
+        "itinerary": [
+            {"day_number": day, "activities": [f"Morning walk in {destination}", f"Day {day} sightseeing",
+                                               f"Dinner at a local spot (day {day})"]}
+            for day in range(first_day, last_day + 1)
+        ],
+        "accommodations": [
+            {"name": f"{destination} Central Hotel", "price": "$120/night", "description": "Close to the old town"},
+            {"name": f"{destination} Hostel", "price": "$35/night", "description": "Budget friendly"},
+        ],
+        "attractions": [{"name": f"{destination} Museum", "description": "History and art"}],
+        "food": [{"name": "Street food market", "description": f"The best snacks in {destination}"}],
+        "transportation": {"local": "Use public transport passes", "airport": "Take the express train"},
+        "costs": {"accommodation": 120 * duration, "food": 40 * duration, "activities": 25 * duration,
+                  "transportation": 10 * duration},
+        "tips": ["Carry a reusable water bottle", "Book popular sights in advance"],
+    }
+
+
+def _search(pattern, text, default):
+    match = re.search(pattern, text)
+    return match.group(1).strip() if match else default
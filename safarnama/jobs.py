@@ -0,0 +1,137 @@
+import itertools
+import threading
+import time
+from concurrent.futures import CancelledError, ThreadPoolExecutor
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+
+class JobLimitError(Exception):
+    pass
+
+
+class Job:
+    def __init__(self, job_id, session_id, label, payload):
+        self.id = job_id
+        self.session_id = session_id
+        self.label = label
+        # Whatever the submitter wants back with the result (e.g. the trip inputs)
+        self.payload = payload
+        self.status = PENDING
+        self.result = None
+        self.error = None
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.cancel_event = threading.Event()
+        self.future = None
+
+    @property
+    def finished(self):
+        return self.status in (DONE, FAILED, CANCELLED)
+
+    def elapsed(self):
+        if self.started_at is None:
+            return 0.0
+        return (self.finished_at or time.time()) - self.started_at
+
+
+class JobManager:
+    """Runs slow work (plan generation) on a shared worker pool.
+
+    Jobs belong to a session; each session may have at most
+    ``max_jobs_per_session`` unfinished jobs. Work functions are called as
+    ``fn(cancel_event, *args)`` and must not touch Streamlit, since they run
+    outside the script thread, and should return early once the event is
+    set. Finished jobs stay around until the session collects them with
+    ``pop_finished``, or for ``finished_ttl`` seconds if it never does.
+    """
+
+    def __init__(self, max_workers=4, max_jobs_per_session=3, finished_ttl=60 * 60):
+        self.max_jobs_per_session = max_jobs_per_session
+        self.finished_ttl = finished_ttl
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="plan-job")
+        self._jobs = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def submit(self, session_id, label, fn, *args, payload=None):
+        with self._lock:
+            self._expire_finished()
+            active = sum(1 for job in self._jobs.values() if job.session_id == session_id and not job.finished)
+            if active >= self.max_jobs_per_session:
+                raise JobLimitError(f"At most {self.max_jobs_per_session} jobs can run at once")
+            job = Job(next(self._ids), session_id, label, payload)
+            self._jobs[job.id] = job
+        job.future = self._pool.submit(self._run, job, fn, args)
+        return job.id
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def jobs_for(self, session_id):
+        with self._lock:
+            self._expire_finished()
+            return [job for job in self._jobs.values() if job.session_id == session_id]
+
+    def cancel(self, job_id):
+        job = self.get(job_id)
+        if job is None or job.finished:
+            return False
+        job.cancel_event.set()
+        # Jobs still waiting for a worker are dropped outright; running ones
+        # see the event and their result is discarded
+        if job.future.cancel():
+            self._finish(job, CANCELLED)
+        return True
+
+    # Remove and return a session's finished jobs
+    def pop_finished(self, session_id):
+        with self._lock:
+            finished = [job for job in self._jobs.values() if job.session_id == session_id and job.finished]
+            for job in finished:
+                del self._jobs[job.id]
+        return finished
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def _run(self, job, fn, args):
+        if job.cancel_event.is_set():
+            self._finish(job, CANCELLED)
+            return
+        job.started_at = time.time()
+        job.status = RUNNING
+        try:
+            result = fn(job.cancel_event, *args)
+        except Exception as e:
+            # Work that stops early after a cancel may fail in its own way
+            if isinstance(e, CancelledError) or job.cancel_event.is_set():
+                self._finish(job, CANCELLED)
+            else:
+                self._finish(job, FAILED, error=e)
+        else:
+            if job.cancel_event.is_set():
+                self._finish(job, CANCELLED)
+            else:
+                self._finish(job, DONE, result=result)
+
+    def _finish(self, job, status, result=None, error=None):
+        with self._lock:
+            if job.finished:
+                return
+            job.result = result
+            job.error = error
+            job.finished_at = time.time()
+            job.status = status
+
+    # Drop finished jobs no session has collected in time; callers hold the lock
+    def _expire_finished(self):
+        cutoff = time.time() - self.finished_ttl
+        for job_id in [job_id for job_id, job in self._jobs.items() if job.finished and job.finished_at < cutoff]:
+            del self._jobs[job_id]
@@ -0,0 +1,223 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+# Normalize the planner inputs so that trivially different submissions
+# ("Paris " vs "paris", "$1,000" vs "1000", interest order) share an entry
+def plan_cache_key(model_name, destination, duration, interests, budget, travelers):
+    budget_text = str(budget).replace("$", "").replace(",", "").strip()
+    try:
+        budget_value = f"{float(budget_text):.2f}"
+    except ValueError:
+        budget_value = budget_text.lower()
+
+    normalized = {
+        "model": str(model_name),
+        "destination": " ".join(str(destination).split()).casefold(),
+        "duration": int(duration),
+        "interests": sorted({str(i).strip().casefold() for i in interests}),
+        "budget": budget_value,
+        "travelers": int(travelers),
+    }
+    payload = json.dumps(normalized, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+# Memory hits queue their access time and are written to disk in batches of
+# this many, or once the oldest has waited this many seconds
+ACCESS_FLUSH_ENTRIES = 64
+ACCESS_FLUSH_SECONDS = 30.0
+
+
+class PlanCache:
+    """Two-tier (memory LRU + SQLite) cache of generated trip plans.
+
+    Plans are stored as JSON text so every hit hands back a fresh dict that
+    callers are free to mutate. Memory hits update the rows' ``last_access``
+    in batches, so disk eviction still sees them as recently used. Entry and
+    byte counts are tracked in memory; ``purge_expired`` recounts them from
+    the database.
+    """
+
+    def __init__(self, path, max_memory_entries=128, max_disk_entries=5000,
+                 max_disk_bytes=64 * 1024 * 1024, ttl_seconds=7 * 24 * 3600):
+        self.path = path
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_entries = max_disk_entries
+        self.max_disk_bytes = max_disk_bytes
+        self.ttl_seconds = ttl_seconds
+
+        self._lock = threading.Lock()
+        self._memory = OrderedDict()
+        self._pending_access = {}
+        self._pending_since = None
+        self._disk_entries = 0
+        self._disk_bytes = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS plans (
+                key TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                expires_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_plans_last_access ON plans(last_access)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_plans_expires_at ON plans(expires_at)")
+        self.purge_expired()
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                expires_at, payload = entry
+                if not _expired(expires_at, now):
+                    self._memory.move_to_end(key)
+                    self._record_access(key, now)
+                    self.memory_hits += 1
+                    return json.loads(payload)
+                del self._memory[key]
+
+            row = self._conn.execute(
+                "SELECT payload, expires_at, size FROM plans WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or _expired(row[1], now):
+                if row is not None:
+                    self._delete(key, row[2])
+                self.misses += 1
+                return None
+
+            payload, expires_at, _ = row
+            self._conn.execute("UPDATE plans SET last_access = ? WHERE key = ?", (now, key))
+            self._pending_access.pop(key, None)
+            self._remember(key, expires_at, payload)
+            self.disk_hits += 1
+            return json.loads(payload)
+
+    def put(self, key, plan, model_name=""):
+        now = time.time()
+        expires_at = now + self.ttl_seconds
+        payload = json.dumps(plan, separators=(",", ":"))
+        with self._lock:
+            self._remember(key, expires_at, payload)
+            old = self._conn.execute("SELECT size FROM plans WHERE key = ?", (key,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO plans (key, model, payload, size, created_at, expires_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, str(model_name), payload, len(payload), now, expires_at, now),
+            )
+            self._pending_access.pop(key, None)
+            if old is not None:
+                self._disk_entries -= 1
+                self._disk_bytes -= old[0]
+            self._disk_entries += 1
+            self._disk_bytes += len(payload)
+            self._evict_disk()
+
+    def purge_expired(self):
+        now = time.time()
+        with self._lock:
+            for key in [k for k, (expires_at, _) in self._memory.items() if _expired(expires_at, now)]:
+                del self._memory[key]
+            self._flush_access()
+            self._conn.execute("DELETE FROM plans WHERE expires_at <= ?", (now,))
+            self._disk_entries, self._disk_bytes = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM plans"
+            ).fetchone()
+
+    # Write queued memory-hit access times to disk now
+    def flush(self):
+        with self._lock:
+            self._flush_access()
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            self._pending_access.clear()
+            self._pending_since = None
+            self._conn.execute("DELETE FROM plans")
+            self._disk_entries = self._disk_bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                "memory_entries": len(self._memory),
+                "disk_entries": self._disk_entries,
+                "disk_bytes": self._disk_bytes,
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+            }
+
+    def _remember(self, key, expires_at, payload):
+        self._memory[key] = (expires_at, payload)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def _record_access(self, key, now):
+        self._pending_access[key] = now
+        if self._pending_since is None:
+            self._pending_since = now
+        if (len(self._pending_access) >= ACCESS_FLUSH_ENTRIES
+                or now - self._pending_since >= ACCESS_FLUSH_SECONDS):
+            self._flush_access()
+
+    def _flush_access(self):
+        if self._pending_access:
+            self._conn.executemany("UPDATE plans SET last_access = ? WHERE key = ?",
+                                   [(accessed, key) for key, accessed in self._pending_access.items()])
+            self._pending_access.clear()
+        self._pending_since = None
+
+    def _delete(self, key, size):
+        self._conn.execute("DELETE FROM plans WHERE key = ?", (key,))
+        self._memory.pop(key, None)
+        self._pending_access.pop(key, None)
+        self._disk_entries -= 1
+        self._disk_bytes -= size
+
+    # Drop the least recently used rows until both the row and byte budgets hold
+    def _evict_disk(self):
+        if self._disk_entries <= self.max_disk_entries and self._disk_bytes <= self.max_disk_bytes:
+            return
+
+        self._flush_access()
+        rows = self._conn.execute("SELECT key, size FROM plans ORDER BY last_access ASC").fetchall()
+        doomed = []
+        for key, row_size in rows:
+            if self._disk_entries <= self.max_disk_entries and self._disk_bytes <= self.max_disk_bytes:
+                break
+            doomed.append((key,))
+            self._disk_entries -= 1
+            self._disk_bytes -= row_size
+        self._conn.executemany("DELETE FROM plans WHERE key = ?", doomed)
+        for (key,) in doomed:
+            self._memory.pop(key, None)
+        self.evictions += len(doomed)
+
+
+# Both tiers treat an entry as gone from the moment it reaches its expiry time
+def _expired(expires_at, now):
+    return expires_at <= now
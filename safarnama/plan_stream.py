@@ -0,0 +1,155 @@
+import json
+
+
+# Pull the JSON document out of a model reply that may be wrapped in markdown fences
+def strip_code_fences(content):
+    if "```json" in content:
+        return content.split("```json")[1].split("```")[0].strip()
+    if "```" in content:
+        return content.split("```")[1].split("```")[0].strip()
+    return content.strip()
+
+
+# Parse a complete (non-streamed) model reply into a trip plan dict
+def parse_plan_text(content):
+    return json.loads(strip_code_fences(content))
+
+
+class IncrementalPlanParser:
+    """Tolerant incremental parser for a streamed trip plan.
+
+    Feed it text chunks as they arrive; ``feed`` returns the events that became
+    complete with that chunk:
+
+    * ``("day", day)`` for every finished element of the ``itinerary`` array
+    * ``("section", key, value)`` for every finished top-level key
+
+    Anything before the first ``{`` (markdown fences, chatter) and after the
+    matching ``}`` is ignored. ``close`` returns the full plan, or whatever
+    sections were completed if the stream was cut short.
+    """
+
+    def __init__(self, itinerary_key="itinerary"):
+        self.itinerary_key = itinerary_key
+        self.sections = {}
+        self.days = []
+        self.done = False
+
+        self._text = ""
+        self._pos = 0
+        self._start = None
+        self._end = None
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._string_start = None
+        self._expect_key = True
+        self._key = None
+        self._value_start = None
+        self._elem_start = None
+
+    def feed(self, chunk):
+        if self.done or not chunk:
+            return []
+        self._text += chunk
+        return self._scan()
+
+    def close(self):
+        if self.done:
+            try:
+                return json.loads(self._text[self._start:self._end + 1])
+            except json.JSONDecodeError:
+                pass
+
+        plan = dict(self.sections)
+        if self.itinerary_key not in plan and self.days:
+            plan[self.itinerary_key] = list(self.days)
+        if not plan:
+            # Fall back to the plain parser so callers see the usual error
+            return parse_plan_text(self._text)
+        return plan
+
+    def _scan(self):
+        events = []
+        text = self._text
+        i = self._pos
+        n = len(text)
+
+        while i < n:
+            ch = text[i]
+
+            if self._start is None:
+                if ch == "{":
+                    self._start = i
+                    self._depth = 1
+                    self._expect_key = True
+                i += 1
+                continue
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    if self._depth == 1 and self._expect_key:
+                        self._key = json.loads(text[self._string_start:i + 1])
+                i += 1
+                continue
+
+            if ch == '"':
+                self._in_string = True
+                self._string_start = i
+                if self._depth == 1 and not self._expect_key and self._value_start is None:
+                    self._value_start = i
+            elif ch in "{[":
+                if self._depth == 1 and self._value_start is None:
+                    self._value_start = i
+                elif self._depth == 2 and ch == "{" and self._key == self.itinerary_key:
+                    self._elem_start = i
+                self._depth += 1
+            elif ch in "}]":
+                self._depth -= 1
+                if self._depth == 2 and self._elem_start is not None:
+                    events.extend(self._emit_day(text[self._elem_start:i + 1]))
+                    self._elem_start = None
+                elif self._depth == 0:
+                    events.extend(self._emit_section(text[self._value_start:i] if self._value_start is not None else ""))
+                    self._end = i
+                    self.done = True
+                    i += 1
+                    break
+            elif self._depth == 1:
+                if ch == ":":
+                    self._expect_key = False
+                    self._value_start = None
+                elif ch == ",":
+                    events.extend(self._emit_section(text[self._value_start:i] if self._value_start is not None else ""))
+                    self._expect_key = True
+                elif not ch.isspace() and not self._expect_key and self._value_start is None:
+                    self._value_start = i
+            i += 1
+
+        self._pos = i
+        return events
+
+    def _emit_day(self, raw):
+        try:
+            day = json.loads(raw)
+        except json.JSONDecodeError:
+            return []
+        self.days.append(day)
+        return [("day", day)]
+
+    def _emit_section(self, raw):
+        key, self._key, self._value_start = self._key, None, None
+        raw = raw.strip()
+        if key is None or not raw:
+            return []
+        try:
+            value = json.loads(raw)
+        except json.JSONDecodeError:
+            return []
+        self.sections[key] = value
+        return [("section", key, value)]
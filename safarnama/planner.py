@@ -0,0 +1,248 @@
+import json
+import threading
+
+from safarnama.plan_cache import plan_cache_key
+from safarnama.plan_stream import IncrementalPlanParser, parse_plan_text
+from safarnama.prompts import compact_generation_config, expand_event, expand_plan, plan_request, trip_context
+from safarnama.schema import missing_days, repair_json, validate_plan
+from safarnama.segmented import _check_cancelled, _normalize_days, generate_segmented, itinerary_prompt, sections_prompt
+from safarnama.telemetry import TELEMETRY
+
+GEMINI_MODEL = "gemini-1.5-pro"
+GEMINI_FAST_MODEL = "gemini-1.5-flash"
+
+# Whole-plan retries when a reply cannot be parsed even after repair
+MAX_FULL_REGENERATIONS = 1
+
+
+class PlanParseError(ValueError):
+    def __init__(self, message, raw_text):
+        super().__init__(message)
+        self.raw_text = raw_text
+
+
+class PlanMetrics:
+    """Process-wide counters for how plans were recovered from model replies,
+    and the tokens they took."""
+
+    def __init__(self):
+        self.plans = 0
+        self.repairs = 0
+        self.section_rerequests = 0
+        self.full_regenerations = 0
+        self.prompt_tokens = 0
+        self.response_tokens = 0
+        self._lock = threading.Lock()
+
+    def record(self, **counts):
+        with self._lock:
+            for name, count in counts.items():
+                setattr(self, name, getattr(self, name) + count)
+
+    def regenerations_per_plan(self):
+        return self.full_regenerations / self.plans if self.plans else 0.0
+
+    def tokens_per_plan(self):
+        return (self.prompt_tokens + self.response_tokens) / self.plans if self.plans else 0.0
+
+    def stats(self):
+        return {
+            "plans": self.plans,
+            "repairs": self.repairs,
+            "section_rerequests": self.section_rerequests,
+            "full_regenerations": self.full_regenerations,
+            "regenerations_per_plan": self.regenerations_per_plan(),
+            "prompt_tokens_per_plan": self.prompt_tokens / self.plans if self.plans else 0.0,
+            "response_tokens_per_plan": self.response_tokens / self.plans if self.plans else 0.0,
+            "tokens_per_plan": self.tokens_per_plan(),
+        }
+
+
+PLAN_METRICS = PlanMetrics()
+
+
+class TokenUsage:
+    """Prompt and response tokens summed over the replies for one plan."""
+
+    def __init__(self):
+        self.prompt_tokens = 0
+        self.response_tokens = 0
+        self._lock = threading.Lock()
+
+    # Add a reply's usage_metadata, when the model reports one
+    def add(self, response):
+        usage = getattr(response, "usage_metadata", None)
+        if usage is None:
+            return
+        with self._lock:
+            self.prompt_tokens += getattr(usage, "prompt_token_count", 0) or 0
+            self.response_tokens += getattr(usage, "candidates_token_count", 0) or 0
+
+
+# The request part of a whole-plan prompt; the parts common to every prompt
+# are in PLAN_SYSTEM_INSTRUCTION, which the model carries (see ClientPool)
+def build_prompt(destination, duration, interests, budget, travelers):
+    return plan_request(trip_context(destination, duration, interests, budget, travelers))
+
+
+# The ``generate(prompt, timeout, keys)`` callable generate_segmented and
+# replan_trip take, asking ``model`` for schema-constrained compact JSON.
+# Token counts are added to ``usage`` (a TokenUsage) when given.
+def section_generator(model, usage=None):
+    def generate(prompt, timeout, keys):
+        response = model.generate_content(prompt, generation_config=compact_generation_config(keys),
+                                          request_options={"timeout": timeout})
+        if usage is not None:
+            usage.add(response)
+        return response.text
+
+    return generate
+
+
+def _parse_reply(text, metrics):
+    with TELEMETRY.span("plan.parse", chars=len(text)):
+        try:
+            return parse_plan_text(text)
+        except json.JSONDecodeError:
+            plan = repair_json(text)
+            metrics.record(repairs=1)
+            return plan
+
+
+# Ask again for just the sections that failed validation (and the days an
+# itinerary is missing) and merge back the ones that come back usable.
+# Returns the plan and the problems left after that.
+def _rerequest_sections(model, trip_plan, problems, destination, duration, interests, budget, travelers,
+                        metrics, usage, on_event=None, cancel_event=None):
+    context = trip_context(destination, duration, interests, budget, travelers)
+    requests = []
+    missing = []
+    if "itinerary" in problems:
+        missing = missing_days(trip_plan.get("itinerary", []), duration) or list(range(1, int(duration) + 1))
+        requests.append((itinerary_prompt(context, missing[0], missing[-1]), ("itinerary",)))
+    keys = tuple(key for key in problems if key != "itinerary")
+    if keys:
+        requests.append((sections_prompt(context, keys), keys))
+
+    for prompt, keys in requests:
+        _check_cancelled(cancel_event)
+        metrics.record(section_rerequests=1)
+        try:
+            response = model.generate_content(prompt, generation_config=compact_generation_config(keys))
+            usage.add(response)
+            result, still_broken = validate_plan(expand_plan(repair_json(response.text), keys), keys)
+        except (json.JSONDecodeError, ValueError):
+            continue
+        for key in keys:
+            if key in still_broken:
+                continue
+            if key == "itinerary":
+                # Only fill the gaps; days the first reply got right are kept
+                days = _normalize_days(result[key], missing[0], missing[-1])
+                added = [day for day in days if day["day_number"] in missing]
+                filled = {day["day_number"] for day in added}
+                kept = [day for day in trip_plan.get(key, []) if day["day_number"] not in filled]
+                trip_plan[key] = sorted(kept + added, key=lambda day: day["day_number"])
+                if on_event is not None:
+                    for day in added:
+                        on_event(("day", day))
+                continue
+            trip_plan[key] = result[key]
+            if on_event is not None:
+                on_event(("section", key, result[key]))
+    return validate_plan(trip_plan, duration=duration)
+
+
+def generate_plan(model, destination, duration, interests, budget, travelers,
+                  cache=None, model_name=None, on_event=None, segmented=False, metrics=PLAN_METRICS,
+                  cancel_event=None):
+    """Produce a trip plan dict for the given inputs.
+
+    ``model`` is anything with a GenerativeModel-style ``generate_content``
+    (the SDK model or a Backend). Plans are looked up in and written to
+    ``cache`` (a PlanCache) when given, keyed by ``model_name`` which defaults
+    to the model's own.
+    With ``on_event`` the response is streamed and each finished itinerary day
+    and section is reported as it arrives; with ``segmented`` the plan is
+    built from concurrent sub-requests.
+    Replies are requested as schema-constrained JSON with the short keys of
+    safarnama.prompts and expanded back into the usual keys; the tokens used
+    are recorded in ``metrics``. A reply that does not parse is repaired
+    locally, sections that fail validation and days missing from the
+    itinerary are re-requested on their own, and only a reply that cannot be
+    repaired at all costs a full regeneration (counted in ``metrics``). A plan
+    with problems left after that is returned but not cached. Raises
+    PlanParseError when a regeneration fails too; API errors propagate
+    unchanged. Once ``cancel_event`` (a threading.Event) is set, generation
+    stops at the next stream chunk or before the next request with
+    concurrent.futures.CancelledError.
+    """
+    model_name = model_name or getattr(model, "model_name", GEMINI_MODEL)
+    cache_key = plan_cache_key(model_name, destination, duration, interests, budget, travelers)
+    if cache is not None:
+        cached_plan = cache.get(cache_key)
+        TELEMETRY.cache("plan", cached_plan is not None)
+        if cached_plan is not None:
+            return cached_plan
+
+    prompt = build_prompt(destination, duration, interests, budget, travelers)
+    usage = TokenUsage()
+    if segmented:
+        trip_plan = generate_segmented(
+            section_generator(model, usage),
+            destination, duration, interests, budget, travelers,
+            max_workers=getattr(model, "max_concurrency", None), on_event=on_event, cancel_event=cancel_event
+        )
+    else:
+        trip_plan = None
+        regenerations = 0
+        if on_event is not None:
+            parser = IncrementalPlanParser(itinerary_key="i")
+            raw_chunks = []
+            last_chunk = None
+            _check_cancelled(cancel_event)
+            for chunk in model.generate_content(prompt, stream=True, generation_config=compact_generation_config()):
+                _check_cancelled(cancel_event)
+                raw_chunks.append(chunk.text)
+                last_chunk = chunk
+                for event in parser.feed(chunk.text):
+                    on_event(expand_event(event))
+            # Only the final chunk of a stream carries the usage totals
+            usage.add(last_chunk)
+            with TELEMETRY.span("plan.parse", stream=True):
+                try:
+                    trip_plan = expand_plan(parser.close())
+                except json.JSONDecodeError:
+                    try:
+                        trip_plan = expand_plan(repair_json("".join(raw_chunks)))
+                        metrics.record(repairs=1)
+                    except json.JSONDecodeError as e:
+                        if not MAX_FULL_REGENERATIONS:
+                            raise PlanParseError(str(e), "".join(raw_chunks)) from e
+                        regenerations = 1
+
+        while trip_plan is None:
+            _check_cancelled(cancel_event)
+            if regenerations:
+                metrics.record(full_regenerations=1)
+            response = model.generate_content(prompt, generation_config=compact_generation_config())
+            usage.add(response)
+            try:
+                trip_plan = expand_plan(_parse_reply(response.text, metrics))
+            except json.JSONDecodeError as e:
+                if regenerations >= MAX_FULL_REGENERATIONS:
+                    raise PlanParseError(str(e), response.text) from e
+                regenerations += 1
+
+    with TELEMETRY.span("plan.validate"):
+        trip_plan, problems = validate_plan(trip_plan, duration=duration)
+    if problems:
+        trip_plan, problems = _rerequest_sections(model, trip_plan, problems, destination, duration, interests,
+                                                  budget, travelers, metrics, usage, on_event=on_event,
+                                                  cancel_event=cancel_event)
+
+    metrics.record(plans=1, prompt_tokens=usage.prompt_tokens, response_tokens=usage.response_tokens)
+    # A plan still missing something is shown, but not served to others from the cache
+    if cache is not None and not problems:
+        cache.put(cache_key, trip_plan, model_name)
+    return trip_plan
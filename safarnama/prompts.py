@@ -0,0 +1,119 @@
+from safarnama.schema import PLAN_SECTIONS, SECTION_SCHEMAS, plan_schema
+
+# Short key the model uses for each plan key, in replies and in the schema.
+# Keys only need to be unique within one object, so "n" is both a day's
+# number and an item's name.
+COMPACT_KEYS = {
+    "itinerary": "i",
+    "accommodations": "h",
+    "attractions": "s",
+    "food": "f",
+    "transportation": "t",
+    "costs": "c",
+    "tips": "x",
+    "day_number": "n",
+    "activities": "a",
+    "name": "n",
+    "price": "p",
+    "description": "d",
+    "accommodation": "h",
+}
+
+# What to put in each section, sent only for the sections a request asks for
+SECTION_GUIDANCE = {
+    "itinerary": "itinerary [{n: day number, a: [3-5 activities at named places]}]",
+    "accommodations": "2-4 stays within budget [{n, p: price per night, d}]",
+    "attractions": "sights for the interests [{n, d}]",
+    "food": "local food and where to eat it [{n, d}]",
+    "transportation": "getting around [tip]",
+    "costs": "total USD for the group, numbers {h: stay, f: food, a: activities, t: transport}",
+    "tips": "travel tips [tip]",
+}
+
+# The part of every prompt that never changes, kept in the model's system
+# instruction (or a context cache) instead of each request
+PLAN_SYSTEM_INSTRUCTION = "You plan trips. Reply in JSON with exactly the listed keys; n = name, d = one-sentence description."
+
+
+def trip_context(destination, duration, interests, budget, travelers):
+    return (f"Trip to {destination} for {duration} days. Budget: {budget}. Travelers: {travelers}. "
+            f"Interests: {', '.join(interests)}.")
+
+
+def plan_request(context, sections=PLAN_SECTIONS, first_day=None, last_day=None):
+    """The per-request part of a prompt: the trip and the sections wanted.
+
+    With ``first_day`` and ``last_day`` the itinerary covers only that range.
+    """
+    lines = [context]
+    for section in sections:
+        guidance = SECTION_GUIDANCE[section]
+        if section == "itinerary" and first_day is not None:
+            guidance = guidance.replace("itinerary", f"itinerary for days {first_day} to {last_day} only", 1)
+        lines.append(f"{COMPACT_KEYS[section]}: {guidance}")
+    return "\n".join(lines)
+
+
+def _compact_schema(schema):
+    schema = dict(schema)
+    if "properties" in schema:
+        schema["properties"] = {COMPACT_KEYS.get(key, key): _compact_schema(value)
+                                for key, value in schema["properties"].items()}
+        schema["required"] = [COMPACT_KEYS.get(key, key) for key in schema.get("required", [])]
+    if "items" in schema:
+        schema["items"] = _compact_schema(schema["items"])
+    return schema
+
+
+def compact_schema(sections=PLAN_SECTIONS):
+    return _compact_schema(plan_schema(sections))
+
+
+# generation_config asking for compact JSON for the given sections
+def compact_generation_config(sections=PLAN_SECTIONS):
+    return {"response_mime_type": "application/json", "response_schema": compact_schema(sections)}
+
+
+def _expand(value, schema):
+    if isinstance(value, list) and "items" in schema:
+        return [_expand(item, schema["items"]) for item in value]
+    if isinstance(value, dict) and "properties" in schema:
+        long_keys = {COMPACT_KEYS.get(key, key): key for key in schema["properties"]}
+        expanded = {}
+        for key, item in value.items():
+            long_key = long_keys.get(key, key)
+            expanded[long_key] = _expand(item, schema["properties"].get(long_key, {}))
+        return expanded
+    return value
+
+
+def expand_plan(plan, sections=PLAN_SECTIONS):
+    """Turn a compact reply back into the usual trip plan dict.
+
+    Keys that are already long (or unknown) are kept, so replies in the
+    verbose format pass through unchanged.
+    """
+    return _expand(plan, plan_schema(sections))
+
+
+def expand_event(event):
+    """Expand a ("day", day) or ("section", key, value) event from IncrementalPlanParser."""
+    if event[0] == "day":
+        return "day", _expand(event[1], SECTION_SCHEMAS["itinerary"]["items"])
+    sections = {COMPACT_KEYS[section]: section for section in PLAN_SECTIONS}
+    section = sections.get(event[1], event[1])
+    return "section", section, _expand(event[2], SECTION_SCHEMAS.get(section, {}))
+
+
+def compact_plan(plan):
+    """The inverse of expand_plan, for stand-in models and token estimates."""
+    return _compact(plan, plan_schema(PLAN_SECTIONS))
+
+
+def _compact(value, schema):
+    if isinstance(value, list) and "items" in schema:
+        return [_compact(item, schema["items"]) for item in value]
+    if isinstance(value, dict) and "properties" in schema:
+        return {COMPACT_KEYS.get(key, key): _compact(item, schema["properties"].get(key, {}))
+                for key, item in value.items()}
+    return value
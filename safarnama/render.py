@@ -0,0 +1,120 @@
+import hashlib
+import html
+import json
+
+from safarnama.telemetry import TELEMETRY
+
+# Stable hash of everything shown for a trip, used to memoize its rendered view
+def trip_content_hash(trip):
+    payload = json.dumps(trip, sort_keys=True, default=str, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _paragraphs(lines):
+    return "\n\n".join(lines)
+
+
+def activities_markdown(activities):
+    if isinstance(activities, list):
+        return _paragraphs(f"• {activity}" for activity in activities)
+    return str(activities)
+
+
+# The whole itinerary as one block of collapsible days
+def itinerary_html(days):
+    blocks = []
+    for day in days:
+        activities = day.get("activities", [])
+        if isinstance(activities, list):
+            items = "".join(f"<li>{html.escape(str(activity))}</li>" for activity in activities)
+        else:
+            items = f"<li>{html.escape(str(activities))}</li>"
+        blocks.append(f"<details class='day'><summary>Day {html.escape(str(day.get('day_number', '?')))}</summary>"
+                      f"<ul>{items}</ul></details>")
+    return "".join(blocks)
+
+
+def named_items_markdown(items, extra=()):
+    lines = []
+    for item in items:
+        if isinstance(item, dict) and "name" in item:
+            lines.append(f"• **{item['name']}**")
+            for key, label in extra:
+                if key in item:
+                    lines.append(f"  {label}{item[key]}")
+            if "description" in item:
+                lines.append(f"  {item['description']}")
+        else:
+            lines.append(f"• {item}")
+    return _paragraphs(lines)
+
+
+def accommodations_markdown(accommodations):
+    return named_items_markdown(accommodations, extra=(("price", "Price: "),))
+
+
+def transportation_markdown(transportation):
+    if isinstance(transportation, dict):
+        return _paragraphs(f"• **{k.title()}:** {v}" for k, v in transportation.items())
+    if isinstance(transportation, list):
+        return _paragraphs(f"• {item}" for item in transportation)
+    return str(transportation)
+
+
+def tips_markdown(tips):
+    return _paragraphs(f"• {tip}" for tip in tips)
+
+
+# Split costs into chartable rows and free-text lines
+def cost_rows(costs):
+    rows, notes = [], []
+    if isinstance(costs, dict):
+        for category, amount in costs.items():
+            rows.append({"Category": category.title(), "Amount": amount})
+    elif isinstance(costs, list):
+        for item in costs:
+            if isinstance(item, dict) and "category" in item and "amount" in item:
+                rows.append({"Category": item["category"].title(), "Amount": item["amount"]})
+            else:
+                notes.append(f"• {item}")
+    return rows, notes
+
+
+def cost_figure(rows):
+    import pandas as pd
+    import plotly.express as px
+
+    with TELEMETRY.span("render.cost_chart", rows=len(rows)):
+        cost_df = pd.DataFrame(rows)
+
+        # Create a cost breakdown visualization
+        fig = px.pie(cost_df, values='Amount', names='Category',
+                     title='Cost Breakdown',
+                     color_discrete_sequence=px.colors.sequential.Viridis)
+        fig.update_traces(textposition='inside', textinfo='percent+label')
+    return cost_df, fig
+
+
+class TripView:
+    """Pre-rendered trip details: a handful of markdown blocks and the cost chart.
+
+    Build once per trip content and reuse across reruns; every attribute is
+    None (or empty) when the trip has nothing for that section.
+    """
+
+    def __init__(self, trip):
+        self.summary = _paragraphs([
+            f"**Travelers:** {trip.get('travelers', 'N/A')}",
+            f"**Interests:** {', '.join(trip.get('interests', []))}",
+        ])
+        self.itinerary = itinerary_html(trip["itinerary"]) if trip.get("itinerary") else None
+        self.accommodations = accommodations_markdown(trip["accommodations"]) if trip.get("accommodations") else None
+        self.attractions = named_items_markdown(trip["attractions"]) if trip.get("attractions") else None
+        self.food = named_items_markdown(trip["food"]) if trip.get("food") else None
+        self.transportation = transportation_markdown(trip["transportation"]) if trip.get("transportation") else None
+        self.tips = tips_markdown(trip["tips"]) if trip.get("tips") else None
+
+        self.has_costs = bool(trip.get("costs"))
+        rows, notes = cost_rows(trip["costs"]) if self.has_costs else ([], [])
+        self.cost_notes = _paragraphs(notes) if notes else None
+        self.cost_frame, self.cost_chart = cost_figure(rows) if rows else (None, None)
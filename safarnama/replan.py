@@ -0,0 +1,157 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from safarnama.prompts import trip_context
+from safarnama.segmented import _normalize_days, _run_segment, itinerary_prompt, sections_prompt
+
+# Trip fields that come from the Plan form rather than the model
+PLAN_INPUTS = ("destination", "travel_date", "duration", "budget", "travelers", "interests")
+
+
+def changed_inputs(old_trip, new_inputs):
+    return [key for key in PLAN_INPUTS if old_trip.get(key) != new_inputs.get(key)]
+
+
+class ReplanDelta:
+    """The parts of a saved plan that have to be asked for again after an edit."""
+
+    def __init__(self):
+        # (first_day, last_day) of itinerary days to add
+        self.new_days = None
+        # Sections to regenerate outright
+        self.sections = []
+        # Interests to add attractions for, keeping the current ones
+        self.added_interests = []
+        # Factor to rescale numeric costs by when only the duration changed
+        self.cost_scale = None
+
+    def requests(self):
+        return (self.new_days is not None) + bool(self.sections) + bool(self.added_interests)
+
+    def describe(self):
+        parts = []
+        if self.new_days is not None:
+            first_day, last_day = self.new_days
+            parts.append(f"day {first_day}" if first_day == last_day else f"days {first_day}-{last_day}")
+        parts.extend(self.sections)
+        if self.added_interests:
+            parts.append(f"attractions for {', '.join(self.added_interests)}")
+        return parts
+
+
+def _add_section(delta, key):
+    if key not in delta.sections:
+        delta.sections.append(key)
+
+
+def _numeric_costs(costs):
+    return isinstance(costs, dict) and costs and all(
+        isinstance(amount, (int, float)) and not isinstance(amount, bool) for amount in costs.values())
+
+
+def plan_delta(old_trip, new_inputs):
+    """Work out what an edit from ``old_trip`` to ``new_inputs`` needs from the model.
+
+    Returns a ReplanDelta, or None when the trip has to be planned from
+    scratch (a new destination, or nothing usable to keep).
+    """
+    if not old_trip.get("itinerary"):
+        return None
+    if str(old_trip.get("destination", "")).strip().lower() != str(new_inputs.get("destination", "")).strip().lower():
+        return None
+
+    delta = ReplanDelta()
+    changed = changed_inputs(old_trip, new_inputs)
+
+    if "budget" in changed or "travelers" in changed:
+        _add_section(delta, "accommodations")
+        _add_section(delta, "costs")
+
+    if "duration" in changed:
+        old_duration, new_duration = int(old_trip.get("duration") or 0), int(new_inputs["duration"])
+        planned = max((day.get("day_number", 0) for day in old_trip["itinerary"] if isinstance(day, dict)),
+                      default=0)
+        if new_duration > planned:
+            delta.new_days = (planned + 1, new_duration)
+        if "costs" not in delta.sections:
+            if _numeric_costs(old_trip.get("costs")) and old_duration:
+                delta.cost_scale = new_duration / old_duration
+            else:
+                _add_section(delta, "costs")
+
+    if "interests" in changed:
+        old_interests = set(old_trip.get("interests") or [])
+        new_interests = new_inputs.get("interests") or []
+        if old_interests - set(new_interests):
+            # Attractions are not tagged by interest, so a removal means a fresh list
+            _add_section(delta, "attractions")
+        else:
+            delta.added_interests = [interest for interest in new_interests if interest not in old_interests]
+
+    return delta
+
+
+def _already_planned(days, limit=400):
+    summary = "; ".join(activity for day in days for activity in day.get("activities", [])[:1])
+    return summary[:limit]
+
+
+def replan_trip(generate, old_trip, new_inputs, delta=None, max_workers=4, timeout=60, retries=2, backoff=1.0):
+    """Update a saved trip for edited inputs by asking only for what changed.
+
+    ``generate(prompt, timeout, keys)`` is the same callable generate_segmented
+    takes. Days past the new duration are dropped, new days are requested
+    with a reminder of what earlier days already cover, regenerated sections
+    replace the old ones and attractions for added interests are appended.
+    Returns the merged trip (keeping the old trip's id and other fields).
+    Segment failures propagate after their retries.
+    """
+    delta = delta if delta is not None else plan_delta(old_trip, new_inputs)
+    if delta is None:
+        raise ValueError("This edit needs a full re-plan")
+
+    trip = {**old_trip, **new_inputs}
+    duration = int(new_inputs["duration"])
+    context = trip_context(new_inputs["destination"], duration, new_inputs["interests"], new_inputs["budget"],
+                           new_inputs["travelers"])
+    kept_days = [day for day in old_trip["itinerary"] if isinstance(day, dict) and day.get("day_number", 0) <= duration]
+
+    segments = {}
+    if delta.new_days is not None:
+        first_day, last_day = delta.new_days
+        parts = [itinerary_prompt(context, first_day, last_day)]
+        if kept_days:
+            parts.append(f"Earlier days already cover: {_already_planned(kept_days)}. Do not repeat them.")
+        segments["days"] = ("\n".join(parts), ("itinerary",))
+    if delta.sections:
+        segments["sections"] = (sections_prompt(context, tuple(delta.sections)), tuple(delta.sections))
+    if delta.added_interests:
+        interest_context = trip_context(new_inputs["destination"], duration, delta.added_interests,
+                                        new_inputs["budget"], new_inputs["travelers"])
+        known = ", ".join(item.get("name", "") for item in old_trip.get("attractions") or [] if isinstance(item, dict))
+        parts = [sections_prompt(interest_context, ("attractions",))]
+        if known:
+            parts.append(f"Skip these, already recommended: {known}")
+        segments["interests"] = ("\n".join(parts), ("attractions",))
+
+    results = {}
+    if segments:
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="replan") as pool:
+            futures = {name: pool.submit(_run_segment, generate, prompt, keys, timeout, retries, backoff)
+                       for name, (prompt, keys) in segments.items()}
+            results = {name: future.result() for name, future in futures.items()}
+
+    itinerary = kept_days
+    if "days" in results:
+        first_day, last_day = delta.new_days
+        new_days = _normalize_days(results["days"]["itinerary"], first_day, last_day)
+        itinerary = kept_days + [day for day in new_days if first_day <= day["day_number"] <= last_day]
+    trip["itinerary"] = sorted(itinerary, key=lambda day: day.get("day_number", 0))
+
+    if delta.cost_scale is not None:
+        trip["costs"] = {category: round(amount * delta.cost_scale, 2) for category, amount in trip["costs"].items()}
+    trip.update(results.get("sections", {}))
+    if "interests" in results:
+        known = {item.get("name") for item in trip.get("attractions") or [] if isinstance(item, dict)}
+        added = [item for item in results["interests"]["attractions"] if item.get("name") not in known]
+        trip["attractions"] = list(trip.get("attractions") or []) + added
+    return trip
@@ -0,0 +1,236 @@
+import json
+import re
+
+from safarnama.plan_stream import strip_code_fences
+
+_STRING = {"type": "STRING"}
+_NAMED_ITEMS = {
+    "type": "ARRAY",
+    "items": {
+        "type": "OBJECT",
+        "properties": {"name": _STRING, "description": _STRING},
+        "required": ["name", "description"],
+    },
+}
+
+COST_CATEGORIES = ("accommodation", "food", "activities", "transportation")
+
+# Response schema for Gemini's native JSON output (an OpenAPI subset)
+SECTION_SCHEMAS = {
+    "itinerary": {
+        "type": "ARRAY",
+        "items": {
+            "type": "OBJECT",
+            "properties": {
+                "day_number": {"type": "INTEGER"},
+                "activities": {"type": "ARRAY", "items": _STRING},
+            },
+            "required": ["day_number", "activities"],
+        },
+    },
+    "accommodations": {
+        "type": "ARRAY",
+        "items": {
+            "type": "OBJECT",
+            "properties": {"name": _STRING, "price": _STRING, "description": _STRING},
+            "required": ["name", "price", "description"],
+        },
+    },
+    "attractions": _NAMED_ITEMS,
+    "food": _NAMED_ITEMS,
+    "transportation": {"type": "ARRAY", "items": _STRING},
+    "costs": {
+        "type": "OBJECT",
+        "properties": {category: {"type": "NUMBER"} for category in COST_CATEGORIES},
+        "required": list(COST_CATEGORIES),
+    },
+    "tips": {"type": "ARRAY", "items": _STRING},
+}
+PLAN_SECTIONS = tuple(SECTION_SCHEMAS)
+
+
+def plan_schema(sections=PLAN_SECTIONS):
+    return {
+        "type": "OBJECT",
+        "properties": {section: SECTION_SCHEMAS[section] for section in sections},
+        "required": list(sections),
+    }
+
+
+# generation_config asking for JSON that follows the schema for the given sections
+def json_generation_config(sections=PLAN_SECTIONS):
+    return {"response_mime_type": "application/json", "response_schema": plan_schema(sections)}
+
+
+def repair_json(content):
+    """Best-effort fix-up of almost-JSON from a model.
+
+    Strips markdown fences and trailing commas, and if the text was cut off,
+    drops the incomplete last value and closes any open arrays and objects.
+    Returns the parsed value or raises json.JSONDecodeError.
+    """
+    text = strip_code_fences(content)
+    start = min((i for i in (text.find("{"), text.find("[")) if i >= 0), default=0)
+    text = _drop_trailing_commas(text[start:])
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError as e:
+        error = e
+
+    # Remember the open brackets at each point where the text could be cut cleanly
+    cuts = []
+    stack = []
+    in_string = escape = False
+    for i, ch in enumerate(text):
+        if in_string:
+            if escape:
+                escape = False
+            elif ch == "\\":
+                escape = True
+            elif ch == '"':
+                in_string = False
+            continue
+        if ch == '"':
+            in_string = True
+        elif ch in "{[":
+            stack.append("}" if ch == "{" else "]")
+            cuts.append((i + 1, "".join(reversed(stack))))
+        elif ch in "}]":
+            if stack:
+                stack.pop()
+            cuts.append((i + 1, "".join(reversed(stack))))
+        elif ch == ",":
+            cuts.append((i, "".join(reversed(stack))))
+
+    for end, closers in reversed(cuts[-500:]):
+        try:
+            return json.loads(_drop_trailing_commas(text[:end]) + closers)
+        except json.JSONDecodeError:
+            continue
+    raise error
+
+
+def _drop_trailing_commas(text):
+    return re.sub(r",\s*([}\]])", r"\1", text)
+
+
+def _number(value):
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    match = re.search(r"\d[\d,]*(?:\.\d+)?", str(value))
+    if match is None:
+        raise ValueError(f"not a number: {value!r}")
+    return float(match.group(0).replace(",", ""))
+
+
+def _named_items(items, extra=()):
+    if isinstance(items, (str, dict)):
+        items = [items]
+    fixed = []
+    for item in items:
+        if isinstance(item, dict):
+            item = dict(item)
+            name = item.get("name") or item.get("title") or item.get("place")
+            if not name:
+                continue
+            item["name"] = str(name)
+            for key in ("description",) + extra:
+                if key in item and not isinstance(item[key], str):
+                    item[key] = str(item[key])
+            fixed.append(item)
+        elif item:
+            fixed.append({"name": str(item)})
+    return fixed
+
+
+def _string_list(items):
+    if isinstance(items, str):
+        return [items]
+    if isinstance(items, dict):
+        return [f"{key}: {value}" for key, value in items.items()]
+    return [str(item) for item in items if item]
+
+
+def _itinerary(days):
+    if isinstance(days, dict):
+        days = list(days.values())
+    fixed = []
+    for position, day in enumerate(days, start=1):
+        if not isinstance(day, dict):
+            day = {"activities": day}
+        day = dict(day)
+        try:
+            day["day_number"] = int(_number(day.get("day_number", position)))
+        except ValueError:
+            day["day_number"] = position
+        day["activities"] = _string_list(day.get("activities") or [])
+        fixed.append(day)
+    return fixed
+
+
+def _costs(costs):
+    if isinstance(costs, list):
+        costs = {item["category"]: item["amount"] for item in costs
+                 if isinstance(item, dict) and "category" in item and "amount" in item}
+    return {str(category).lower(): _number(amount) for category, amount in costs.items()}
+
+
+_COERCERS = {
+    "itinerary": _itinerary,
+    "accommodations": lambda items: _named_items(items, extra=("price",)),
+    "attractions": _named_items,
+    "food": _named_items,
+    # Older plans use a {topic: tip} object, which the UI still renders
+    "transportation": lambda value: value if isinstance(value, dict) else _string_list(value),
+    "costs": _costs,
+    "tips": _string_list,
+}
+
+
+def missing_days(itinerary, duration):
+    """Day numbers from 1 to ``duration`` that ``itinerary`` has no activities for.
+
+    A day cut off mid-reply is repaired to an empty object, so it counts as missing.
+    """
+    covered = {day.get("day_number") for day in itinerary if isinstance(day, dict) and day.get("activities")}
+    return [day for day in range(1, int(duration) + 1) if day not in covered]
+
+
+def validate_plan(plan, sections=PLAN_SECTIONS, duration=None):
+    """Coerce a parsed plan towards the schema.
+
+    Fixes the usual model slips (a string where a list belongs, "$1,200" for a
+    number, a list of {category, amount} costs, missing day numbers) and
+    returns ``(plan, problems)`` where ``problems`` maps each section that is
+    missing, empty or unusable to a short reason. With ``duration``, an
+    itinerary that does not cover every day (a cut-off reply repaired to
+    fewer days) is a problem too, but its days are kept in the plan.
+    """
+    if not isinstance(plan, dict):
+        return {}, {section: "plan is not an object" for section in sections}
+
+    fixed = dict(plan)
+    problems = {}
+    for section in sections:
+        value = plan.get(section)
+        if value in (None, "", [], {}):
+            problems[section] = "missing"
+            fixed.pop(section, None)
+            continue
+        try:
+            value = _COERCERS[section](value)
+        except (AttributeError, KeyError, TypeError, ValueError) as e:
+            problems[section] = f"invalid: {e}"
+            fixed.pop(section, None)
+            continue
+        if not value:
+            problems[section] = "empty after validation"
+            fixed.pop(section, None)
+            continue
+        fixed[section] = value
+
+    if duration is not None and "itinerary" in fixed and "itinerary" in sections:
+        missing = missing_days(fixed["itinerary"], duration)
+        if missing:
+            problems["itinerary"] = f"missing days {missing[0]} to {missing[-1]}"
+    return fixed, problems
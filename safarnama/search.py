@@ -0,0 +1,145 @@
+import bisect
+import heapq
+import math
+import re
+import threading
+
+# How much a match in each part of a trip counts towards its rank
+FIELD_WEIGHTS = {
+    "destination": 5.0,
+    "interests": 3.0,
+    "attractions": 2.0,
+    "food": 2.0,
+    "itinerary": 1.0,
+}
+
+_TOKEN = re.compile(r"[^\W_]+")
+
+
+def tokenize(text):
+    return _TOKEN.findall(str(text).lower())
+
+
+def _names(items):
+    for item in items or []:
+        if isinstance(item, dict):
+            if "name" in item:
+                yield item["name"]
+        elif item:
+            yield item
+
+
+def trip_fields(trip):
+    """Yield (field, text) pairs for everything searchable in a trip."""
+    yield "destination", trip.get("destination", "")
+    for interest in trip.get("interests") or []:
+        yield "interests", interest
+    for day in trip.get("itinerary") or []:
+        if isinstance(day, dict):
+            activities = day.get("activities") or []
+            for activity in activities if isinstance(activities, list) else [activities]:
+                yield "itinerary", activity
+    for name in _names(trip.get("attractions")):
+        yield "attractions", name
+    for name in _names(trip.get("food")):
+        yield "food", name
+
+
+class TripIndex:
+    """In-memory inverted index over saved trips.
+
+    Each token maps to ``{trip_id: weight}``, the weight being the sum of
+    FIELD_WEIGHTS over every occurrence in the trip. ``add`` replaces any
+    earlier version of a trip, so it can be called on every save. Searches
+    match all query tokens, the last one as a prefix (for search-as-you-type),
+    and rank by weight times inverse document frequency.
+    """
+
+    def __init__(self, trips=()):
+        self.postings = {}
+        self._trip_tokens = {}
+        # Sorted vocabulary for prefix lookups
+        self._vocabulary = []
+        self._lock = threading.Lock()
+        for trip in trips:
+            self.add(trip)
+
+    def __len__(self):
+        return len(self._trip_tokens)
+
+    def add(self, trip):
+        weights = {}
+        for field, text in trip_fields(trip):
+            for token in tokenize(text):
+                weights[token] = weights.get(token, 0.0) + FIELD_WEIGHTS[field]
+
+        with self._lock:
+            self._remove(trip["id"])
+            for token, weight in weights.items():
+                postings = self.postings.get(token)
+                if postings is None:
+                    postings = self.postings[token] = {}
+                    bisect.insort(self._vocabulary, token)
+                postings[trip["id"]] = weight
+            self._trip_tokens[trip["id"]] = list(weights)
+
+    def remove(self, trip_id):
+        with self._lock:
+            self._remove(trip_id)
+
+    def search(self, query, limit=None):
+        """Return trip ids matching every word of ``query``, best first."""
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+
+        with self._lock:
+            total = len(self._trip_tokens)
+            # One {trip_id: weight} map and idf per query word; a prefix that
+            # expands to several terms is merged into a single map up front
+            groups = []
+            for position, token in enumerate(tokens):
+                terms = self._expand(token, prefix=position == len(tokens) - 1)
+                if not terms:
+                    return []
+                if len(terms) == 1:
+                    postings = self.postings[terms[0]]
+                    groups.append((postings, math.log(1 + total / len(postings))))
+                    continue
+                merged = {}
+                for term in terms:
+                    postings = self.postings[term]
+                    idf = math.log(1 + total / len(postings))
+                    for trip_id, weight in postings.items():
+                        if weight * idf > merged.get(trip_id, 0.0):
+                            merged[trip_id] = weight * idf
+                groups.append((merged, 1.0))
+
+            # Start from the rarest word so later words only check the survivors
+            groups.sort(key=lambda group: len(group[0]))
+            postings, idf = groups[0]
+            scores = {trip_id: weight * idf for trip_id, weight in postings.items()}
+            for postings, idf in groups[1:]:
+                scores = {trip_id: score + postings[trip_id] * idf
+                          for trip_id, score in scores.items() if trip_id in postings}
+                if not scores:
+                    return []
+
+        if limit is not None:
+            return heapq.nlargest(limit, scores, key=scores.__getitem__)
+        return sorted(scores, key=scores.__getitem__, reverse=True)
+
+    def _expand(self, token, prefix):
+        if not prefix:
+            return [token] if token in self.postings else []
+        start = bisect.bisect_left(self._vocabulary, token)
+        end = bisect.bisect_left(self._vocabulary, token + "￿", lo=start)
+        return self._vocabulary[start:end]
+
+    def _remove(self, trip_id):
+        for token in self._trip_tokens.pop(trip_id, ()):
+            postings = self.postings[token]
+            del postings[trip_id]
+            if not postings:
+                del self.postings[token]
+                del self._vocabulary[bisect.bisect_left(self._vocabulary, token)]
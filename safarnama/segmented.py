@@ -0,0 +1,153 @@
+import time
+from concurrent.futures import FIRST_COMPLETED, CancelledError, ThreadPoolExecutor, wait
+
+from safarnama.prompts import expand_plan, plan_request, trip_context
+from safarnama.schema import repair_json, validate_plan
+
+# Sections requested together in one sub-request each
+SECTION_GROUPS = (
+    ("accommodations",),
+    ("attractions", "food"),
+    ("transportation", "costs"),
+    ("tips",),
+)
+
+
+class SegmentError(Exception):
+    def __init__(self, segment, cause=None):
+        super().__init__(f"Segment '{segment}' failed: {cause}")
+        self.segment = segment
+        self.cause = cause
+
+
+# Split a trip into inclusive (first_day, last_day) ranges
+def split_days(duration, days_per_segment=5):
+    duration = int(duration)
+    return [(first, min(first + days_per_segment - 1, duration))
+            for first in range(1, duration + 1, days_per_segment)]
+
+
+def itinerary_prompt(context, first_day, last_day):
+    return plan_request(context, ("itinerary",), first_day, last_day)
+
+
+def sections_prompt(context, keys):
+    return plan_request(context, keys)
+
+
+# Stop before the next model request once ``cancel_event`` is set
+def _check_cancelled(cancel_event):
+    if cancel_event is not None and cancel_event.is_set():
+        raise CancelledError()
+
+
+def _run_segment(generate, prompt, keys, timeout, retries, backoff, cancel_event=None):
+    last_error = None
+    for attempt in range(retries + 1):
+        if attempt:
+            time.sleep(backoff * 2 ** (attempt - 1))
+        _check_cancelled(cancel_event)
+        try:
+            result, problems = validate_plan(expand_plan(repair_json(generate(prompt, timeout, keys)), keys), keys)
+            if problems:
+                raise ValueError("; ".join(f"{key} {problem}" for key, problem in problems.items()))
+            return {key: result[key] for key in keys}
+        except Exception as e:
+            last_error = e
+    raise last_error
+
+
+# Yield futures as they finish, raising SegmentError once any segment has run
+# for longer than ``deadline`` seconds since it started (not since it queued)
+def _completed_in_time(futures, started, deadline):
+    pending = set(futures)
+    while pending:
+        running = [started[futures[f]] + deadline for f in pending if futures[f] in started]
+        wait_for = max(0.0, min(running) - time.monotonic()) if running else deadline
+        done, pending = wait(pending, timeout=wait_for, return_when=FIRST_COMPLETED)
+        now = time.monotonic()
+        overdue = [futures[f] for f in pending if futures[f] in started and now >= started[futures[f]] + deadline]
+        if not done and overdue:
+            raise SegmentError(", ".join(overdue), "timed out")
+        yield from done
+
+
+# Make day numbers absolute even if the model restarted its count at 1
+def _normalize_days(days, first_day, last_day):
+    days = [day for day in days if isinstance(day, dict)]
+    numbers = [day.get("day_number") for day in days]
+    if not all(isinstance(n, int) and first_day <= n <= last_day for n in numbers):
+        for offset, day in enumerate(days):
+            day["day_number"] = first_day + offset
+    return days
+
+
+def generate_segmented(generate, destination, duration, interests, budget, travelers,
+                       days_per_segment=5, max_workers=None, timeout=60, retries=2, backoff=1.0,
+                       on_event=None, cancel_event=None):
+    """Generate a trip plan as independent sub-requests run concurrently.
+
+    ``generate(prompt, timeout, keys)`` must return the model's reply text
+    (with compact or full keys) for a request covering the plan sections in
+    ``keys``. Each itinerary day range and each group in SECTION_GROUPS is requested
+    separately, retried with exponential backoff, and merged into the usual
+    trip plan dict. All segments run at once unless ``max_workers`` (e.g. the
+    client pool's per-key concurrency) is lower, and each gets its own
+    deadline counted from when it starts. ``on_event`` receives the same events as
+    IncrementalPlanParser, always from the calling thread and with itinerary
+    days in order. Raises SegmentError if any segment fails for good, and
+    CancelledError once ``cancel_event`` is set (segments still running stop
+    before their next request).
+    """
+    context = trip_context(destination, duration, interests, budget, travelers)
+    day_ranges = split_days(duration, days_per_segment)
+
+    segments = {}
+    for first_day, last_day in day_ranges:
+        segments[f"days {first_day}-{last_day}"] = (itinerary_prompt(context, first_day, last_day), ("itinerary",))
+    for keys in SECTION_GROUPS:
+        segments[" + ".join(keys)] = (sections_prompt(context, keys), keys)
+
+    started = {}
+
+    def run(name, prompt, keys):
+        started[name] = time.monotonic()
+        return _run_segment(generate, prompt, keys, timeout, retries, backoff, cancel_event)
+
+    workers = len(segments) if max_workers is None else max(1, min(max_workers, len(segments)))
+    pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="segment")
+    futures = {pool.submit(run, name, prompt, keys): name for name, (prompt, keys) in segments.items()}
+    deadline = timeout * (retries + 1) + backoff * (2 ** retries) + 1
+
+    plan = {}
+    day_results = {}
+    next_range = 0
+    try:
+        for future in _completed_in_time(futures, started, deadline):
+            name = futures[future]
+            _check_cancelled(cancel_event)
+            try:
+                result = future.result()
+            except Exception as e:
+                raise SegmentError(name, e) from e
+
+            if "itinerary" in result:
+                first_day, last_day = map(int, name.split()[1].split("-"))
+                day_results[first_day] = _normalize_days(result["itinerary"], first_day, last_day)
+                # Release days in order as soon as the leading ranges are complete
+                while next_range < len(day_ranges) and day_ranges[next_range][0] in day_results:
+                    if on_event is not None:
+                        for day in day_results[day_ranges[next_range][0]]:
+                            on_event(("day", day))
+                    next_range += 1
+            else:
+                for key, value in result.items():
+                    plan[key] = value
+                    if on_event is not None:
+                        on_event(("section", key, value))
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    itinerary = [day for first_day, _ in day_ranges for day in day_results[first_day]]
+    itinerary.sort(key=lambda day: day.get("day_number", 0))
+    return {"itinerary": itinerary, **plan}
@@ -0,0 +1,201 @@
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime
+
+# Trip inputs that get their own columns; every other plan key lives in the plan JSON
+TRIP_COLUMNS = ("destination", "travel_date", "duration", "budget", "travelers")
+EXPENSE_COLUMNS = ("date", "category", "description", "amount")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS trips (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id TEXT NOT NULL,
+    destination TEXT,
+    travel_date TEXT,
+    duration INTEGER,
+    budget TEXT,
+    travelers INTEGER,
+    interests TEXT NOT NULL DEFAULT '[]',
+    plan TEXT NOT NULL DEFAULT '{}',
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_trips_user ON trips(user_id, id);
+
+CREATE TABLE IF NOT EXISTS itinerary_days (
+    trip_id INTEGER NOT NULL REFERENCES trips(id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    day_number INTEGER,
+    data TEXT NOT NULL,
+    PRIMARY KEY (trip_id, position)
+);
+
+CREATE TABLE IF NOT EXISTS expenses (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    trip_id INTEGER NOT NULL REFERENCES trips(id) ON DELETE CASCADE,
+    date TEXT NOT NULL,
+    category TEXT NOT NULL,
+    description TEXT NOT NULL,
+    amount REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_expenses_trip_date ON expenses(trip_id, date);
+"""
+
+
+class TripStore:
+    """SQLite (WAL) persistence for trips, their itinerary days and expenses.
+
+    One store is shared by every session; all access goes through a lock so the
+    single connection can be used from any thread. Trips belong to a
+    ``user_id``, and a trip is only ever updated or deleted by its own user.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA foreign_keys=ON")
+        self._conn.executescript(SCHEMA)
+
+    # Insert or update a trip and return its id. Expenses are not touched here.
+    # Raises PermissionError for the id of another user's trip.
+    def save_trip(self, trip, user_id="default"):
+        now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        created_at = trip.get("created_at") or now
+        plan = {k: v for k, v in trip.items()
+                if k not in TRIP_COLUMNS and k not in ("id", "interests", "itinerary", "expenses", "created_at")}
+        values = [trip.get(column) for column in TRIP_COLUMNS]
+        interests = json.dumps(list(trip.get("interests", [])))
+        plan_json = json.dumps(plan)
+
+        with self._lock, self._conn:
+            trip_id = trip.get("id")
+            owner = trip_id is not None and self._conn.execute(
+                "SELECT user_id FROM trips WHERE id = ?", (trip_id,)
+            ).fetchone()
+            if owner and owner[0] != user_id:
+                raise PermissionError(f"Trip {trip_id} belongs to another user")
+            if owner:
+                self._conn.execute(
+                    "UPDATE trips SET destination = ?, travel_date = ?, duration = ?, budget = ?, travelers = ?, "
+                    "interests = ?, plan = ?, updated_at = ? WHERE id = ? AND user_id = ?",
+                    (*values, interests, plan_json, now, trip_id, user_id),
+                )
+                self._conn.execute("DELETE FROM itinerary_days WHERE trip_id = ?", (trip_id,))
+            else:
+                cursor = self._conn.execute(
+                    "INSERT INTO trips (id, user_id, destination, travel_date, duration, budget, travelers, "
+                    "interests, plan, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (trip_id, user_id, *values, interests, plan_json, created_at, now),
+                )
+                trip_id = cursor.lastrowid
+
+            days = trip.get("itinerary") or []
+            self._conn.executemany(
+                "INSERT INTO itinerary_days (trip_id, position, day_number, data) VALUES (?, ?, ?, ?)",
+                [(trip_id, position, day.get("day_number") if isinstance(day, dict) else None, json.dumps(day))
+                 for position, day in enumerate(days)],
+            )
+        return trip_id
+
+    def load_trips(self, user_id="default"):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, destination, travel_date, duration, budget, travelers, interests, plan, created_at "
+                "FROM trips WHERE user_id = ? ORDER BY id", (user_id,)
+            ).fetchall()
+            day_rows = self._conn.execute(
+                "SELECT d.trip_id, d.data FROM itinerary_days d JOIN trips t ON t.id = d.trip_id "
+                "WHERE t.user_id = ? ORDER BY d.trip_id, d.position", (user_id,)
+            ).fetchall()
+
+        days_by_trip = {}
+        for trip_id, data in day_rows:
+            days_by_trip.setdefault(trip_id, []).append(json.loads(data))
+        return [self._row_to_trip(row, days_by_trip.get(row[0], [])) for row in rows]
+
+    def get_trip(self, trip_id, user_id="default"):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id, destination, travel_date, duration, budget, travelers, interests, plan, created_at "
+                "FROM trips WHERE id = ? AND user_id = ?", (trip_id, user_id)
+            ).fetchone()
+            if row is None:
+                return None
+            days = [json.loads(data) for (data,) in self._conn.execute(
+                "SELECT data FROM itinerary_days WHERE trip_id = ? ORDER BY position", (trip_id,)
+            )]
+        return self._row_to_trip(row, days)
+
+    def delete_trip(self, trip_id, user_id="default"):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM trips WHERE id = ? AND user_id = ?", (trip_id, user_id))
+
+    # Append expenses in a single transaction
+    def add_expenses(self, trip_id, expenses):
+        rows = [(trip_id, e["date"], e["category"], e["description"], float(e["amount"])) for e in expenses]
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT INTO expenses (trip_id, date, category, description, amount) VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+        return len(rows)
+
+    def load_expenses(self, trip_id):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT date, category, description, amount FROM expenses WHERE trip_id = ? ORDER BY date, id",
+                (trip_id,),
+            ).fetchall()
+        return [dict(zip(EXPENSE_COLUMNS, row), trip_id=trip_id) for row in rows]
+
+    # Expense rows as (date, category, description, amount) tuples in the
+    # order load_expenses uses, fetched batch_size at a time so exports never
+    # hold a whole trip's expenses in memory. Pages by (date, id) so every
+    # batch is a range scan of idx_expenses_trip_date.
+    def iter_expenses(self, trip_id, batch_size=10_000):
+        last = ("", 0)
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT date, id, category, description, amount FROM expenses "
+                    "WHERE trip_id = ? AND (date, id) > (?, ?) ORDER BY date, id LIMIT ?",
+                    (trip_id, *last, batch_size),
+                ).fetchall()
+            if not rows:
+                return
+            last = rows[-1][:2]
+            yield [(day, category, description, amount) for day, _, category, description, amount in rows]
+
+    def count_expenses(self, trip_id):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM expenses WHERE trip_id = ?", (trip_id,)).fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    @staticmethod
+    def _row_to_trip(row, days):
+        trip_id, destination, travel_date, duration, budget, travelers, interests, plan, created_at = row
+        trip = {
+            "id": trip_id,
+            "destination": destination,
+            "travel_date": travel_date,
+            "duration": duration,
+            "budget": budget,
+            "travelers": travelers,
+            "interests": json.loads(interests),
+            "created_at": created_at,
+        }
+        if days:
+            trip["itinerary"] = days
+        trip.update(json.loads(plan))
+        return trip
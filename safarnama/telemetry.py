@@ -0,0 +1,228 @@
+import bisect
+import json
+import logging
+import math
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# JSON-lines records for every finished span go to this logger at INFO
+logger = logging.getLogger("safarnama.telemetry")
+
+
+class LatencyHistogram:
+    """Log-bucketed latency histogram (50 ms to ~2 min) with quantile estimates."""
+
+    BOUNDS = tuple(0.05 * 1.25 ** i for i in range(36))
+
+    def __init__(self):
+        self.counts = [0] * (len(self.BOUNDS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds):
+        with self._lock:
+            self.counts[bisect.bisect_left(self.BOUNDS, seconds)] += 1
+            self.count += 1
+            self.total += seconds
+
+    # Upper bound of the bucket holding the q-th quantile (q in 0..1)
+    def quantile(self, q):
+        with self._lock:
+            if not self.count:
+                return None
+            rank = max(1, math.ceil(q * self.count))
+            seen = 0
+            for i, count in enumerate(self.counts):
+                seen += count
+                if seen >= rank:
+                    return self.BOUNDS[i] if i < len(self.BOUNDS) else math.inf
+        return math.inf
+
+
+class SpanHistogram(LatencyHistogram):
+    """LatencyHistogram with buckets from 0.1 ms, for in-process work."""
+
+    BOUNDS = tuple(0.0001 * 1.5 ** i for i in range(40))
+
+
+class Span:
+    def __init__(self, telemetry, name, attrs):
+        self.telemetry = telemetry
+        self.name = name
+        self.attrs = attrs
+        self.started = time.perf_counter()
+        self.seconds = None
+
+    def end(self, **attrs):
+        if self.seconds is None:
+            self.seconds = time.perf_counter() - self.started
+            self.attrs.update(attrs)
+            self.telemetry._finish(self)
+        return self.seconds
+
+
+class Telemetry:
+    """Process-wide spans, counters and model token usage.
+
+    ``span(name)`` times a block into a per-name histogram; counters are
+    keyed by name and a sorted tuple of label pairs. Finished spans are also
+    logged as JSON lines when ``logger`` is enabled for INFO. Everything is
+    kept in memory with fixed-size histograms, so it is cheap to leave on.
+    """
+
+    def __init__(self):
+        self.spans = {}
+        self.last = {}
+        self.counters = {}
+        self.started_at = time.time()
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, name, **attrs):
+        span = Span(self, name, attrs)
+        try:
+            yield span
+        finally:
+            span.end()
+
+    # For spans that cannot wrap a block, e.g. a whole tab of the script
+    def start_span(self, name, **attrs):
+        return Span(self, name, attrs)
+
+    def incr(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def cache(self, name, hit):
+        self.incr("cache_hits_total" if hit else "cache_misses_total", cache=name)
+
+    # Token counts from a response's usage_metadata, when the model reports them
+    def record_usage(self, model, usage):
+        if usage is None:
+            return
+        prompt_tokens = getattr(usage, "prompt_token_count", 0) or 0
+        response_tokens = getattr(usage, "candidates_token_count", 0) or 0
+        self.incr("model_requests_total", model=model)
+        self.incr("model_prompt_tokens_total", prompt_tokens, model=model)
+        self.incr("model_response_tokens_total", response_tokens, model=model)
+
+    def counter(self, name, **labels):
+        return self.counters.get((name, tuple(sorted(labels.items()))), 0)
+
+    def counter_total(self, name):
+        with self._lock:
+            return sum(value for (counter, _), value in self.counters.items() if counter == name)
+
+    def cache_hit_rates(self):
+        with self._lock:
+            caches = {dict(labels)["cache"] for name, labels in self.counters
+                      if name in ("cache_hits_total", "cache_misses_total")}
+        rates = {}
+        for cache in sorted(caches):
+            hits = self.counter("cache_hits_total", cache=cache)
+            misses = self.counter("cache_misses_total", cache=cache)
+            rates[cache] = {"hits": hits, "misses": misses, "hit_rate": hits / (hits + misses)}
+        return rates
+
+    def span_stats(self):
+        rows = []
+        with self._lock:
+            names = sorted(self.spans)
+        for name in names:
+            histogram = self.spans[name]
+            rows.append({
+                "span": name,
+                "count": histogram.count,
+                "mean_ms": histogram.total / histogram.count * 1000,
+                "p50_ms": histogram.quantile(0.5) * 1000,
+                "p95_ms": histogram.quantile(0.95) * 1000,
+                "last_ms": self.last[name] * 1000,
+            })
+        return rows
+
+    def prometheus(self, prefix="safarnama"):
+        """Render everything in the Prometheus text exposition format."""
+        lines = [
+            f"# TYPE {prefix}_span_seconds histogram",
+        ]
+        with self._lock:
+            spans = sorted(self.spans.items())
+            counters = sorted(self.counters.items())
+        for name, histogram in spans:
+            with histogram._lock:
+                counts = list(histogram.counts)
+                count, total = histogram.count, histogram.total
+            cumulative = 0
+            for bound, bucket in zip(histogram.BOUNDS, counts):
+                cumulative += bucket
+                lines.append(f'{prefix}_span_seconds_bucket{{span="{name}",le="{bound:.6g}"}} {cumulative}')
+            lines.append(f'{prefix}_span_seconds_bucket{{span="{name}",le="+Inf"}} {count}')
+            lines.append(f'{prefix}_span_seconds_sum{{span="{name}"}} {total:.6f}')
+            lines.append(f'{prefix}_span_seconds_count{{span="{name}"}} {count}')
+
+        typed = set()
+        for (name, labels), value in counters:
+            if name not in typed:
+                lines.append(f"# TYPE {prefix}_{name} counter")
+                typed.add(name)
+            label_text = ",".join(f'{key}="{_escape_label(value)}"' for key, value in labels)
+            lines.append(f"{prefix}_{name}{{{label_text}}} {value}" if label_text else f"{prefix}_{name} {value}")
+        lines.append(f"# TYPE {prefix}_start_time_seconds gauge")
+        lines.append(f"{prefix}_start_time_seconds {self.started_at:.0f}")
+        return "\n".join(lines) + "\n"
+
+    def _finish(self, span):
+        with self._lock:
+            histogram = self.spans.get(span.name)
+            if histogram is None:
+                histogram = self.spans[span.name] = SpanHistogram()
+            self.last[span.name] = span.seconds
+        histogram.observe(span.seconds)
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(json.dumps({"ts": round(time.time(), 3), "span": span.name,
+                                    "ms": round(span.seconds * 1000, 3), **span.attrs}, default=str))
+
+
+def _escape_label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+TELEMETRY = Telemetry()
+
+
+# Append span records to ``path``, one JSON object per line
+def log_spans_to(path):
+    handler = logging.FileHandler(path)
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    return handler
+
+
+def start_metrics_server(port, telemetry=TELEMETRY, host="127.0.0.1"):
+    """Serve ``telemetry.prometheus()`` at /metrics from a daemon thread."""
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = telemetry.prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    return server
@@ -0,0 +1,73 @@
+import pytest
+
+from benchmarks.harness import by_label, install_stub_model, isolated_app, navigate, new_session, run_checked, seed_trips
+
+
+@pytest.fixture(scope="module", autouse=True)
+def stub_model():
+    install_stub_model(latency=0.0)
+
+
+def test_two_open_trips_with_the_same_costs():
+    with isolated_app():
+        trips = seed_trips(2)
+        assert trips[0]["costs"] == trips[1]["costs"]
+        at = navigate(new_session(), "My Trips")
+        for trip in trips:
+            by_label(at.button, "View Details").click()
+            run_checked(at)
+        assert [button.label for button in at.button if (button.key or "").startswith("view_")] == ["Hide Details"] * 2
+        assert not at.exception
+
+
+def test_editing_a_trip_in_the_background_updates_it_in_place():
+    import time
+
+    from safarnama.storage import TripStore
+
+    with isolated_app() as data_dir:
+        trip = seed_trips(1)[0]
+        at = navigate(new_session(), "My Trips")
+        by_label(at.button, "Edit Trip").click()
+        run_checked(at)
+        assert by_label(at.date_input, "Travel Date").value.isoformat() == trip["travel_date"]
+
+        # A new destination needs a whole new plan, which goes to the background job
+        by_label(at.text_input, "Destination").input("Lisbon")
+        by_label(at.checkbox, "Generate in the background and keep browsing").check()
+        by_label(at.button, "Generate Trip Plan").click()
+        run_checked(at)
+        assert at.session_state.editing_trip_id is None
+        for _ in range(100):
+            if at.session_state.trips[0]["destination"] == "Lisbon":
+                break
+            time.sleep(0.05)
+            run_checked(at)
+
+        store = TripStore(f"{data_dir}/trips.sqlite3")
+        try:
+            saved = store.load_trips("bench")
+        finally:
+            store.close()
+        assert [(saved_trip["id"], saved_trip["destination"]) for saved_trip in saved] == [(trip["id"], "Lisbon")]
+        assert saved[0]["travel_date"] == trip["travel_date"]
+        assert saved[0]["created_at"] == trip["created_at"]
+
+
+def test_trips_follow_the_page_link_by_default(monkeypatch):
+    with isolated_app():
+        monkeypatch.delenv("SAFARNAMA_USER")
+        first = new_session()
+        by_label(first.text_input, "Destination").input("Lisbon")
+        by_label(first.button, "Generate Trip Plan").click()
+        run_checked(first)
+        assert [trip["destination"] for trip in first.session_state.trips] == ["Lisbon"]
+
+        link = first.query_params["traveler"]
+        assert first.session_state.trip_store_user == f"link:{link}"
+
+        other = new_session()
+        assert other.session_state.trips == []
+
+        reopened = new_session(query_params={"traveler": link})
+        assert [trip["destination"] for trip in reopened.session_state.trips] == ["Lisbon"]
@@ -0,0 +1,97 @@
+import json
+import threading
+import time
+
+import pytest
+
+from safarnama.backends import Backend, HedgedBackend
+from safarnama.clients import ClientPool
+from safarnama.fake_model import FakeResponse
+
+PLAN = json.dumps({"tips": ["Carry water"]})
+
+
+class StubModel:
+    def __init__(self, latency=0.0, text=PLAN, error=None):
+        self.latency = latency
+        self.text = text
+        self.error = error
+        self.calls = 0
+
+    def generate_content(self, prompt, stream=False, **kwargs):
+        self.calls += 1
+        time.sleep(self.latency)
+        if self.error is not None:
+            raise self.error
+        return FakeResponse(self.text)
+
+
+def hedged(primary, fallback, **options):
+    return HedgedBackend(Backend("primary", primary), Backend("fallback", fallback), **options)
+
+
+def test_fast_primary_wins_without_a_hedge():
+    fallback = StubModel()
+    backend = hedged(StubModel(), fallback, hedge_delay=0.5)
+    assert backend.generate_content("plan").text == PLAN
+    assert (backend.hedges, fallback.calls) == (0, 0)
+
+
+def test_slow_primary_is_hedged_and_the_fallback_wins():
+    backend = hedged(StubModel(latency=0.5), StubModel(text='{"tips": ["fast"]}'), hedge_delay=0.05)
+    assert backend.generate_content("plan").text == '{"tips": ["fast"]}'
+    assert (backend.hedges, backend.fallback_wins) == (1, 1)
+
+
+def test_primary_error_falls_back():
+    backend = hedged(StubModel(error=RuntimeError("503")), StubModel(), hedge_delay=5)
+    assert backend.generate_content("plan").text == PLAN
+    assert backend.fallback_wins == 1
+
+
+def test_both_invalid_raises():
+    backend = hedged(StubModel(text="Sorry"), StubModel(text="No plan"), hedge_delay=0.05)
+    with pytest.raises(ValueError, match="invalid plan"):
+        backend.generate_content("plan")
+
+
+def test_delay_comes_from_the_primary_once_it_has_samples():
+    backend = hedged(StubModel(), StubModel(), min_samples=3, default_delay=8.0)
+    assert backend.current_delay() == 8.0
+    for _ in range(3):
+        backend.primary.histogram.observe(1.0)
+    assert 1.0 <= backend.current_delay() < 1.25
+    assert hedged(StubModel(), StubModel(), hedge_delay=0.3).current_delay() == 0.3
+
+
+def test_delay_stays_finite_when_the_primary_overflows_the_histogram():
+    backend = hedged(StubModel(), StubModel(), min_samples=3, default_delay=8.0)
+    for _ in range(3):
+        backend.primary.histogram.observe(500.0)
+    assert backend.current_delay() == 8.0
+    assert backend.generate_content("plan").text == PLAN
+
+    capped = hedged(StubModel(), StubModel(), min_samples=3, max_delay=10.0)
+    for _ in range(3):
+        capped.primary.histogram.observe(100.0)
+    assert capped.current_delay() == 10.0
+
+
+def test_waiting_for_a_pooled_client_slot_does_not_trigger_a_hedge():
+    model = StubModel(latency=0.01)
+    pool = ClientPool(max_concurrency_per_key=1, client_factory=lambda api_key: object(),
+                      model_factory=lambda client, model_name: model)
+    fallback = StubModel()
+    backend = HedgedBackend(Backend("primary", pool.model("key", "pro")), Backend("fallback", fallback),
+                            hedge_delay=0.1)
+
+    results = []
+    with pool.lease("key", "pro"):
+        worker = threading.Thread(target=lambda: results.append(backend.generate_content("plan")))
+        worker.start()
+        time.sleep(0.3)
+    worker.join()
+
+    assert results[0].text == PLAN
+    assert (backend.hedges, fallback.calls) == (0, 0)
+    assert backend.primary.histogram.quantile(1.0) < 0.3
@@ -0,0 +1,42 @@
+import time
+
+from safarnama.batch import RateLimitedModel, plan_batch
+from safarnama.fake_model import FakeModel
+from safarnama.planner import generate_plan
+
+
+class CountingModel(FakeModel):
+    def __init__(self):
+        super().__init__(latency=0.0)
+        self.started = []
+
+    def generate_content(self, prompt, stream=False, **kwargs):
+        self.started.append(time.monotonic())
+        return super().generate_content(prompt, stream=stream, **kwargs)
+
+
+def test_rate_limits_every_model_request_of_a_segmented_trip():
+    model = CountingModel()
+
+    def plan_item(item, bucket):
+        return generate_plan(RateLimitedModel(model, bucket), "Rome", item["duration"], ["Food"], "Moderate", 2,
+                             segmented=True)
+
+    report = plan_batch([{"duration": 14}, {"duration": 14}], plan_item, rate=40, burst=1)
+
+    assert report.succeeded == 2
+    # Two trips, but each segment is its own request and waits for a token
+    assert len(model.started) > 2
+    assert model.started[-1] - model.started[0] >= (len(model.started) - 1) / 40 * 0.9
+
+
+def test_no_rate_means_no_bucket():
+    buckets = []
+
+    def plan_item(item, bucket):
+        buckets.append(bucket)
+        return {}
+
+    plan_batch([{}, {}], plan_item, rate=None)
+
+    assert buckets == [None, None]
@@ -0,0 +1,61 @@
+from safarnama.expense_import import guess_columns, import_expenses_csv, read_header
+from safarnama.expenses import ExpenseColumns
+
+EXPENSES = b"""date,amount,description
+2026-01-01,12.50,Lunch at a cafe
+2026-01-02,30,Hotel deposit
+2026-01-03,-5.00,Refund for lunch
+"""
+
+
+def test_negative_amounts_are_refunds_not_expenses():
+    result = import_expenses_csv(EXPENSES)
+    assert result.amount.tolist() == [12.5, 30.0]
+    assert result.description.tolist() == ["Lunch at a cafe", "Hotel deposit"]
+    assert result.refunds == 1
+    assert result.credits == 0
+    assert "1 refunds" in result.summary()
+
+
+def test_bank_statement_option_reads_negative_amounts_as_spending():
+    statement = b"date,amount,description\n2026-01-01,-12.50,Cafe\n2026-01-02,2500,SALARY\n"
+    result = import_expenses_csv(statement, bank_statement=True)
+    assert result.amount.tolist() == [12.5]
+    assert result.credits == 1
+
+
+def test_credit_column_marks_credits():
+    statement = b"Date,Description,Debit,Credit\n2026-01-01,Cafe,12.50,\n2026-01-02,SALARY,,2500\n"
+    columns = guess_columns(read_header(statement)[1])
+    assert columns["amount"] == "Debit" and columns["credit"] == "Credit"
+    result = import_expenses_csv(statement, columns=columns)
+    assert result.amount.tolist() == [12.5]
+    assert result.credits == 1
+    assert result.invalid == 0
+
+
+def test_debit_credit_marker_column():
+    statement = b"Date,Description,Amount,Dr/Cr\n2026-01-01,Cafe,12.50,DR\n2026-01-02,SALARY,2500,CR\n"
+    result = import_expenses_csv(statement)
+    assert result.description.tolist() == ["Cafe"]
+    assert result.credits == 1
+
+
+def test_repeats_within_a_file_are_kept_and_reimports_are_dropped():
+    text = b"date,amount,description\n2026-01-01,4,Coffee\n2026-01-01,4,Coffee\n2026-01-02,4,Coffee\n"
+    first = import_expenses_csv(text)
+    assert len(first) == 3
+
+    existing = ExpenseColumns()
+    existing.extend_columns(first.date, first.category, first.description, first.amount)
+    again = import_expenses_csv(text + b"2026-01-01,4,coffee \n", existing=existing)
+    # Only the third same-day coffee is new
+    assert len(again) == 1
+    assert again.duplicates == 3
+
+
+def test_european_amounts_and_dates():
+    text = "Datum;Betrag;Beschreibung\n03.02.2026;1.234,50;Hotel\n04.02.2026;(12,00);Taxi\n".encode()
+    result = import_expenses_csv(text, columns={"date": "Datum", "amount": "Betrag", "description": "Beschreibung"})
+    assert result.amount.tolist() == [1234.5]
+    assert result.refunds == 1
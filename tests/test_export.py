@@ -0,0 +1,79 @@
+import csv
+import io
+import json
+import zipfile
+
+import pytest
+
+from safarnama.expenses import ExpenseColumns
+from safarnama.export import (expense_csv_chunks, expense_ndjson_chunks, export_bytes, trip_json_chunks,
+                              write_chunks, write_expenses_parquet, write_trips_archive)
+from safarnama.storage import TripStore
+
+RECORDS = [
+    {"date": "2026-11-01", "category": "Food", "description": "Lunch, with \"wine\"", "amount": 24.5},
+    {"date": "2026-11-01", "category": "Accommodation", "description": "Hotel", "amount": 180.0},
+    {"date": "2026-11-02", "category": "Transportation", "description": "Café train ✓", "amount": 12.25},
+    {"date": "2026-11-03", "category": "Food", "description": "Lunch, with \"wine\"", "amount": 19.0},
+    {"date": "2026-11-03", "category": "Miscellaneous", "description": "Postcards", "amount": 3.0},
+]
+TRIP = {"id": 7, "destination": "São Paulo", "duration": 3, "tips": ["Carry water"]}
+
+
+def expenses():
+    return ExpenseColumns.from_records(RECORDS, trip_id=7)
+
+
+def without_trip_id(records):
+    return [{key: value for key, value in record.items() if key != "trip_id"} for record in records]
+
+
+def test_csv_round_trip_across_chunks():
+    data = export_bytes(lambda sink: write_chunks(expense_csv_chunks(expenses(), chunk_rows=2), sink))
+    rows = list(csv.DictReader(io.StringIO(data.decode("utf-8"))))
+    assert [{**row, "amount": float(row["amount"])} for row in rows] == RECORDS
+
+
+def test_ndjson_round_trip_across_chunks():
+    data = export_bytes(lambda sink: write_chunks(expense_ndjson_chunks(expenses(), chunk_rows=2), sink))
+    assert [json.loads(line) for line in data.decode("utf-8").splitlines()] == RECORDS
+
+
+@pytest.mark.parametrize("trip", [TRIP, {}], ids=["trip", "empty"])
+def test_trip_json_round_trip(trip):
+    data = export_bytes(lambda sink: write_chunks(trip_json_chunks(trip, expenses(), chunk_rows=2), sink))
+    assert json.loads(data) == {**trip, "expenses": RECORDS}
+    assert json.loads("".join(trip_json_chunks(trip))) == trip
+
+
+def test_trip_json_with_no_expenses():
+    assert json.loads("".join(trip_json_chunks(TRIP, ExpenseColumns()))) == {**TRIP, "expenses": []}
+
+
+def test_parquet_round_trip():
+    pq = pytest.importorskip("pyarrow.parquet")
+    table = pq.read_table(io.BytesIO(export_bytes(lambda sink: write_expenses_parquet(expenses(), sink, chunk_rows=2))))
+    assert table.num_rows == len(RECORDS)
+    frame = table.to_pandas()
+    frame["date"] = frame["date"].astype(str)
+    frame["category"] = frame["category"].astype(str)
+    assert frame.to_dict("records") == RECORDS
+
+
+def test_trips_archive_round_trip(tmp_path):
+    store = TripStore(str(tmp_path / "trips.sqlite3"))
+    try:
+        trip_id = store.save_trip(TRIP, "alice")
+        store.add_expenses(trip_id, RECORDS)
+        trips = store.load_trips("alice")
+        data = export_bytes(lambda sink: write_trips_archive(sink, trips, store, batch_size=2))
+    finally:
+        store.close()
+
+    with zipfile.ZipFile(io.BytesIO(data)) as archive:
+        saved = [json.loads(line) for line in archive.read("trips.ndjson").decode("utf-8").splitlines()]
+        rows = list(csv.DictReader(io.StringIO(archive.read("expenses.csv").decode("utf-8"))))
+    assert [(trip["id"], trip["destination"]) for trip in saved] == [(trip_id, "São Paulo")]
+    assert {row["trip_id"] for row in rows} == {str(trip_id)}
+    assert [{key: row[key] for key in ("date", "category", "description")} | {"amount": float(row["amount"])}
+            for row in rows] == without_trip_id(RECORDS)
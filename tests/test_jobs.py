@@ -0,0 +1,95 @@
+import json
+import threading
+import time
+from concurrent.futures import CancelledError
+
+import pytest
+
+from safarnama.fake_model import FakeModel, FakeResponse, fake_plan
+from safarnama.jobs import CANCELLED, DONE, JobManager
+from safarnama.planner import PlanMetrics, generate_plan
+from safarnama.prompts import compact_plan
+from safarnama.segmented import generate_segmented
+
+TRIP = dict(destination="Rome", duration=7, interests=["Food"], budget="Moderate", travelers=2)
+
+
+def wait_until_finished(manager, job_id):
+    for _ in range(200):
+        if manager.get(job_id).finished:
+            return manager.get(job_id)
+        time.sleep(0.01)
+    raise AssertionError("job did not finish")
+
+
+def test_streamed_plan_stops_at_the_next_chunk():
+    cancel = threading.Event()
+    events = []
+
+    def on_event(event):
+        events.append(event)
+        cancel.set()
+
+    with pytest.raises(CancelledError):
+        generate_plan(FakeModel(chunk_size=16), **TRIP, on_event=on_event, cancel_event=cancel,
+                      metrics=PlanMetrics())
+    assert len(events) == 1
+
+
+def test_no_rerequests_after_a_cancel():
+    cancel = threading.Event()
+    prompts = []
+
+    class ShortModel:
+        model_name = "short"
+
+        def generate_content(self, prompt, stream=False, **kwargs):
+            prompts.append(prompt)
+            cancel.set()
+            plan = fake_plan(prompt)
+            return FakeResponse(json.dumps(compact_plan({**plan, "itinerary": plan["itinerary"][:3]})))
+
+    with pytest.raises(CancelledError):
+        generate_plan(ShortModel(), **TRIP, cancel_event=cancel, metrics=PlanMetrics())
+    assert len(prompts) == 1
+
+
+def test_segments_are_not_retried_after_a_cancel():
+    cancel = threading.Event()
+    calls = []
+
+    def generate(prompt, timeout, keys):
+        calls.append(keys)
+        cancel.set()
+        raise RuntimeError("503")
+
+    with pytest.raises(CancelledError):
+        generate_segmented(generate, "Rome", 10, ["Food"], "Moderate", 2, retries=2, backoff=0,
+                           cancel_event=cancel)
+    # Two day ranges and four section groups, each tried at most once
+    assert len(calls) <= 6
+
+
+def test_cancelled_running_job_is_marked_cancelled():
+    manager = JobManager(max_workers=1)
+    started = threading.Event()
+
+    def work(cancel_event):
+        started.set()
+        cancel_event.wait(5)
+        raise RuntimeError("stopped early")
+
+    job_id = manager.submit("s", "Rome", work)
+    started.wait(5)
+    assert manager.cancel(job_id)
+    assert wait_until_finished(manager, job_id).status == CANCELLED
+
+
+def test_uncollected_finished_jobs_expire():
+    manager = JobManager(max_workers=1, finished_ttl=0.05)
+    job_id = manager.submit("s", "Rome", lambda cancel_event: {"tips": []})
+    assert wait_until_finished(manager, job_id).status == DONE
+    assert [job.id for job in manager.jobs_for("s")] == [job_id]
+    time.sleep(0.1)
+    assert manager.jobs_for("s") == []
+    assert manager.get(job_id) is None
@@ -0,0 +1,144 @@
+import pytest
+
+from safarnama import plan_cache
+from safarnama.plan_cache import PlanCache, plan_cache_key
+
+
+class Clock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(plan_cache.time, "time", clock)
+    return clock
+
+
+def open_cache(tmp_path, **options):
+    return PlanCache(str(tmp_path / "plans.sqlite3"), **options)
+
+
+def test_equivalent_inputs_share_a_key():
+    assert (plan_cache_key("m", "Paris ", 3, ["Food", "Art"], "$1,000", 2)
+            == plan_cache_key("m", "paris", 3, ["art", "food"], "1000", 2))
+    assert plan_cache_key("m", "Paris", 3, [], "1000", 2) != plan_cache_key("other", "Paris", 3, [], "1000", 2)
+
+
+def test_hits_are_fresh_copies(tmp_path, clock):
+    cache = open_cache(tmp_path)
+    cache.put("a", {"tips": ["x"]})
+    cache.get("a")["tips"].append("y")
+    assert cache.get("a") == {"tips": ["x"]}
+
+
+def test_memory_lru_falls_back_to_disk(tmp_path, clock):
+    cache = open_cache(tmp_path, max_memory_entries=1)
+    cache.put("a", {"n": 1})
+    cache.put("b", {"n": 2})
+    assert cache.get("a") == {"n": 1}
+    stats = cache.stats()
+    assert (stats["memory_entries"], stats["disk_entries"], stats["disk_hits"]) == (1, 2, 1)
+
+
+def test_disk_evicts_least_recently_used(tmp_path, clock):
+    cache = open_cache(tmp_path, max_memory_entries=1, max_disk_entries=2)
+    cache.put("a", {"n": 1})
+    clock.advance(1)
+    cache.put("b", {"n": 2})
+    clock.advance(1)
+    assert cache.get("a") == {"n": 1}
+    clock.advance(1)
+    cache.put("c", {"n": 3})
+
+    assert cache.get("b") is None
+    assert cache.get("a") == {"n": 1}
+    assert cache.stats()["evictions"] == 1
+
+
+def test_disk_byte_budget(tmp_path, clock):
+    cache = open_cache(tmp_path, max_disk_bytes=50)
+    cache.put("a", {"text": "x" * 30})
+    clock.advance(1)
+    cache.put("b", {"text": "y" * 30})
+    assert cache.get("a") is None
+    assert cache.stats()["disk_entries"] == 1
+
+
+def test_entries_expire_after_ttl(tmp_path, clock):
+    cache = open_cache(tmp_path, ttl_seconds=60)
+    cache.put("a", {"n": 1})
+    clock.advance(59)
+    assert cache.get("a") == {"n": 1}
+    clock.advance(2)
+    assert cache.get("a") is None
+    assert cache.stats()["misses"] == 1
+
+
+def test_expired_entries_are_purged_on_open(tmp_path, clock):
+    open_cache(tmp_path, ttl_seconds=60).put("a", {"n": 1})
+    clock.advance(61)
+    assert open_cache(tmp_path).stats()["disk_entries"] == 0
+
+
+def test_memory_hits_keep_entries_on_disk(tmp_path, clock):
+    cache = open_cache(tmp_path, max_disk_entries=2)
+    cache.put("a", {"n": 1})
+    clock.advance(1)
+    cache.put("b", {"n": 2})
+    clock.advance(1)
+    assert cache.get("a") == {"n": 1}
+    clock.advance(1)
+    cache.put("c", {"n": 3})
+
+    assert cache.stats()["memory_hits"] == 1
+    assert cache.get("b") is None
+    assert cache.get("a") == {"n": 1}
+
+
+def test_memory_hits_are_written_through_in_batches(tmp_path, clock):
+    cache = open_cache(tmp_path)
+    cache.put("a", {"n": 1})
+    clock.advance(5)
+    cache.get("a")
+
+    def last_access():
+        reader = PlanCache(cache.path)
+        return reader._conn.execute("SELECT last_access FROM plans WHERE key = 'a'").fetchone()[0]
+
+    assert last_access() == clock.now - 5
+    clock.advance(plan_cache.ACCESS_FLUSH_SECONDS)
+    cache.get("a")
+    assert last_access() == clock.now
+
+
+def test_stats_track_disk_usage(tmp_path, clock):
+    cache = open_cache(tmp_path, max_disk_entries=2, ttl_seconds=60)
+
+    def counted():
+        stats = cache.stats()
+        actual = cache._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM plans").fetchone()
+        assert (stats["disk_entries"], stats["disk_bytes"]) == actual
+        return actual[0]
+
+    cache.put("a", {"n": 1})
+    cache.put("a", {"text": "longer"})
+    assert counted() == 1
+    cache.put("b", {"n": 2})
+    clock.advance(1)
+    cache.put("c", {"n": 3})
+    assert counted() == 2
+    clock.advance(61)
+    cache.get("b")
+    cache.get("c")
+    assert counted() == 0
+    cache.put("d", {"n": 4})
+    cache.clear()
+    assert counted() == 0
@@ -0,0 +1,56 @@
+import json
+
+import pytest
+
+from safarnama.plan_stream import IncrementalPlanParser
+
+PLAN = {
+    "itinerary": [
+        {"day_number": 1, "activities": ["Colosseum", "Dinner in \"Trastevere\", {late}"]},
+        {"day_number": 2, "activities": ["Vatican: \\ museums ]"]},
+    ],
+    "tips": ["Carry water", "Book ahead"],
+    "costs": {"total": 1200.5, "note": "a été price"},
+}
+TEXT = json.dumps(PLAN, ensure_ascii=False, indent=1)
+FENCED = "Here is your plan:\n```json\n" + TEXT + "\n```\nEnjoy!"
+
+
+def feed_all(chunks):
+    parser = IncrementalPlanParser()
+    events = []
+    for chunk in chunks:
+        events.extend(parser.feed(chunk))
+    return events, parser.close()
+
+
+def expected_events():
+    return [("day", day) for day in PLAN["itinerary"]] + [("section", key, value) for key, value in PLAN.items()]
+
+
+@pytest.mark.parametrize("text", [TEXT, FENCED], ids=["bare", "fenced"])
+def test_every_two_chunk_split_gives_the_same_plan(text):
+    for cut in range(len(text) + 1):
+        events, plan = feed_all([text[:cut], text[cut:]])
+        assert plan == PLAN, cut
+        assert events == expected_events(), cut
+
+
+def test_one_character_at_a_time():
+    events, plan = feed_all(FENCED)
+    assert plan == PLAN
+    assert events == expected_events()
+
+
+def test_fence_split_across_chunks():
+    opening = FENCED.index("```json")
+    events, plan = feed_all([FENCED[:opening + 2], FENCED[opening + 2:opening + 6], FENCED[opening + 6:]])
+    assert plan == PLAN
+    assert events == expected_events()
+
+
+def test_cut_off_stream_keeps_finished_days_and_sections():
+    cut = TEXT.index('"costs"') + 12
+    events, plan = feed_all([TEXT[:cut]])
+    assert plan == {"itinerary": PLAN["itinerary"], "tips": PLAN["tips"]}
+    assert [event[0] for event in events] == ["day", "day", "section", "section"]
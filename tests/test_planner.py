@@ -0,0 +1,81 @@
+import json
+
+from safarnama.fake_model import FakeResponse, fake_plan
+from safarnama.plan_cache import PlanCache
+from safarnama.planner import PlanMetrics, generate_plan
+from safarnama.prompts import compact_plan
+from safarnama.schema import validate_plan
+
+TRIP = dict(destination="Rome", duration=7, interests=["Food"], budget="Moderate", travelers=2)
+
+
+class ScriptedModel:
+    """Answers each request with the next function of the prompt in ``replies``."""
+
+    model_name = "scripted"
+
+    def __init__(self, *replies):
+        self.replies = list(replies)
+        self.prompts = []
+
+    def generate_content(self, prompt, stream=False, **kwargs):
+        self.prompts.append(prompt)
+        return FakeResponse(self.replies.pop(0)(prompt))
+
+
+def compact(plan, sections=None):
+    plan = compact_plan(plan)
+    return json.dumps({key: value for key, value in plan.items() if sections is None or key in sections})
+
+
+def cut_after_day(day):
+    def reply(prompt):
+        text = compact(fake_plan(prompt))
+        # Cut off inside the first key of the next day, as a hit token limit does
+        return text[:text.index(f'{{"n": {day + 1},') + 3]
+
+    return reply
+
+
+def test_short_itinerary_is_a_problem():
+    plan = fake_plan("Trip to Rome for 3 days")
+    assert validate_plan(plan, duration=3)[1] == {}
+    plan["itinerary"] = plan["itinerary"][:2]
+    fixed, problems = validate_plan(plan, duration=3)
+    assert problems == {"itinerary": "missing days 3 to 3"}
+    assert len(fixed["itinerary"]) == 2
+
+
+def test_cut_off_reply_rerequests_only_the_missing_days(tmp_path):
+    model = ScriptedModel(cut_after_day(3), lambda prompt: compact(fake_plan(prompt), ("i",)),
+                          lambda prompt: compact(fake_plan(prompt)))
+    cache = PlanCache(str(tmp_path / "plans.sqlite3"))
+    plan = generate_plan(model, **TRIP, cache=cache, metrics=PlanMetrics())
+
+    assert [day["day_number"] for day in plan["itinerary"]] == list(range(1, 8))
+    itinerary_request = next(prompt for prompt in model.prompts[1:] if prompt.count("\n") == 1)
+    assert "days 4 to 7 only" in itinerary_request
+    assert cache.stats()["disk_entries"] == 1
+
+
+def test_rerequested_days_numbered_from_one_are_renumbered():
+    def restarted(prompt):
+        days = fake_plan(prompt)["itinerary"]
+        return compact({"itinerary": [{**day, "day_number": n} for n, day in enumerate(days, start=1)]}, ("i",))
+
+    model = ScriptedModel(cut_after_day(3), restarted, lambda prompt: compact(fake_plan(prompt)))
+    plan = generate_plan(model, **TRIP, metrics=PlanMetrics())
+
+    assert [day["day_number"] for day in plan["itinerary"]] == list(range(1, 8))
+    rerequested = fake_plan(model.prompts[1])["itinerary"]
+    assert plan["itinerary"][3]["activities"] == rerequested[0]["activities"]
+
+
+def test_plan_with_problems_left_is_not_cached(tmp_path):
+    short = lambda prompt: compact({**fake_plan(prompt), "itinerary": fake_plan(prompt)["itinerary"][:3]})
+    model = ScriptedModel(short, lambda prompt: "{}")
+    cache = PlanCache(str(tmp_path / "plans.sqlite3"))
+    plan = generate_plan(model, **TRIP, cache=cache, metrics=PlanMetrics())
+
+    assert len(plan["itinerary"]) == 3
+    assert cache.stats()["disk_entries"] == 0
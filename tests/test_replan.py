@@ -0,0 +1,35 @@
+from safarnama.fake_model import FakeModel, fake_plan
+from safarnama.planner import section_generator
+from safarnama.replan import plan_delta, replan_trip
+
+INPUTS = dict(destination="Rome", travel_date="2026-11-01", duration=3, budget="$1000", travelers=2,
+              interests=["Sightseeing"])
+
+
+class RecordingModel(FakeModel):
+    def __init__(self):
+        super().__init__()
+        self.prompts = []
+
+    def generate_content(self, prompt, stream=False, **kwargs):
+        self.prompts.append(prompt)
+        return super().generate_content(prompt, stream=stream, **kwargs)
+
+
+def old_trip():
+    return {**INPUTS, **fake_plan("Trip to Rome for 3 days"), "id": 1}
+
+
+def test_reminders_go_on_their_own_line():
+    model = RecordingModel()
+    new_inputs = {**INPUTS, "duration": 4, "interests": ["Sightseeing", "Nature"]}
+    trip = replan_trip(section_generator(model), old_trip(), new_inputs, plan_delta(old_trip(), new_inputs))
+
+    assert [day["day_number"] for day in trip["itinerary"]] == [1, 2, 3, 4]
+    for prompt in model.prompts:
+        for reminder in ("Earlier days already cover", "Skip these"):
+            if reminder in prompt:
+                line = next(line for line in prompt.splitlines() if reminder in line)
+                assert line.startswith(reminder)
+    assert sum("Earlier days already cover" in prompt for prompt in model.prompts) == 1
+    assert sum("Skip these, already recommended" in prompt for prompt in model.prompts) == 1
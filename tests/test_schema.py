@@ -0,0 +1,32 @@
+import json
+
+import pytest
+
+from safarnama.schema import repair_json
+
+PLAN = {
+    "itinerary": [
+        {"day_number": 1, "activities": ["Colosseum", "Dinner in \"Trastevere\", {late}"]},
+        {"day_number": 2, "activities": ["Vatican: \\ museums ]"]},
+    ],
+    "tips": ["Carry water", "Book ahead"],
+}
+TEXT = json.dumps(PLAN, indent=1)
+
+
+def test_repair_json_accepts_fences_and_trailing_commas():
+    assert repair_json('```json\n{"tips": ["a", "b",],}\n```') == {"tips": ["a", "b"]}
+
+
+def test_repair_json_closes_a_cut_off_reply():
+    cut = TEXT.index("Vatican") + 3
+    assert repair_json(TEXT[:cut]) == {"itinerary": [PLAN["itinerary"][0], {"day_number": 2, "activities": []}]}
+
+
+def test_repair_json_drops_an_unfinished_key():
+    assert repair_json('{"tips": ["a"], "cos') == {"tips": ["a"]}
+
+
+def test_repair_json_gives_up_on_prose():
+    with pytest.raises(json.JSONDecodeError):
+        repair_json("Sorry, I can't help with that.")
@@ -0,0 +1,46 @@
+from safarnama.search import TripIndex, tokenize
+
+ROME = {"id": 1, "destination": "Rome", "interests": ["Food", "History"],
+        "itinerary": [{"day_number": 1, "activities": ["Colosseum tour", "Pasta class"]}],
+        "attractions": [{"name": "Colosseum"}], "food": [{"name": "Roscioli"}]}
+LISBON = {"id": 2, "destination": "Lisbon", "interests": ["Food"],
+          "itinerary": [{"day_number": 1, "activities": ["Day trip inspired by Rome"]}]}
+LISBOA = {"id": 3, "destination": "Lisboa coast", "interests": ["Beaches"]}
+
+
+def index():
+    return TripIndex([ROME, LISBON, LISBOA])
+
+
+def test_tokenize_ignores_case_and_punctuation():
+    assert tokenize("São Paulo, 2-day_trip!") == ["são", "paulo", "2", "day", "trip"]
+
+
+def test_destination_matches_rank_above_itinerary_mentions():
+    assert index().search("rome") == [1, 2]
+
+
+def test_every_word_must_match():
+    assert index().search("food colosseum") == [1]
+    assert index().search("food beaches") == []
+
+
+def test_last_word_is_a_prefix():
+    assert sorted(index().search("lisb")) == [2, 3]
+    assert index().search("lisb food") == []
+    assert index().search("food lisb") == [2]
+
+
+def test_limit_keeps_the_best():
+    assert index().search("rome", limit=1) == [1]
+
+
+def test_add_replaces_and_remove_forgets():
+    trips = index()
+    trips.add({**LISBON, "destination": "Porto", "itinerary": []})
+    assert trips.search("rome") == [1]
+    assert trips.search("porto") == [2]
+    trips.remove(1)
+    assert trips.search("rome") == []
+    assert trips.search("colo") == []
+    assert len(trips) == 2
@@ -0,0 +1,32 @@
+import time
+
+import pytest
+
+from safarnama.fake_model import FakeModel
+from safarnama.planner import section_generator
+from safarnama.segmented import SegmentError, generate_segmented
+
+TRIP = ("Rome", 10, ["Food"], "Moderate", 2)
+
+
+def test_queued_segments_do_not_count_against_the_deadline():
+    generate = section_generator(FakeModel(latency=0.3))
+
+    # Six segments one at a time take longer than one segment's deadline
+    plan = generate_segmented(generate, *TRIP, max_workers=1, timeout=0.05, retries=0, backoff=0)
+
+    assert [day["day_number"] for day in plan["itinerary"]] == list(range(1, 11))
+
+
+def test_a_stuck_segment_times_out():
+    fast = section_generator(FakeModel(latency=0.0))
+
+    def generate(prompt, timeout, keys):
+        if keys == ("tips",):
+            time.sleep(3)
+        return fast(prompt, timeout, keys)
+
+    started = time.monotonic()
+    with pytest.raises(SegmentError, match="tips.*timed out"):
+        generate_segmented(generate, *TRIP, timeout=0.05, retries=0, backoff=0)
+    assert time.monotonic() - started < 2
@@ -0,0 +1,51 @@
+import pytest
+
+from safarnama.storage import TripStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = TripStore(str(tmp_path / "trips.sqlite3"))
+    yield store
+    store.close()
+
+
+def trip(destination="Rome", **fields):
+    return {"destination": destination, "travel_date": "2026-11-01", "duration": 2, "budget": "$1000",
+            "travelers": 2, "interests": ["Food"], "itinerary": [{"day_number": 1, "activities": ["Walk"]}],
+            "tips": ["Carry water"], **fields}
+
+
+def test_round_trip_and_update_in_place(store):
+    trip_id = store.save_trip(trip(), "alice")
+    assert store.save_trip(trip("Lisbon", id=trip_id), "alice") == trip_id
+    loaded = store.load_trips("alice")
+    assert [(saved["id"], saved["destination"]) for saved in loaded] == [(trip_id, "Lisbon")]
+    assert loaded[0]["itinerary"] == [{"day_number": 1, "activities": ["Walk"]}]
+    assert loaded[0]["tips"] == ["Carry water"]
+
+
+def test_users_cannot_touch_each_others_trips(store):
+    trip_id = store.save_trip(trip(), "alice")
+    assert store.load_trips("bob") == []
+    assert store.get_trip(trip_id, "bob") is None
+
+    with pytest.raises(PermissionError):
+        store.save_trip(trip("Lisbon", id=trip_id), "bob")
+    store.delete_trip(trip_id, "bob")
+    assert store.get_trip(trip_id, "alice")["destination"] == "Rome"
+
+    store.delete_trip(trip_id, "alice")
+    assert store.load_trips("alice") == []
+
+
+def test_iter_expenses_pages_in_date_order(store):
+    trip_id = store.save_trip(trip(), "alice")
+    expenses = [{"date": f"2026-11-{day:02d}", "category": "Food", "description": f"Meal {day}", "amount": day}
+                for day in (3, 1, 2, 1)]
+    store.add_expenses(trip_id, expenses)
+    batches = list(store.iter_expenses(trip_id, batch_size=3))
+    assert [len(batch) for batch in batches] == [3, 1]
+    rows = [row for batch in batches for row in batch]
+    assert [row[0] for row in rows] == [expense["date"] for expense in store.load_expenses(trip_id)]
+    assert store.count_expenses(trip_id) == 4